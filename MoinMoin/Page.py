@@ -34,12 +34,12 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, re, codecs
+import os, re, codecs, time, atexit
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
-from MoinMoin import config, caching, user, util, wikiutil
+from MoinMoin import config, caching, parseevents, user, util, wikiutil
 from MoinMoin.logfile import eventlog
 
 def is_cache_exception(e):
@@ -50,10 +50,25 @@ def is_cache_exception(e):
 class ItemCache:
     """ Cache some page item related data, as meta data or pagelist
 
-        We only cache this to RAM in request.cfg (this is the only kind of
-        server object we have), because it might be too big for pickling it
-        in and out.
+        We cache this to RAM in request.cfg (this is the only kind of
+        server object we have). To let new processes start with a warm
+        cache, a snapshot of it is saved to the wiki cache when the process
+        exits (and by "moin maint makecache"), together with the edit-log
+        position it corresponds to. A new process loads the snapshot and
+        only needs to invalidate the items changed in the edit-log since
+        then (see load_snapshot / save_snapshot).
+
+        The layer / revision data (layer_* keys) is not saved, it would get
+        stale if page directories are removed without an edit-log entry. New
+        processes get it from the page list index, which notices that.
     """
+    # save a snapshot at exit if there were that many changes (new or
+    # invalidated items) since the last one:
+    snapshot_threshold = 100
+    snapshot_arena = 'itemcache'
+    snapshot_version = 2
+    snapshot_skip_keys = ('layer_auto', 'layer_normal', 'layer_underlay', )
+
     def __init__(self, name):
         """ Initialize ItemCache object.
             @param name: name of the object, used for display in logging and
@@ -66,6 +81,8 @@ class ItemCache:
         self.requests = 0
         self.hits = 0
         self.loglevel = logging.NOTSET
+        self.changes = 0 # since the last snapshot
+        self.exit_request = None # request used for saving a snapshot at exit
 
     def putItem(self, request, name, key, data):
         """ Remembers some data for item name under a key.
@@ -76,6 +93,7 @@ class ItemCache:
         """
         d = self.cache.setdefault(name, {})
         d[key] = data
+        self.changes += 1
 
     def getItem(self, request, name, key):
         """ Returns some item stored for item name under key.
@@ -105,14 +123,17 @@ class ItemCache:
     def refresh(self, request):
         """ Refresh the cache - if anything has changed in the wiki, we see it
             in the edit-log and either delete cached data for the changed items
-            (for 'meta') or the complete cache ('pagelists').
+            (for 'meta') or update the page list index for them ('pagelists').
             @param request: the request object
         """
         from MoinMoin.logfile import editlog
         elog = editlog.EditLog(request)
         old_pos = self.log_pos
+        if old_pos is None:
+            old_pos = self.load_snapshot(request)
         new_pos, items = elog.news(old_pos)
         if items:
+            self.changes += len(items)
             if self.name == 'meta':
                 for item in items:
                     logging.log(self.loglevel, "cache: removing %r" % item)
@@ -121,10 +142,312 @@ class ItemCache:
                     except:
                         pass
             elif self.name == 'pagelists':
-                logging.log(self.loglevel, "cache: clearing pagelist cache")
-                self.cache = {}
+                index = self.cache.get('all', {}).get(None)
+                if index is not None:
+                    logging.log(self.loglevel, "cache: updating pagelist index")
+                    index.refresh_items(request, items)
+                else:
+                    logging.log(self.loglevel, "cache: clearing pagelist cache")
+                    self.cache = {}
         self.log_pos = new_pos # important to do this at the end -
                                # avoids threading race conditions
+        if self.changes >= self.snapshot_threshold:
+            # not now, saving it is not cheap
+            if self.exit_request is None:
+                atexit.register(self._save_snapshot_at_exit)
+            self.exit_request = request
+
+    def _save_snapshot_at_exit(self):
+        if self.changes >= self.snapshot_threshold:
+            try:
+                self.save_snapshot(self.exit_request)
+            except Exception, err:
+                logging.warning("could not save %s cache snapshot at exit: %s" % (self.name, str(err)))
+
+    def _get_snapshot_stamp(self, request):
+        """ Return values that change when a snapshot becomes invalid in a
+            way we can't see in the edit-log: the stamp of the page list
+            index and the mtime of the wiki configuration.
+        """
+        return PageListIndex()._get_stamp(request), request.cfg.cfg_mtime
+
+    def load_snapshot(self, request):
+        """ Load the cache from the last snapshot (maybe saved by another
+            process). The caller needs to invalidate the items changed in
+            the edit-log since the returned position.
+
+            For 'pagelists', the snapshot is the PageListIndex, which is
+            brought up-to-date by loading it.
+
+            @param request: the request object
+            @return: edit-log position of the snapshot or None (no snapshot)
+        """
+        if self.name == 'pagelists':
+            index = PageListIndex()
+            log_pos = index.load(request)
+            self.cache = {'all': {None: index}}
+            return log_pos
+
+        from MoinMoin.logfile import editlog
+        cache = caching.CacheEntry(request, self.snapshot_arena, self.name, scope='wiki', use_pickle=True)
+        if not cache.exists():
+            return None
+        try:
+            data = cache.content()
+            if (data['version'] != self.snapshot_version or
+                data['stamp'] != self._get_snapshot_stamp(request) or
+                data['log_pos'] > editlog.EditLog(request).size()):
+                return None
+        except (caching.CacheError, KeyError, TypeError,
+                AttributeError, ImportError), err: # unpickling old classes may fail
+            logging.debug("not using %s cache snapshot: %s" % (self.name, str(err)))
+            return None
+        logging.debug("loaded %s cache snapshot (%d items)" % (self.name, len(data['cache'])))
+        self.cache = data['cache']
+        return data['log_pos']
+
+    def _merge_snapshot(self, request, log_pos, stamp, items):
+        """ Merge items with those of the saved snapshot (maybe saved by
+            another process having other items cached).
+
+            @param log_pos: edit-log position items are up-to-date with
+            @param items: the items to save (get modified)
+            @return: (edit-log position, items) for the new snapshot
+        """
+        from MoinMoin.logfile import editlog
+        cache = caching.CacheEntry(request, self.snapshot_arena, self.name, scope='wiki', use_pickle=True)
+        if not cache.exists():
+            return log_pos, items
+        elog = editlog.EditLog(request)
+        try:
+            data = cache.content()
+            if (data['version'] != self.snapshot_version or data['stamp'] != stamp or
+                data['log_pos'] > elog.size()):
+                return log_pos, items
+            merged = data['cache']
+        except (caching.CacheError, KeyError, TypeError,
+                AttributeError, ImportError): # unpickling old classes may fail
+            return log_pos, items
+        # bring both up-to-date with the edit-log by invalidating changed items,
+        # invalidating more than needed is no problem
+        new_pos, changed = elog.news(data['log_pos'])
+        for name in changed:
+            merged.pop(name, None)
+        dummy, changed = elog.news(log_pos)
+        for name in changed:
+            items.pop(name, None)
+        for name, d in items.iteritems():
+            merged.setdefault(name, {}).update(d)
+        return new_pos, merged
+
+    def save_snapshot(self, request):
+        """ Save a snapshot of the cache for load_snapshot, merged with
+            the last one.
+
+            @param request: the request object
+        """
+        if self.log_pos is None:
+            self.refresh(request)
+        self.changes = 0
+        log_pos, stamp = self.log_pos, self._get_snapshot_stamp(request)
+        if self.name == 'pagelists':
+            index = self.cache.get('all', {}).get(None)
+            if index is not None:
+                index.save(request, log_pos, stamp[0])
+            return
+
+        # other threads may modify the cache while we pickle it
+        items = {}
+        for name, d in self.cache.items():
+            d = dict([(key, data) for key, data in d.items()
+                      if key not in self.snapshot_skip_keys])
+            if d:
+                items[name] = d
+        log_pos, items = self._merge_snapshot(request, log_pos, stamp, items)
+        data = {
+            'version': self.snapshot_version,
+            'stamp': stamp,
+            'log_pos': log_pos,
+            'cache': items,
+        }
+        cache = caching.CacheEntry(request, self.snapshot_arena, self.name, scope='wiki', use_pickle=True)
+        try:
+            cache.update(data)
+        except (caching.CacheError, TypeError), err: # TypeError: unpicklable item
+            logging.warning("could not save %s cache snapshot: %s" % (self.name, str(err)))
+
+
+class PageListIndex(dict):
+    """ Index of all page names of the wiki, persisted to the wiki cache
+
+        Maps unquoted page names to (underlay, rev, exists) tuples:
+        underlay is the layer get_rev uses for the page (0 == normal,
+        1 == underlay), rev is the current revision number in that layer and
+        exists tells whether this revision is there (False for deleted pages).
+
+        The index is stored together with the edit-log position it
+        corresponds to. When loading it, only the pages changed since then
+        are rescanned, so a new process does not need to list and unquote all
+        page directories. If the edit-log was replaced or the underlay pages
+        directory changed, the index gets rebuilt from scratch. If page
+        directories were added or removed without an edit-log entry (the
+        mtime of the pages directory changed), only the pages missing in the
+        index or on disk are rescanned.
+    """
+    arena = 'pagelists'
+    key = 'index'
+    version = 2
+    pages_mtime = None # mtime of the pages directory when we listed it
+    # only write the index back on load if the edit-log tail was that long,
+    # saving it is not cheap for big wikis
+    save_threshold = 100
+
+    def _get_paths(self, request):
+        """ Return paths of the normal and underlay pages directories
+            (the latter is None if there is no underlay).
+        """
+        rootpage = request.rootpage
+        paths = [rootpage.getPagePath('pages', check_create=0), None]
+        if request.cfg.data_underlay_dir is not None:
+            paths[1] = rootpage.getPagePath('pages', use_underlay=1, check_create=0)
+        return paths
+
+    def _get_stamp(self, request):
+        """ Return values that change when the index can't be updated from
+            the edit-log any more: the edit-log's inode and the mtime of the
+            underlay pages directory.
+        """
+        elog_fname = request.rootpage.getPagePath('edit-log', isfile=1)
+        try:
+            elog_ino = os.stat(elog_fname).st_ino
+        except OSError:
+            elog_ino = None
+        underlay_path = self._get_paths(request)[1]
+        try:
+            underlay_mtime = underlay_path and os.path.getmtime(underlay_path)
+        except OSError:
+            underlay_mtime = None
+        return elog_ino, underlay_mtime
+
+    def _get_pages_mtime(self, request):
+        try:
+            return os.path.getmtime(self._get_paths(request)[0])
+        except OSError:
+            return None
+
+    def _scan_page(self, request, pagename):
+        """ Determine the index entry for a single page from disk.
+
+        This mirrors what Page.getPageBasePath and Page.get_rev do for
+        automatic layer selection.
+
+        @param pagename: unquoted page name
+        @return: (underlay, rev, exists) or None if there is no pagedir
+        """
+        qpagename = wikiutil.quoteWikinameFS(pagename)
+        get_current = request.rootpage.get_current_from_pagedir
+        normal_rev = None
+        have_pagedir = False
+        for underlay, path in enumerate(self._get_paths(request)):
+            if path is None:
+                continue
+            pagedir = os.path.join(path, qpagename)
+            rev = get_current(pagedir)
+            if normal_rev is None:
+                normal_rev = rev
+            if rev != 99999999:
+                revfile = os.path.join(pagedir, 'revisions', '%08d' % rev)
+                if os.path.exists(revfile):
+                    return underlay, rev, True
+            have_pagedir = have_pagedir or os.path.isdir(pagedir)
+        if have_pagedir:
+            # deleted page, get_rev uses the normal layer in that case
+            return 0, normal_rev, False
+        return None
+
+    def refresh_items(self, request, pagenames):
+        """ Update the index entries of some (changed) pages. """
+        for pagename in pagenames:
+            if pagename.endswith(u'/MoinEditorBackup'):
+                continue
+            entry = self._scan_page(request, pagename)
+            if entry is None:
+                self.pop(pagename, None)
+            else:
+                self[pagename] = entry
+
+    def rebuild(self, request):
+        """ Rebuild the index by listing the page directories. """
+        self.clear()
+        self.pages_mtime = self._get_pages_mtime(request)
+        names = request.rootpage._listPages()
+        self.refresh_items(request, [wikiutil.unquoteWikiname(name) for name in names])
+
+    def reconcile(self, request):
+        """ Rescan the pages added to or removed from the pages directory
+            without an edit-log entry (e.g. by an admin or a test).
+        """
+        self.pages_mtime = self._get_pages_mtime(request)
+        path = self._get_paths(request)[0]
+        try:
+            names = request.rootpage._listPageInPath(path)
+        except OSError:
+            names = {}
+        on_disk = dict([(wikiutil.unquoteWikiname(name), None) for name in names])
+        changed = [pagename for pagename in on_disk if pagename not in self]
+        for pagename, (underlay, rev, exists) in self.items():
+            if (pagename in on_disk) == bool(underlay):
+                # normal pagedir gone or new one for an underlay page
+                changed.append(pagename)
+        self.refresh_items(request, changed)
+
+    def load(self, request):
+        """ Load the index from the cache, bring it up-to-date using the
+            edit-log and rebuild it if the cache is not usable.
+
+            @return: the edit-log position the index is up-to-date with
+        """
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        stamp = self._get_stamp(request)
+        cache = caching.CacheEntry(request, self.arena, self.key, scope='wiki', use_pickle=True)
+        try:
+            data = cache.content()
+            if (data['version'] != self.version or data['stamp'] != stamp or
+                data['log_pos'] > elog.size()):
+                raise caching.CacheError
+        except (caching.CacheError, KeyError, TypeError):
+            # get the edit-log position first, so we do not miss changes
+            # happening while we list the pages
+            log_pos = elog.size()
+            self.rebuild(request)
+            self.save(request, log_pos, stamp)
+        else:
+            self.update(data['pages'])
+            self.pages_mtime = data['pages_mtime']
+            log_pos, items = elog.news(data['log_pos'])
+            self.refresh_items(request, items)
+            reconciled = self._get_pages_mtime(request) != self.pages_mtime
+            if reconciled:
+                self.reconcile(request)
+            if reconciled or len(items) >= self.save_threshold:
+                self.save(request, log_pos, stamp)
+        return log_pos
+
+    def save(self, request, log_pos, stamp):
+        """ Store the index into the cache. """
+        data = {
+            'version': self.version,
+            'stamp': stamp,
+            'log_pos': log_pos,
+            'pages_mtime': self.pages_mtime,
+            'pages': dict(self),
+        }
+        cache = caching.CacheEntry(request, self.arena, self.key, scope='wiki', use_pickle=True)
+        try:
+            cache.update(data)
+        except caching.CacheError, err:
+            logging.warning("could not save page list index: %s" % str(err))
 
 
 class Page(object):
@@ -389,6 +712,17 @@ class Page(object):
                 #logging.debug("got data from cache: %r %r %r" % cache_data)
                 return cache_data
 
+            if use_underlay == -1 and rev == 0:
+                # the page list index knows the current revision, if loaded
+                entry = self._get_index_entry()
+                if entry is not None:
+                    underlay, realrev, exists = entry
+                    self._underlay = underlay
+                    pagefile = os.path.join(self._pagepath[underlay], 'revisions', '%08d' % realrev)
+                    data = (pagefile, realrev, exists)
+                    request.cfg.cache.meta.putItem(request, cache_name, cache_key, data)
+                    return data
+
         # Figure out if we should use underlay or not, if needed.
         if use_underlay == -1:
             underlay, pagedir = self.getPageStatus(check_create=0)
@@ -408,6 +742,25 @@ class Page(object):
 
         return data
 
+    def _get_index_entry(self):
+        """ Look up this page in the page list index (see PageListIndex).
+
+        The index gets loaded from its snapshot when the pagelists cache
+        is used first in a process (see ItemCache.load_snapshot). Pages not
+        in the index might still exist with a different case of the page
+        name on case insensitive file systems, so we only trust the index
+        for hits.
+
+        @return: (underlay, rev, exists) or None
+        """
+        if self._text_filename_force is not None:
+            return None
+        request = self.request
+        index = request.cfg.cache.pagelists.getItem(request, 'all', None)
+        if index is None:
+            return None
+        return index.get(self.page_name)
+
     def current_rev(self):
         """ Return number of current revision.
 
@@ -447,12 +800,17 @@ class Page(object):
 
         if use_underlay == -1: # automatic
             if self._underlay is None:
-                underlay, path = 0, standardpath
-                pagefile, rev, exists = self.get_rev(use_underlay=0)
-                if not exists:
-                    pagefile, rev, exists = self.get_rev(use_underlay=1)
-                    if exists:
-                        underlay, path = 1, underlaypath
+                entry = self._get_index_entry()
+                if entry is not None:
+                    underlay = entry[0]
+                    path = self._pagepath[underlay]
+                else:
+                    underlay, path = 0, standardpath
+                    pagefile, rev, exists = self.get_rev(use_underlay=0)
+                    if not exists:
+                        pagefile, rev, exists = self.get_rev(use_underlay=1)
+                        if exists:
+                            underlay, path = 1, underlaypath
                 self._underlay = underlay
             else:
                 underlay = self._underlay
@@ -1083,6 +1441,7 @@ class Page(object):
             offer a dialogue to save it to disk (used by Save action).
             Supplied mimetype overrides default text/plain.
         """
+        from MoinMoin.web.utils import make_conditional
         request = self.request
         request.mimetype = mimetype or 'text/plain'
         if self.exists():
@@ -1090,7 +1449,10 @@ class Page(object):
             # to ensure cacheability where supported. Because we are sending
             # RAW (file) content, the file mtime is correct as Last-Modified header.
             request.status_code = 200
-            request.last_modified = os.path.getmtime(self._text_filename())
+            mtime = os.path.getmtime(self._text_filename())
+            etag = '%d-%d' % (self.get_real_rev(), int(mtime * 1000000))
+            if make_conditional(request, etag, mtime):
+                return
             text = self.encodeTextMimeType(self.body)
             #request.headers['Content-Length'] = len(text)  # XXX WRONG! text is unicode obj, but we send utf-8!
             if content_disposition:
@@ -1376,7 +1738,7 @@ class Page(object):
         module = self.formatter.__module__
         return module[module.rfind('.') + 1:]
 
-    def canUseCache(self, parser=None):
+    def canUseCache(self, parser=None, formats=None):
         """ Is caching available for this request?
 
         This make sure we can try to use the caching system for this
@@ -1385,13 +1747,17 @@ class Page(object):
         should be displayed.
 
         @param parser: the parser used to render the page
+        @param formats: names of the formatters that may use the cache
+                        (default: cfg.caching_formats)
         @rtype: bool
         @return: if this page can use caching
         """
+        if formats is None:
+            formats = self.cfg.caching_formats
         if (not self.rev and
             not self.hilite_re and
             not self.__body_modified and
-            self.getFormatterName() in self.cfg.caching_formats):
+            self.getFormatterName() in formats):
             # Everything is fine, now check the parser:
             if parser is None:
                 try:
@@ -1419,7 +1785,11 @@ class Page(object):
         parser = Parser(body, request, format_args=format_args, **kw)
 
         if not (do_cache and self.canUseCache(Parser)):
-            self.format(parser)
+            if do_cache and self.canUseCache(Parser, self.cfg.caching_parse_events):
+                events = self.getParseEvents(request, parser)
+                parseevents.replay(request, events, parser, self.formatter)
+            else:
+                self.format(parser)
         else:
             try:
                 code = self.loadCache(request)
@@ -1485,10 +1855,18 @@ class Page(object):
         from MoinMoin.formatter.text_python import Formatter
         formatter = Formatter(request, ["page"], self.formatter)
 
+        if self.getFormatterName() in self.cfg.caching_parse_events:
+            events = self.getParseEvents(request, parser)
+            format = parseevents.replay
+            args = (request, events, parser, formatter)
+        else:
+            format = parser.format
+            args = (formatter, )
+
         # Save request state while formatting page
         saved_current_lang = request.current_lang
         try:
-            text = request.redirectedOutput(parser.format, formatter)
+            text = request.redirectedOutput(format, *args)
         finally:
             request.current_lang = saved_current_lang
 
@@ -1499,6 +1877,35 @@ class Page(object):
         cache.update(marshal.dumps(code))
         return code
 
+    def getParseEvents(self, request, parser):
+        """ Return the events of parsing the page text with parser, from the
+        cache if it is up-to-date (see MoinMoin.parseevents)
+
+        @param parser: parser instance for the page text
+        @rtype: list
+        @return: events
+        """
+        cache = caching.CacheEntry(request, self, 'parseevents', scope='item', use_pickle=True)
+        code_version = request.cfg.cache.code_version
+        # the parser checks whether attachments exist
+        attachmentsPath = self.getPagePath('attachments', check_create=0)
+        if not cache.needsUpdate(self._text_filename(), attachmentsPath):
+            try:
+                data = cache.content()
+                if data['code_version'] == code_version:
+                    return data['events']
+            except (caching.CacheError, KeyError, TypeError):
+                pass
+        request.clock.start('getParseEvents')
+        events = parseevents.record(request, parser, self)
+        request.clock.stop('getParseEvents')
+        try:
+            cache.update({'code_version': code_version, 'events': events})
+        except (caching.CacheError, TypeError, util.pickle.PicklingError), err:
+            # e.g. a parser passing objects that can't be pickled
+            logging.debug('can not cache parse events of "%s": %s' % (self.page_name, str(err)))
+        return events
+
     def _specialPageText(self, request, special_type):
         """ Output the default page content for new pages.
 
@@ -1658,6 +2065,9 @@ class Page(object):
             request.redirect()
             if hasattr(request, '_fmt_hd_counters'):
                 del request._fmt_hd_counters
+            # the page may get parsed again later in the same request,
+            # e.g. after it was saved (see MoinMoin.linkgraph)
+            del request.parsePageLinks_running[pagename]
             request.clock.stop('parsePageLinks')
         return formatter.pagelinks
 
@@ -1843,9 +2253,10 @@ class RootPage(Page):
         filter is usually compiled re match or search method, but can be
         any method that get a unicode argument and return bool. If you
         want to filter the page list, do it with this filter function,
-        and NOT on the output of this function. page.exists() and
-        user.may.read are very expensive, and should be done on the
-        smallest data set.
+        and NOT on the output of this function. user.may.read is very
+        expensive, and should be done on the smallest data set. Page
+        existence and layer are taken from the page list index, so the
+        exists and include_underlay filters do not need disk access.
 
         @param user: the user requesting the pages (MoinMoin.user.User)
         @param filter: filter function
@@ -1865,47 +2276,42 @@ class RootPage(Page):
         # Get pages cache or create it
         cachedlist = request.cfg.cache.pagelists.getItem(request, 'all', None)
         if cachedlist is None:
-            cachedlist = {}
-            for name in self._listPages():
-                # Unquote file system names
-                pagename = wikiutil.unquoteWikiname(name)
-
-                # Filter those annoying editor backups - current moin does not create
-                # those pages any more, but users have them already in data/pages
-                # until we remove them by a mig script...
-                if pagename.endswith(u'/MoinEditorBackup'):
-                    continue
-
-                cachedlist[pagename] = None
+            # Note: the index filters those annoying editor backups - current
+            # moin does not create those pages any more, but users have them
+            # already in data/pages until we remove them by a mig script...
+            cachedlist = PageListIndex()
+            cachedlist.load(request)
             request.cfg.cache.pagelists.putItem(request, 'all', None, cachedlist)
 
         if user or exists or filter or not include_underlay or return_objects:
             # Filter names
             pages = []
-            for name in cachedlist:
-                # First, custom filter - exists and acl check are very
-                # expensive!
+            for name in cachedlist.keys(): # copy, the index may get updated
+                # First, custom filter - acl check is very expensive!
                 if filter and not filter(name):
                     continue
 
-                page = Page(request, name)
+                entry = cachedlist.get(name)
+                if entry is None: # removed from the index meanwhile
+                    continue
+                underlay, rev, page_exists = entry
 
                 # Filter underlay pages
-                if not include_underlay and page.getPageStatus()[0]: # is an underlay page
+                if not include_underlay and underlay:
                     continue
 
                 # Filter deleted pages
-                if exists and not page.exists():
+                if exists and not page_exists:
                     continue
 
-                # Filter out page user may not read.
-                if user and not user.may.read(name):
-                    continue
+                pages.append(name)
 
-                if return_objects:
-                    pages.append(page)
-                else:
-                    pages.append(name)
+            # Filter out page user may not read.
+            if user:
+                pages = user.may.read_many(pages)
+
+            if return_objects:
+                pages = [Page(request, name) for name in pages]
         else:
             pages = cachedlist.keys()
 
@@ -1999,7 +2405,7 @@ class RootPage(Page):
             # WARNING: SLOW
             pages = self.getPageList(user='')
         else:
-            pages = self._listPages()
+            pages = self.getPageList(user='', exists=0)
         count = len(pages)
         self.request.clock.stop('getPageCount')
 
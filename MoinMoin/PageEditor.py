@@ -642,11 +642,11 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
             # Save page text with a comment about the old name
             savetext = u"## page was renamed from %s\n%s" % (self.page_name, savetext)
             newpage.saveText(savetext, 0, comment=comment, extra=self.page_name, action='SAVE/RENAME', notify=False)
-            # delete pagelinks
+            # delete pagelinks and parse events
             arena = newpage
-            key = 'pagelinks'
-            cache = caching.CacheEntry(request, arena, key, scope='item')
-            cache.remove()
+            for key in ('pagelinks', 'parseevents'):
+                cache = caching.CacheEntry(request, arena, key, scope='item')
+                cache.remove()
 
             # clean the cache
             for formatter_name in self.cfg.caching_formats:
@@ -694,6 +694,7 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
             key = self.request.form.get('key', 'text_html') # XXX see cleanup code in deletePage
             caching.CacheEntry(self.request, pg, key, scope='item').remove()
             caching.CacheEntry(self.request, pg, "pagelinks", scope='item').remove()
+            caching.CacheEntry(self.request, pg, "parseevents", scope='item').remove()
 
             # Notify observers
             e = PageRevertedEvent(self.request, self.page_name, revision, revstr)
@@ -733,11 +734,11 @@ Try a different name.""", wiki=True) % (wikiutil.escape(newpagename), )
             success = False
             msg = "SaveError has occurred in PageEditor.deletePage. We need locking there."
 
-        # delete pagelinks
+        # delete pagelinks and parse events
         arena = self
-        key = 'pagelinks'
-        cache = caching.CacheEntry(request, arena, key, scope='item')
-        cache.remove()
+        for key in ('pagelinks', 'parseevents'):
+            cache = caching.CacheEntry(request, arena, key, scope='item')
+            cache.remove()
 
         # clean the cache
         for formatter_name in self.cfg.caching_formats:
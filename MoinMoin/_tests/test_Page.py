@@ -6,9 +6,13 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+import shutil
+
 import py
 
-from MoinMoin.Page import Page
+from MoinMoin.Page import Page, ItemCache, PageListIndex
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin._tests import become_trusted, create_page, nuke_page, wikiconfig
 
 class TestPage:
     def testMeta(self):
@@ -73,5 +77,143 @@ class TestRootPage:
         assert u'' not in pagelist
 
 
+class TestPageListIndex:
+    pagename = u'PageListIndexTestPage'
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def testIndexUpdatedFromEditLog(self):
+        request = self.request
+        become_trusted(request)
+        rootpage = request.rootpage
+        create_page(request, self.pagename, u'Some text')
+        assert self.pagename in rootpage.getPageList(user='')
+
+        index = request.cfg.cache.pagelists.getItem(request, 'all', None)
+        underlay, rev, exists = index[self.pagename]
+        assert (underlay, rev, exists) == (0, 1, True)
+
+        PageEditor(request, self.pagename, do_editor_backup=0).deletePage()
+        assert self.pagename not in rootpage.getPageList(user='')
+        assert self.pagename in rootpage.getPageList(user='', exists=0)
+        assert index[self.pagename][2] is False
+
+    def testIndexPersisted(self):
+        request = self.request
+        become_trusted(request)
+        create_page(request, self.pagename, u'Some text')
+        index = PageListIndex()
+        index.load(request)
+        assert index[self.pagename] == (0, 1, True)
+        assert u'' not in index
+
+    def testPageListFilters(self):
+        request = self.request
+        become_trusted(request)
+        rootpage = request.rootpage
+        create_page(request, self.pagename, u'Some text')
+        pages = rootpage.getPageList(user='', include_underlay=False)
+        assert self.pagename in pages
+        assert u'FrontPage' not in pages
+        pages = rootpage.getPageList(user='', return_objects=True)
+        for page in pages:
+            assert page.exists()
+        assert Page(request, u'FrontPage').isUnderlayPage()
+        assert not Page(request, u'ThisPageDoesNotExist').exists()
+
+
+class TestItemCacheSnapshot:
+    pagename = u'ItemCacheSnapshotTestPage'
+
+    class Config(wikiconfig.Config):
+        acl_rights_before = u"TrustedUser:read,write,delete,admin"
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def testSnapshot(self):
+        request = self.request
+        become_trusted(request)
+        create_page(request, self.pagename, u'#acl All:read\nSome text')
+        page = Page(request, self.pagename)
+        assert page.exists()
+        page.getACL(request)
+        page.editlog_entry()
+        meta = request.cfg.cache.meta
+        meta.refresh(request)
+        meta.save_snapshot(request)
+        assert meta.changes == 0
+
+        # a new process loads the snapshot
+        cache = ItemCache('meta')
+        assert cache.getItem(request, self.pagename, 'layer_auto') is None
+        assert cache.getItem(request, self.pagename, 'acl')[1].acl_lines == [u'All:read']
+        entry = cache.getItem(request, self.pagename, 'lastlog')
+        assert entry.rev == '00000001'
+        assert entry._usercache == {}
+
+        # changes after the snapshot invalidate the items
+        PageEditor(request, self.pagename, do_editor_backup=0).saveText(u'#acl All:read\nChanged', 0)
+        cache = ItemCache('meta')
+        assert cache.getItem(request, self.pagename, 'layer_auto') is None
+        assert cache.getItem(request, self.pagename, 'acl') is None
+
+    def testMergeSnapshot(self):
+        request = self.request
+        become_trusted(request)
+        create_page(request, self.pagename, u'Some text')
+        # two processes with different items cached
+        first, second = ItemCache('meta'), ItemCache('meta')
+        first.refresh(request)
+        second.refresh(request)
+        first.putItem(request, self.pagename, 'first', 1)
+        second.putItem(request, self.pagename, 'second', 2)
+        second.putItem(request, u'FrontPage', 'second', 2)
+        first.save_snapshot(request)
+        PageEditor(request, self.pagename, do_editor_backup=0).saveText(u'Changed', 0)
+        second.save_snapshot(request)
+        cache = ItemCache('meta')
+        # the changed page was invalidated, the others are kept
+        assert cache.getItem(request, self.pagename, 'first') is None
+        assert cache.getItem(request, self.pagename, 'second') is None
+        assert cache.getItem(request, u'FrontPage', 'second') == 2
+
+        first.putItem(request, u'FrontPage', 'first', 1)
+        first.save_snapshot(request)
+        cache = ItemCache('meta')
+        assert cache.getItem(request, u'FrontPage', 'first') == 1
+        assert cache.getItem(request, u'FrontPage', 'second') == 2
+
+    def testRemovedPagedir(self):
+        request = self.request
+        become_trusted(request)
+        create_page(request, self.pagename, u'Some text')
+        page = Page(request, self.pagename)
+        assert page.exists()
+        # remove the page directory without an edit-log entry
+        shutil.rmtree(page.getPagePath(check_create=0))
+        meta, pagelists = request.cfg.cache.meta, request.cfg.cache.pagelists
+        meta.save_snapshot(request)
+        pagelists.save_snapshot(request)
+        # a new process loads the snapshots
+        request.cfg.cache.meta = ItemCache('meta')
+        request.cfg.cache.pagelists = ItemCache('pagelists')
+        try:
+            assert not Page(request, self.pagename).exists()
+            create_page(request, self.pagename, u'New text')
+            assert Page(request, self.pagename).get_raw_body() == u'New text'
+        finally:
+            request.cfg.cache.meta, request.cfg.cache.pagelists = meta, pagelists
+
+    def testPageListSnapshot(self):
+        request = self.request
+        become_trusted(request)
+        create_page(request, self.pagename, u'Some text')
+        cache = ItemCache('pagelists')
+        index = cache.getItem(request, 'all', None)
+        assert index[self.pagename] == (0, 1, True)
+
+
 coverage_modules = ['MoinMoin.Page']
 
@@ -8,10 +8,13 @@
 
 import py
 
-import time
+import os, time
 
 from MoinMoin import caching
+from MoinMoin._tests import become_trusted, create_page, nuke_page, wikiconfig
+from MoinMoin.Page import Page, is_cache_exception
 from MoinMoin.PageEditor import PageEditor
+from MoinMoin.parser.text_moin_wiki import Parser
 
 
 class TestCaching(object):
@@ -95,5 +98,183 @@ class TestCaching(object):
 
         assert data == rdata
 
+    def test_size(self):
+        """ test if size does not count the header """
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki')
+        cache.update('12345abcde')
+        assert cache.size() == 10
+
+    def test_lockfree_read(self):
+        """ test if readers do not lock on POSIX """
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki')
+        cache.update('12345abcde')
+        cache.open(mode='r')
+        try:
+            if caching.LOCKFREE_READS:
+                assert cache._lock is None
+            else:
+                assert cache._lock is not None
+        finally:
+            cache.close()
+
+    def test_torn_file(self):
+        """ test if truncated or damaged cache files are detected """
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki', use_pickle=True)
+        test_data = {1: 2, 2: 3, 3: [4, 5, ], }
+        cache.update(test_data)
+        content = open(cache._filename(), 'rb').read()
+        for damaged in [
+            '', # empty file (e.g. crash before data was flushed)
+            content[:10], # truncated header
+            content[:-1], # truncated data
+            content[:-1] + chr((ord(content[-1]) + 1) % 256), # damaged data
+            content[caching.HEADER.size:], # file without header (old format)
+            ]:
+            f = open(cache._filename(), 'wb')
+            f.write(damaged)
+            f.close()
+            py.test.raises(caching.CacheError, cache.content)
+        cache.update(test_data)
+        assert cache.content() == test_data
+
+
+class TestMemoryCache(object):
+    """ Tests the memory tier in front of the cache files """
+
+    class Config(wikiconfig.Config):
+        caching_memory_size = 1000
+
+    def setup_method(self, method):
+        self.memory = self.request.cfg.cache.caching_memory
+        self.memory.clear()
+
+    def test_hit(self):
+        test_data = {1: [2, 3]}
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki', use_pickle=True)
+        cache.update(test_data)
+        hits, misses = self.memory.hits, self.memory.misses
+        assert cache.content() == test_data
+        assert (self.memory.hits, self.memory.misses) == (hits, misses + 1)
+        data = cache.content()
+        assert data == test_data
+        assert (self.memory.hits, self.memory.misses) == (hits + 1, misses + 1)
+        # everybody gets his own copy of pickled data
+        data[1].append(4)
+        assert cache.content() == test_data
+
+    def test_encoded(self):
+        test_data = u"üöäÜÖÄß"
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki', use_encode=True)
+        cache.update(test_data)
+        cache.content()
+        hits = self.memory.hits
+        assert cache.content() == test_data
+        assert self.memory.hits == hits + 1
+
+    def test_changed_file(self):
+        cache = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki')
+        cache.update('old data')
+        assert cache.content() == 'old data'
+        other = caching.CacheEntry(self.request, 'test_arena', 'test_key', 'wiki')
+        other.update('new data, of course with a different size')
+        assert cache.content() == 'new data, of course with a different size'
+        other.remove()
+        py.test.raises(caching.CacheError, cache.content)
+
+    def test_eviction(self):
+        evictions = self.memory.evictions
+        for i in range(20):
+            cache = caching.CacheEntry(self.request, 'test_arena', 'test_key%d' % i, 'wiki')
+            cache.update('x' * 100)
+            cache.content()
+        assert self.memory.used <= self.memory.size
+        assert self.memory.evictions > evictions
+        # too big for the memory cache
+        cache.update('x' * 200)
+        cache.content()
+        assert (cache._fname, False) not in self.memory.items
+
+
+class TestSegmentStoreCaching(object):
+    """ Tests item caches kept in a segment store """
+
+    class Config(wikiconfig.Config):
+        caching_segment_store = True
+        caching_formats = ['test_format']
+
+    def setup_method(self, method):
+        # the store is kept in the wiki cache, remove what earlier runs left
+        page = PageEditor(self.request, u'Caching_TestPage')
+        caching.CacheEntry(self.request, page, 'test_format', 'item').remove()
+
+    def test_persistence(self):
+        page = PageEditor(self.request, u'Caching_TestPage')
+        cache = caching.CacheEntry(self.request, page, 'test_format', 'item')
+        assert cache._store is not None
+        assert not cache.exists()
+        cache.update('12345abcde')
+        cache = caching.CacheEntry(self.request, page, 'test_format', 'item')
+        assert cache.exists()
+        assert cache.content() == '12345abcde'
+        assert cache.size() == 10
+        uid = cache.uid()
+        cache.update('changed')
+        assert cache.content() == 'changed'
+        assert cache.uid() != uid
+        cache.remove()
+        assert not cache.exists()
+        py.test.raises(caching.CacheError, cache.content)
+
+    def test_update_needed(self):
+        page = PageEditor(self.request, u'Caching_TestPage')
+        page._write_file(u'does not matter')
+        cache = caching.CacheEntry(self.request, page, 'test_format', 'item')
+        assert cache.needsUpdate(page._text_filename())
+        cache.update('data')
+        assert not cache.needsUpdate(page._text_filename())
+        # other cache keys are not kept in the store
+        other = caching.CacheEntry(self.request, page, 'other_format', 'item')
+        assert other._store is None
+
+class TestCodeVersion(object):
+    """ Tests the code version embedded in compiled page caches """
+    pagename = u'Caching_CodeVersionTestPage'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def test_invalidate(self):
+        cfg = self.request.cfg
+        version = caching.get_code_version(cfg)
+        assert version >= int(os.path.getmtime(cfg.moinmoin_dir))
+        new_version = caching.invalidate_code_version(cfg)
+        assert new_version > version
+        assert caching.get_code_version(cfg) == new_version
+
+    def test_page_cache(self):
+        request = self.request
+        create_page(request, self.pagename, u'Some text')
+        page = Page(request, self.pagename)
+        page.send_page(content_only=1, emit_headers=False)
+        code = page.loadCache(request)
+        assert 'os' not in code.co_names # no stat call
+
+        parser = Parser(u'', request)
+        cache = request.cfg.cache
+        version = cache.code_version
+        cache.code_version = version + 1
+        try:
+            try:
+                page.execute(request, parser, code)
+            except Exception, err:
+                assert is_cache_exception(err)
+            else:
+                assert False, "cache was not invalidated"
+        finally:
+            cache.code_version = version
+
 coverage_modules = ['MoinMoin.caching']
 
@@ -0,0 +1,74 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.linkgraph Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin.linkgraph import LinkGraph
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin._tests import become_trusted, create_page, nuke_page
+
+
+class TestLinkGraph:
+    pages = [u'LinkGraphTestPage', u'LinkGraphTestTarget', u'LinkGraphTestRenamed']
+
+    def setup_method(self, method):
+        request = self.request
+        become_trusted(request)
+        create_page(request, u'LinkGraphTestPage', u'LinkGraphTestTarget LinkGraphTestWanted')
+        create_page(request, u'LinkGraphTestTarget', u'LinkGraphTestPage')
+
+    def teardown_method(self, method):
+        for pagename in self.pages:
+            nuke_page(self.request, pagename)
+
+    def testQueries(self):
+        request = self.request
+        graph = request.cfg.cache.linkgraph
+        links = graph.links_from(request, u'LinkGraphTestPage')
+        assert set(links) == set([u'LinkGraphTestTarget', u'LinkGraphTestWanted'])
+        assert graph.links_to(request, u'LinkGraphTestTarget') == set([u'LinkGraphTestPage'])
+        assert graph.links_to(request, u'LinkGraphTestWanted') == set([u'LinkGraphTestPage'])
+
+        wanted = graph.wanted(request, [u'LinkGraphTestPage', u'LinkGraphTestTarget'])
+        assert wanted == {u'LinkGraphTestWanted': set([u'LinkGraphTestPage'])}
+        assert graph.wanted(request, [u'LinkGraphTestTarget']) == {}
+
+        assert graph.orphans(request, [u'LinkGraphTestPage', u'LinkGraphTestTarget']) == set()
+        assert graph.orphans(request, [u'LinkGraphTestPage']) == set([u'LinkGraphTestPage'])
+
+        sources = graph.links_to_matching(request, lambda name: name.startswith(u'LinkGraphTestT'))
+        assert sources == set([u'LinkGraphTestPage'])
+
+    def testChanges(self):
+        request = self.request
+        graph = request.cfg.cache.linkgraph
+        assert graph.links_to(request, u'LinkGraphTestTarget') == set([u'LinkGraphTestPage'])
+
+        PageEditor(request, u'LinkGraphTestPage').saveText(u'LinkGraphTestWanted', 0)
+        assert graph.links_to(request, u'LinkGraphTestTarget') == set()
+
+        PageEditor(request, u'LinkGraphTestTarget').renamePage(u'LinkGraphTestRenamed')
+        assert graph.links_from(request, u'LinkGraphTestTarget') == []
+        assert graph.links_from(request, u'LinkGraphTestRenamed') == [u'LinkGraphTestPage']
+        assert graph.links_to(request, u'LinkGraphTestPage') == set([u'LinkGraphTestRenamed'])
+
+        PageEditor(request, u'LinkGraphTestRenamed', do_editor_backup=0).deletePage()
+        assert graph.links_to(request, u'LinkGraphTestPage') == set()
+
+    def testPersisted(self):
+        request = self.request
+        graph = request.cfg.cache.linkgraph
+        graph.refresh(request)
+        graph.save(request)
+        # a new process loads the saved graph and the edit-log changes
+        PageEditor(request, u'LinkGraphTestPage').saveText(u'LinkGraphTestWanted', 0)
+        graph = LinkGraph()
+        assert graph.links_to(request, u'LinkGraphTestTarget') == set()
+        assert graph.links_to(request, u'LinkGraphTestPage') == set([u'LinkGraphTestTarget'])
+        assert graph.changes == 1
+
+
+coverage_modules = ['MoinMoin.linkgraph']
@@ -0,0 +1,113 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.parseevents Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import caching, wikiutil
+from MoinMoin.action import AttachFile
+from MoinMoin.Page import Page
+from MoinMoin._tests import become_trusted, create_page, nuke_page
+
+text = u"""= Heading =
+Some ''text'' with a WikiLink and a [[Link|link]].
+
+ * item <<Date(0)>>
+ * item {{{code}}}
+
+||cell||cell||
+
+{{{#!python
+print 'code'
+}}}
+"""
+
+
+class TestParseEvents:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageForParseEvents'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+        create_page(self.request, self.pagename, text)
+        self.caching_parse_events = self.request.cfg.caching_parse_events
+
+    def teardown_method(self, method):
+        self.request.cfg.caching_parse_events = self.caching_parse_events
+        nuke_page(self.request, self.pagename)
+
+    def _remove_caches(self):
+        page = Page(self.request, self.pagename)
+        for key in ('text_html', 'pagelinks', 'parseevents'):
+            caching.CacheEntry(self.request, page, key, scope='item').remove()
+
+    def _get_cache(self):
+        page = Page(self.request, self.pagename)
+        return caching.CacheEntry(self.request, page, 'parseevents', scope='item', use_pickle=True)
+
+    def _render(self, formatter_name):
+        request = self.request
+        Formatter = wikiutil.importPlugin(request.cfg, 'formatter', formatter_name, 'Formatter')
+        formatter = Formatter(request)
+        page = Page(request, self.pagename, formatter=formatter)
+        request.page = page
+        request.reset()
+        request.formatter = formatter
+        # make the compiled page cache again
+        caching.CacheEntry(request, page, 'text_html', scope='item').remove()
+        return request.redirectedOutput(page.send_page, content_only=1)
+
+    def _render_both(self, formatter_name):
+        self.request.cfg.caching_parse_events = []
+        self._remove_caches()
+        parsed = self._render(formatter_name)
+        assert not self._get_cache().exists()
+        self.request.cfg.caching_parse_events = [formatter_name]
+        replayed = self._render(formatter_name)
+        return parsed, replayed
+
+    def testSameOutput(self):
+        """ parseevents: formatters get the same output from replayed events """
+        for formatter_name in ('text_html', 'text_plain'):
+            parsed, replayed = self._render_both(formatter_name)
+            assert 'code' in replayed
+            assert parsed == replayed
+
+    def testSameLinks(self):
+        """ parseevents: pagelinks formatter gets the same links """
+        request = self.request
+        request.cfg.caching_parse_events = []
+        self._remove_caches()
+        parsed = Page(request, self.pagename).parsePageLinks(request)
+        request.cfg.caching_parse_events = ['pagelinks']
+        replayed = Page(request, self.pagename).parsePageLinks(request)
+        assert u'WikiLink' in replayed
+        assert parsed == replayed
+
+    def testCached(self):
+        """ parseevents: events are kept in the cache and replayed from it """
+        self._render_both('text_plain')
+        cache = self._get_cache()
+        data = cache.content()
+        assert data['code_version'] == self.request.cfg.cache.code_version
+        data['events'] = [u'cached output']
+        cache.update(data)
+        assert self._render('text_plain') == u'cached output'
+
+        # a new revision of the page is parsed again
+        create_page(self.request, self.pagename, u'new text')
+        assert u'new text' in self._render('text_plain')
+
+    def testAttachmentAdded(self):
+        """ parseevents: events are recorded again when attachments change """
+        request = self.request
+        create_page(request, self.pagename, u'{{attachment:doc.pdf}}')
+        request.cfg.caching_parse_events = ['text_html']
+        assert 'do=upload_form' in self._render('text_html')
+        AttachFile.add_attachment(request, self.pagename, u'doc.pdf', 'content')
+        result = self._render('text_html')
+        assert 'do=upload_form' not in result
+        assert '<object' in result
+
+coverage_modules = ['MoinMoin.parseevents']
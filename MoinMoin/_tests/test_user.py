@@ -280,6 +280,54 @@ class TestLoginWithPassword(object):
         theuser = user.User(self.request, uid)
         assert theuser.email == email
 
+    def testLookupIndex(self):
+        """ user: the lookup index follows saved and removed profiles """
+        name = u'__Lookup Index User__'
+        self.createUser(name, name, email='__LookupIndex@moinhost')
+        uid = self.user.id
+        assert user.getUserId(self.request, name) == uid
+        assert user.get_by_email_address(self.request, '__LOOKUPINDEX@moinhost').id == uid
+
+        self.user.email = '__OtherLookupIndex@moinhost'
+        self.user.save()
+        assert user.get_by_email_address(self.request, '__LookupIndex@moinhost') is None
+        assert user.get_by_email_address(self.request, '__OtherLookupIndex@moinhost').id == uid
+
+        # profiles not saved by moin are only found after a rebuild,
+        # a lookup miss does not read all profiles
+        path = os.path.join(self.request.cfg.user_dir, '1234567890.123.456')
+        f = open(path, 'w')
+        f.write('name=__Unindexed User__\n')
+        f.close()
+        try:
+            assert user.getUserId(self.request, u'__Unindexed User__') is None
+            user.rebuildLookupCaches(self.request)
+            assert user.getUserId(self.request, u'__Unindexed User__') == '1234567890.123.456'
+            assert user.getUserId(self.request, name) == uid
+        finally:
+            os.remove(path)
+
+        self.user.remove()
+        assert user.getUserId(self.request, name) is None
+
+    def testLookupDuplicateEmail(self):
+        """ user: the profile saved last wins for duplicate values """
+        email = '__LookupDuplicate@moinhost'
+        # build the index, saving profiles updates it
+        assert user.get_by_email_address(self.request, email) is None
+        self.createUser(u'__Lookup Duplicate User__', u'secret', email=email)
+        first = self.user
+        other = user.User(self.request)
+        other.name = u'__Other Lookup Duplicate User__'
+        other.email = email
+        other.save()
+        try:
+            assert user.get_by_email_address(self.request, email).id == other.id
+            first.save()
+            assert user.get_by_email_address(self.request, email).id == first.id
+        finally:
+            other.remove()
+
     # Helpers ---------------------------------------------------------
 
     def createUser(self, name, password, pwencoded=False, email=None):
@@ -10,6 +10,7 @@
 import py
 
 from MoinMoin import config, wikiutil
+from MoinMoin._tests import become_trusted, create_page, nuke_page
 
 from werkzeug import MultiDict
 
@@ -84,6 +85,49 @@ class TestInterWiki:
         for (baseurl, pagename), url in tests:
             assert wikiutil.join_wiki(baseurl, pagename) == url
 
+    def testLoadWikimap(self):
+        """ wikiutil: the interwiki map follows changes of the InterWikiMap page """
+        request = self.request
+        become_trusted(request)
+        script_root = request.script_root
+        assert wikiutil.resolve_interwiki(request, 'MoinMoin', 'FrontPage') == (
+            'MoinMoin', 'http://moinmo.in/', 'FrontPage', False)
+        assert wikiutil.resolve_interwiki(request, 'TestTagWiki', 'FrontPage')[3]
+        try:
+            create_page(request, wikiutil.INTERWIKI_PAGE,
+                        u"TestTagWiki http://example.org/\nTestTagNoUrl\nMoinMoin http://example.net/\n")
+            # the edit-log is checked once per request
+            assert 'TestTagWiki' not in wikiutil.load_wikimap(request)
+            request.reset()
+            intermap = wikiutil.load_wikimap(request)
+            assert intermap['TestTagWiki'] == 'http://example.org/'
+            assert intermap['TestTagNoUrl'] == script_root + '/InterWiki'
+            # the page comes after the intermap files
+            assert intermap['MoinMoin'] == 'http://example.net/'
+            assert intermap['Self'] == script_root + '/'
+        finally:
+            nuke_page(request, wikiutil.INTERWIKI_PAGE)
+        request.reset()
+        intermap = wikiutil.load_wikimap(request)
+        assert 'TestTagWiki' not in intermap
+        assert intermap['MoinMoin'] == 'http://moinmo.in/'
+
+    def testMapURL(self):
+        """ wikiutil: URLs are mapped with the longest matching prefix """
+        cfg = self.request.cfg
+        url_mappings = cfg.url_mappings
+        cfg.url_mappings = {'http://example.org/': 'http://a.example.org/',
+                            'http://example.org/b/': 'http://b.example.org/', }
+        try:
+            tests = [('http://example.org/b/c', 'http://b.example.org/c'),
+                     ('http://example.org/c', 'http://a.example.org/c'),
+                     ('http://example.net/c', 'http://example.net/c'),
+                    ]
+            for url, mapped in tests:
+                assert wikiutil.mapURL(self.request, url) == mapped
+        finally:
+            cfg.url_mappings = url_mappings
+
 
 class TestSystemPage:
     systemPages = (
@@ -40,3 +40,29 @@ class TestApplication:
                 for needle in ('new empty page', 'page template'):
                     assert needle in output
             yield _test_
+
+    def testWarm(self):
+        """ wsgiapp: warm-up builds the per-process state and reports timings """
+        app = wsgiapp.Application(self.request.cfg.__class__)
+        app.warm()
+        assert len(app.warm_timings) == 1
+        url, timings = app.warm_timings[0]
+        components = [name for name, seconds in timings]
+        assert components == ['config', 'init', 'plugins', 'i18n', 'interwiki', 'theme',
+                              'itemcache', 'indexes', 'page', 'total']
+
+        cfg = self.request.cfg
+        wsgiapp.warm(self.request)
+        assert 'action' in cfg._site_plugin_lists
+        assert hasattr(cfg.cache, 'interwiki_list')
+
+    def testWarmWithoutSession(self):
+        """ wsgiapp: warm-up does not open the session store """
+        class SessionService:
+            def get_session(self, request, sid=None):
+                raise AssertionError('session store used')
+        class Config(self.request.cfg.__class__):
+            session_service = SessionService()
+        app = wsgiapp.Application(Config)
+        app.warm()
+        assert len(app.warm_timings) == 1
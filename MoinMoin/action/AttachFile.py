@@ -27,7 +27,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, time, zipfile, errno, datetime
+import os, time, zipfile, errno
 from StringIO import StringIO
 import tarfile
 
@@ -43,6 +43,7 @@ import mimetypes
 from MoinMoin import config, packages
 from MoinMoin.Page import Page
 from MoinMoin.util import filesys, timefuncs
+from MoinMoin.web.utils import make_conditional
 from MoinMoin.security.textcha import TextCha
 from MoinMoin.events import FileAttachedEvent, FileRemovedEvent, send_event
 
@@ -985,11 +986,8 @@ def _do_box(pagename, request):
     if not filename:
         return # error msg already sent in _access_file
 
-    timestamp = datetime.datetime.fromtimestamp(os.path.getmtime(fpath))
-    if_modified = request.if_modified_since
-    if if_modified and if_modified >= timestamp:
-        request.status_code = 304
-    else:
+    etag, timestamp = _file_validators(fpath)[:2]
+    if not make_conditional(request, etag, timestamp):
         ci = ContainerItem(request, pagename, filename)
         filename = wikiutil.taintfilename(request.values['member'])
         mt = wikiutil.MimeType(filename=filename)
@@ -1009,7 +1007,6 @@ def _do_box(pagename, request):
         now = time.time()
         request.headers['Date'] = http_date(now)
         request.headers['Content-Type'] = content_type
-        request.headers['Last-Modified'] = http_date(timestamp)
         request.headers['Expires'] = http_date(now - 365 * 24 * 3600)
         #request.headers['Content-Length'] = os.path.getsize(fpath)
         content_dispo_string = '%s; filename="%s"' % (content_dispo, filename_enc)
@@ -1019,6 +1016,14 @@ def _do_box(pagename, request):
         request.send_file(ci.get(filename))
 
 
+def _file_validators(fpath):
+    """ Get the ETag (from size, mtime and inode), the modification time and
+        the size of an attachment file
+    """
+    st = os.stat(fpath)
+    etag = '%x-%x-%x' % (st.st_size, int(st.st_mtime * 1000000), st.st_ino)
+    return etag, st.st_mtime, st.st_size
+
 def _do_get(pagename, request):
     _ = request.getText
 
@@ -1029,11 +1034,8 @@ def _do_get(pagename, request):
         request.status_code = 404
         return # error msg already sent in _access_file
 
-    timestamp = datetime.datetime.fromtimestamp(os.path.getmtime(fpath))
-    if_modified = request.if_modified_since
-    if if_modified and if_modified >= timestamp:
-        request.status_code = 304
-    else:
+    etag, timestamp, size = _file_validators(fpath)
+    if not make_conditional(request, etag, timestamp):
         mt = wikiutil.MimeType(filename=filename)
         content_type = mt.content_type()
         mime_type = mt.mime_type()
@@ -1051,14 +1053,13 @@ def _do_get(pagename, request):
         now = time.time()
         request.headers['Date'] = http_date(now)
         request.headers['Content-Type'] = content_type
-        request.headers['Last-Modified'] = http_date(timestamp)
         request.headers['Expires'] = http_date(now - 365 * 24 * 3600)
-        request.headers['Content-Length'] = os.path.getsize(fpath)
+        request.headers['Content-Length'] = str(size)
         content_dispo_string = '%s; filename="%s"' % (content_dispo, filename_enc)
         request.headers['Content-Disposition'] = content_dispo_string
 
-        # send data
-        request.send_file(open(fpath, 'rb'))
+        # send data (or the requested byte ranges of it)
+        request.send_file(open(fpath, 'rb'), length=size)
 
 
 def _do_install(pagename, request):
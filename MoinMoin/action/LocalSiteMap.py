@@ -106,7 +106,7 @@ class PageTreeBuilder:
     def new_kids(self, name):
         # does not recurse
         kids = []
-        for child in Page(self.request, name).getPageLinks(self.request):
+        for child in self.request.cfg.cache.linkgraph.links_from(self.request, name):
             if self.is_ok(child):
                 kids.append(child)
         return kids
@@ -303,6 +303,7 @@ def do_refresh(pagename, request):
     from MoinMoin import caching
     caching.CacheEntry(request, arena, key, scope='item').remove()
     caching.CacheEntry(request, arena, "pagelinks", scope='item').remove()
+    caching.CacheEntry(request, arena, "parseevents", scope='item').remove()
     do_show(pagename, request)
 
 def do_goto(pagename, request):
@@ -66,4 +66,82 @@ class TestAttachFile:
 
         assert file_exists
 
+    def test_get_conditional(self):
+        """Test if do=get answers conditional requests with 304"""
+        become_trusted(self.request)
+        filename = "AutoCreatedSillyAttachment.txt"
+        create_page(self.request, self.pagename, u"Foo!")
+        AttachFile.add_attachment(self.request, self.pagename, filename, "Test content", True)
+        url = '/%s?action=AttachFile&do=get&target=%s' % (self.pagename, filename)
+        try:
+            appiter, status, headers = self.client.get(url)
+            headers = dict(headers)
+            assert status[:3] == '200'
+            assert ''.join(appiter) == "Test content"
+            assert 'ETag' in headers and 'Last-Modified' in headers
+
+            appiter, status, dummy = self.client.get(url, headers=[('If-None-Match', headers['ETag'])])
+            assert status[:3] == '304'
+            assert ''.join(appiter) == ''
+            appiter, status, dummy = self.client.get(url, headers=[('If-Modified-Since', headers['Last-Modified'])])
+            assert status[:3] == '304'
+
+            AttachFile.add_attachment(self.request, self.pagename, filename, "Other content", True)
+            appiter, status, dummy = self.client.get(url, headers=[('If-None-Match', headers['ETag'])])
+            assert status[:3] == '200'
+            assert ''.join(appiter) == "Other content"
+        finally:
+            nuke_page(self.request, self.pagename)
+
+    def test_get_ranges(self):
+        """Test if do=get answers Range requests"""
+        become_trusted(self.request)
+        filename = "AutoCreatedSillyAttachment.txt"
+        data = "0123456789" * 10
+        create_page(self.request, self.pagename, u"Foo!")
+        AttachFile.add_attachment(self.request, self.pagename, filename, data, True)
+        url = '/%s?action=AttachFile&do=get&target=%s' % (self.pagename, filename)
+        def get(headers):
+            appiter, status, headers = self.client.get(url, headers=headers)
+            return ''.join(appiter), status[:3], dict(headers)
+        try:
+            output, status, headers = get([])
+            assert status == '200'
+            assert headers['Accept-Ranges'] == 'bytes'
+            assert output == data
+
+            output, status, headers = get([('Range', 'bytes=10-14')])
+            assert status == '206'
+            assert output == data[10:15]
+            assert headers['Content-Range'] == 'bytes 10-14/100'
+            assert headers['Content-Length'] == '5'
+
+            output, status, headers = get([('Range', 'bytes=-3')])
+            assert status == '206'
+            assert output == data[-3:]
+            output, status, headers = get([('Range', 'bytes=95-')])
+            assert output == data[95:]
+
+            output, status, headers = get([('Range', 'bytes=0-1,50-52')])
+            assert status == '206'
+            assert headers['Content-Type'].startswith('multipart/byteranges; boundary=')
+            assert int(headers['Content-Length']) == len(output)
+            assert 'Content-Range: bytes 0-1/100\r\n\r\n01\r\n' in output
+            assert 'Content-Range: bytes 50-52/100\r\n\r\n012\r\n' in output
+
+            output, status, headers = get([('Range', 'bytes=200-300')])
+            assert status == '416'
+            assert headers['Content-Range'] == 'bytes */100'
+
+            # If-Range not matching the ETag: send the complete file
+            output, status, headers = get([('Range', 'bytes=10-14'), ('If-Range', '"other"')])
+            assert status == '200'
+            assert output == data
+            etag = headers['ETag']
+            output, status, headers = get([('Range', 'bytes=10-14'), ('If-Range', etag)])
+            assert status == '206'
+            assert output == data[10:15]
+        finally:
+            nuke_page(self.request, self.pagename)
+
 coverage_modules = ['MoinMoin.action.AttachFile']
@@ -20,5 +20,6 @@ def execute(pagename, request):
     from MoinMoin import caching
     caching.CacheEntry(request, arena, key, scope='item').remove()
     caching.CacheEntry(request, arena, "pagelinks", scope='item').remove()
+    caching.CacheEntry(request, arena, "parseevents", scope='item').remove()
     request.page.send_page()
 
@@ -10,13 +10,18 @@
 
 import os
 import shutil
+import struct
 import tempfile
+import zlib
+from collections import OrderedDict
+from StringIO import StringIO
+from threading import Lock
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
 from MoinMoin import config
-from MoinMoin.util import filesys, lock, pickle, PICKLE_PROTOCOL
+from MoinMoin.util import filesys, lock, pickle, PICKLE_PROTOCOL, segmentstore
 
 
 class CacheError(Exception):
@@ -24,6 +29,96 @@ class CacheError(Exception):
     pass
 
 
+# Every cache file starts with a header with the length and the crc32 of the
+# cached data, so readers can detect torn or truncated files.
+HEADER = struct.Struct('<8sQI') # magic, data length, crc32 of data
+HEADER_MAGIC = 'MOINCF01'
+
+# Writers write to a temporary file and rename it over the cache file. On
+# POSIX, this replaces the file atomically, so readers see either the old or
+# the new file and do not need to lock.
+LOCKFREE_READS = os.name == 'posix'
+
+
+class MemoryCache:
+    """ LRU memory tier in front of the cache files
+
+    Keeps the content of recently read cache files, so reading them again
+    does not need to open, read and decode the file. Entries are validated
+    using CacheEntry.uid(), so a changed cache file is always read again,
+    no matter which process changed it. One instance per process lives in
+    cfg.cache.caching_memory.
+
+    Encoded (unicode) and plain content is kept as returned by content(),
+    pickled content is kept pickled: callers may modify the objects they
+    get, so everybody needs to get his own copy.
+    """
+    def __init__(self, size):
+        """
+        @param size: maximum total size of the cached content in bytes
+        """
+        self.size = size
+        self.max_item_size = size / 8 # don't let one big item flush the cache
+        self.used = 0
+        self.items = OrderedDict() # key -> (uid, data, size), oldest first
+        self.lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, uid):
+        """ Return the cached data for key if it is still valid, None otherwise """
+        self.lock.acquire()
+        try:
+            try:
+                item = self.items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            if uid is None or item[0] != uid:
+                self.used -= item[2]
+                self.misses += 1
+                return None
+            self.items[key] = item # now the most recently used
+            self.hits += 1
+            return item[1]
+        finally:
+            self.lock.release()
+
+    def put(self, key, uid, data, size):
+        """ Remember data for key, evicting the least recently used items """
+        if uid is None or size > self.max_item_size:
+            return
+        self.lock.acquire()
+        try:
+            item = self.items.pop(key, None)
+            if item is not None:
+                self.used -= item[2]
+            self.items[key] = uid, data, size
+            self.used += size
+            while self.used > self.size:
+                key, item = self.items.popitem(last=False)
+                self.used -= item[2]
+                self.evictions += 1
+        finally:
+            self.lock.release()
+
+    def remove(self, key):
+        self.lock.acquire()
+        try:
+            item = self.items.pop(key, None)
+            if item is not None:
+                self.used -= item[2]
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.items.clear()
+            self.used = 0
+        finally:
+            self.lock.release()
+
+
 def get_arena_dir(request, arena, scope):
     if scope == 'item': # arena is a Page instance
         # we could move cache out of the page directory and store it to cache_dir
@@ -40,6 +135,21 @@ def get_arena_dir(request, arena, scope):
     return None
 
 
+def get_segment_store(request, arena, key, scope):
+    """ Return the segment store used for this cache entry or None.
+
+        If cfg.caching_segment_store is enabled, the item scope caches of
+        the formats in cfg.caching_formats (e.g. the compiled text_html page
+        caches) are kept in one segment store per wiki and format instead
+        of one file per page.
+    """
+    cfg = request.cfg
+    if scope == 'item' and cfg.caching_segment_store and key in cfg.caching_formats:
+        path = os.path.join(cfg.cache_dir, cfg.siteid, '__segments__', key)
+        return segmentstore.get_store(path)
+    return None
+
+
 def get_cache_list(request, arena, scope):
     arena_dir = get_arena_dir(request, arena, scope)
     try:
@@ -48,6 +158,59 @@ def get_cache_list(request, arena, scope):
         return []
 
 
+def _code_version_path(cfg):
+    return os.path.join(cfg.cache_dir, cfg.siteid, '__code_version__')
+
+
+def get_code_version(cfg):
+    """ Return the version of the code and configuration a process uses.
+
+        The compiled page caches (see formatter.text_python) embed it and
+        are not used any more if it differs. It is the newest of the mtimes
+        of the MoinMoin directory and of the wiki config and of the time of
+        the last invalidate_code_version call, computed when the config is
+        loaded (cfg.cache.code_version), so using a cache does not need to
+        stat anything.
+
+        @param cfg: the wiki config
+        @rtype: int
+    """
+    version = max(int(os.path.getmtime(cfg.moinmoin_dir)), int(cfg.cfg_mtime or 0))
+    try:
+        f = open(_code_version_path(cfg))
+        try:
+            version = max(version, int(f.read()))
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        pass
+    return version
+
+
+def invalidate_code_version(cfg):
+    """ Make processes started afterwards use a new code version, so they
+        do not use the compiled page caches made before (e.g. after
+        deploying new code).
+
+        @param cfg: the wiki config
+        @rtype: int
+        @return: the new code version
+    """
+    import time
+    version = max(int(time.time()), get_code_version(cfg) + 1)
+    path = _code_version_path(cfg)
+    dirname = os.path.dirname(path)
+    if not os.path.isdir(dirname):
+        filesys.makeDirs(dirname)
+    fd, tmpname = tempfile.mkstemp('.tmp', '__code_version__', dirname)
+    try:
+        os.write(fd, str(version))
+    finally:
+        os.close(fd)
+    filesys.rename(tmpname, path)
+    return version
+
+
 class CacheEntry:
     def __init__(self, request, arena, key, scope='wiki', do_locking=True,
                  use_pickle=False, use_encode=False):
@@ -70,36 +233,64 @@ class CacheEntry:
         self.locking = do_locking
         self.use_pickle = use_pickle
         self.use_encode = use_encode
-        self.arena_dir = get_arena_dir(request, arena, scope)
-        if not os.path.exists(self.arena_dir):
-            os.makedirs(self.arena_dir)
-        self._fname = os.path.join(self.arena_dir, key)
+        self._store = get_segment_store(request, arena, key, scope)
+        if self._store is not None:
+            self._store_key = arena.page_name_fs
+            self._record = None # (data, mtime) as read from the store
+            self.arena_dir = self._fname = None
+        else:
+            self.arena_dir = get_arena_dir(request, arena, scope)
+            if not os.path.exists(self.arena_dir):
+                os.makedirs(self.arena_dir)
+            self._fname = os.path.join(self.arena_dir, key)
+        if self._store is None:
+            self._memory = getattr(request.cfg.cache, 'caching_memory', None)
+        else:
+            self._memory = None # the segment store is memory-mapped anyway
 
         # used by file-like api:
         self._lock = None  # either a read or a write lock
         self._fileobj = None  # open cache file object
         self._tmp_fname = None  # name of temporary file (used for write)
         self._mode = None  # mode of open file object
+        self._length = None  # data length from header (read) / written (write)
+        self._pos = 0  # how much data we have read
+        self._crc = 0  # crc32 of the data read / written so far
+        self._crc_expected = None  # crc32 of the data from header (read)
 
 
     def _filename(self):
         # DEPRECATED - please use file-like api
         return self._fname
 
+    def _get_record(self):
+        """ Return (data, mtime) of the entry in the segment store or None """
+        if self._record is None:
+            self._record = self._store.get(self._store_key)
+        return self._record
+
     def exists(self):
+        if self._store is not None:
+            return self._get_record() is not None
         return os.path.exists(self._fname)
 
     def mtime(self):
         # DEPRECATED for checking a changed on-disk cache, please use
         # self.uid() for this, see below
+        if self._store is not None:
+            record = self._get_record()
+            return record and record[1] or 0
         try:
             return os.path.getmtime(self._fname)
         except (IOError, OSError):
             return 0
 
     def size(self):
+        if self._store is not None:
+            record = self._get_record()
+            return record and len(record[0]) or 0
         try:
-            return os.path.getsize(self._fname)
+            return max(os.path.getsize(self._fname) - HEADER.size, 0)
         except (IOError, OSError):
             return 0
 
@@ -108,6 +299,9 @@ class CacheEntry:
 
             See docstring of MoinMoin.util.filesys.fuid for details.
         """
+        if self._store is not None:
+            # the store keeps the exact time of each update
+            return self.mtime() or None
         return filesys.fuid(self._fname)
 
     def needsUpdate(self, filename, attachdir=None):
@@ -116,7 +310,12 @@ class CacheEntry:
         #    return 1
 
         try:
-            ctime = os.path.getmtime(self._fname)
+            if self._store is not None:
+                ctime = self.mtime()
+                if not ctime:
+                    return 1
+            else:
+                ctime = os.path.getmtime(self._fname)
             ftime = os.path.getmtime(filename)
         except os.error:
             return 1
@@ -140,9 +339,15 @@ class CacheEntry:
 
         Note:
          * .open() calls .lock(), .close() calls .unlock() if do_locking is True.
+           On POSIX, this is only done for writing, readers do not lock
+           (see LOCKFREE_READS).
          * if you need to do a read-modify-write, you want to use a CacheEntry
            with do_locking=False and manually call .lock('w') and .unlock().
+         * entries kept in a segment store don't need locks, the store
+           does its own locking for writes.
         """
+        if self._store is not None:
+            return
         lock_dir = os.path.join(self.arena_dir, '__lock__')
         if 'r' in mode:
             _lock = lock.LazyReadLock(lock_dir, 60.0)
@@ -193,12 +398,24 @@ class CacheEntry:
             mode += 'b'  # we want to use binary mode, ever!
         self._mode = mode  # for self.close()
 
-        if self.locking:
+        if self._store is not None:
+            if 'r' in mode:
+                record = self._get_record()
+                if record is None:
+                    raise CacheError("no cache entry %r in %s" % (self._store_key, self._store.path))
+                self._fileobj = StringIO(record[0])
+            else:
+                self._fileobj = StringIO()
+            return
+
+        if self.locking and not ('r' in mode and LOCKFREE_READS):
             self.lock(mode)
+        self._pos = self._crc = 0
         try:
             if 'r' in mode:
                 filename = self._fname
                 self._fileobj = open(filename, mode, bufsize)
+                self._read_header()
             elif 'w' in mode:
                 # we do not write content to old inode, but to a new file
                 # so we don't need to lock when we just want to read the file
@@ -207,20 +424,44 @@ class CacheEntry:
                 fd, filename = tempfile.mkstemp('.tmp', self.key, self.arena_dir)
                 self._tmp_fname = filename
                 self._fileobj = os.fdopen(fd, mode, bufsize)
-        except IOError, err:
+                self._length = 0
+                self._fileobj.write(HEADER.pack(HEADER_MAGIC, 0, 0)) # placeholder, see close()
+        except (IOError, CacheError), err:
+            if self._fileobj:
+                self._fileobj.close()
+                self._fileobj = None
+            if self.locking:
+                self.unlock()
             if 'w' in mode:
                 # IOerror for 'r' can be just a non-existing file, do not log that,
                 # but if open fails for 'w', we likely have some bigger problem:
                 logging.error(str(err))
             raise CacheError(str(err))
 
+    def _read_header(self):
+        """ read and check the header of the cache file opened for reading """
+        header = self._fileobj.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise CacheError("cache file %s is truncated" % self._fname)
+        magic, self._length, self._crc_expected = HEADER.unpack(header)
+        if magic != HEADER_MAGIC:
+            raise CacheError("cache file %s has no valid header" % self._fname)
+        if os.fstat(self._fileobj.fileno()).st_size != HEADER.size + self._length:
+            raise CacheError("cache file %s has wrong size" % self._fname)
+
     def read(self, size=-1):
         """ read data from cache file
 
         @param size: how many bytes to read (default: -1 == everything)
         @return: read data (str)
         """
-        return self._fileobj.read(size)
+        data = self._fileobj.read(size)
+        if self._store is None:
+            self._pos += len(data)
+            self._crc = zlib.crc32(data, self._crc)
+            if self._pos == self._length and self._crc & 0xffffffff != self._crc_expected:
+                raise CacheError("cache file %s has wrong checksum" % self._fname)
+        return data
 
     def write(self, data):
         """ write data to cache file
@@ -228,11 +469,27 @@ class CacheEntry:
         @param data: write data (str)
         """
         self._fileobj.write(data)
+        if self._store is None:
+            self._length += len(data)
+            self._crc = zlib.crc32(data, self._crc)
 
     def close(self):
         """ close cache file (and release lock, if any) """
+        if self._store is not None:
+            if self._fileobj:
+                if 'w' in self._mode:
+                    try:
+                        self._store.put(self._store_key, self._fileobj.getvalue())
+                    except segmentstore.SegmentStoreError, err:
+                        raise CacheError(str(err))
+                    self._record = None
+                self._fileobj = None
+            return
         try:
             if self._fileobj:
+                if 'w' in self._mode:
+                    self._fileobj.seek(0)
+                    self._fileobj.write(HEADER.pack(HEADER_MAGIC, self._length, self._crc & 0xffffffff))
                 self._fileobj.close()
                 self._fileobj = None
                 if 'w' in self._mode:
@@ -272,21 +529,44 @@ class CacheEntry:
 
     def content(self):
         # no file-like api yet, we implement it when we need it
+        memory = self._memory
+        if memory is not None:
+            memory_key = self._fname, self.use_encode
+            uid = self.uid()
+            data = memory.get(memory_key, uid)
+            if data is not None:
+                if self.use_pickle:
+                    return pickle.loads(data)
+                return data
         try:
             try:
                 self.open(mode='r')
                 data = self.read()
             finally:
                 self.close()
+            if memory is not None and not self.use_encode:
+                memory.put(memory_key, uid, data, len(data))
             if self.use_pickle:
                 data = pickle.loads(data)
             elif self.use_encode:
+                size = len(data)
                 data = data.decode(config.charset)
+                if memory is not None:
+                    memory.put(memory_key, uid, data, size)
             return data
         except (pickle.UnpicklingError, IOError, EOFError, ValueError), err:
             raise CacheError(str(err))
 
     def remove(self):
+        if self._store is not None:
+            try:
+                self._store.remove(self._store_key)
+            except segmentstore.SegmentStoreError, err:
+                logging.error(str(err))
+            self._record = None
+            return
+        if self._memory is not None:
+            self._memory.remove((self._fname, self.use_encode))
         if self.locking:
             self.lock('w')
         try:
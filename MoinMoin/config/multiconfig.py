@@ -27,7 +27,8 @@ from MoinMoin.events import PageDeletedEvent, PageCopiedEvent
 from MoinMoin.events import PageRevertedEvent, FileAttachedEvent
 import MoinMoin.web.session
 from MoinMoin.packages import packLine
-from MoinMoin.security import AccessControlList
+from MoinMoin.security import AccessControlList, ACLDecisionCache
+from MoinMoin.caching import MemoryCache, get_code_version
 
 _url_re_cache = None
 _farmconfig_mtime = None
@@ -124,6 +125,7 @@ def _makeConfig(name):
         configClass = getattr(module, 'Config')
         cfg = configClass(name)
         cfg.cfg_mtime = max(mtime, _farmconfig_mtime)
+        cfg.cache.code_version = get_code_version(cfg)
         logging.info("using wiki config: %s" % os.path.abspath(module.__file__))
     except ImportError, err:
         logging.exception('Could not import.')
@@ -239,6 +241,13 @@ class ConfigFunctionality(object):
         from MoinMoin.Page import ItemCache
         self.cache.meta = ItemCache('meta')
         self.cache.pagelists = ItemCache('pagelists')
+        from MoinMoin.linkgraph import LinkGraph
+        self.cache.linkgraph = LinkGraph()
+        from MoinMoin.datastruct.backends.wiki_index import GroupDictIndex
+        self.cache.groupdict_index = GroupDictIndex()
+        from MoinMoin.search.wordindex import WordTable
+        self.cache.wordindex = WordTable()
+        self.cache.macrofragment_writes = 0 # see Macro._limit_fragment_cache
 
         if self.config_check_enabled:
             self._config_check()
@@ -386,6 +395,15 @@ class ConfigFunctionality(object):
         self.cache.acl_rights_before = AccessControlList(self, [self.acl_rights_before])
         self.cache.acl_rights_default = AccessControlList(self, [self.acl_rights_default])
         self.cache.acl_rights_after = AccessControlList(self, [self.acl_rights_after])
+        if self.acl_cache_size:
+            self.cache.acl_decisions = ACLDecisionCache(self.acl_cache_size, self.acl_cache_ttl)
+        else:
+            self.cache.acl_decisions = None
+        if self.caching_memory_size:
+            self.cache.caching_memory = MemoryCache(self.caching_memory_size)
+        else:
+            self.cache.caching_memory = None
+        self.cache.code_version = get_code_version(self)
 
         action_prefix = self.url_prefix_action
         if action_prefix is not None and action_prefix.endswith('/'): # make sure there is no trailing '/'
@@ -405,6 +423,9 @@ class ConfigFunctionality(object):
             secret_key_names.append('jabberbot')
         if self.textchas:
             secret_key_names.append('security/textcha')
+        session_secret_key_name = getattr(self.session_service, 'secret_key_name', None)
+        if session_secret_key_name:
+            secret_key_names.append(session_secret_key_name)
 
         secret_min_length = 10
         if isinstance(self.secrets, str):
@@ -1099,7 +1120,13 @@ options_no_group_name = {
   # ==========================================================================
   'various': ('Various', None, (
     ('bang_meta', True, 'if True, enable {{{!NoWikiName}}} markup'),
+    ('caching_anonymous_pages', False, "if True, keep the complete output of page views for anonymous users in the cache until the edit-log or the code version changes (not used with anonymous sessions)"),
+    ('caching_anonymous_pages_hosts', None, "host names (Host header, with port if it is not the default one) caching_anonymous_pages is used for, None for the server name of the web server (SERVER_NAME and SERVER_PORT)"),
     ('caching_formats', ['text_html'], "output formats that are cached; set to [] to turn off caching (useful for development)"),
+    ('caching_macro_fragments', True, "if True, keep the output of macros declaring a FragmentCache (e.g. FullSearch, PageList) in the cache until what it depends on changes"),
+    ('caching_memory_size', 8 * 1024 * 1024, "maximum size (bytes) of the per process memory cache in front of the cache files (0 disables it)"),
+    ('caching_parse_events', ['text_html', 'pagelinks', 'groups'], "formatters that use the formatter calls of one cached parse per page revision instead of parsing the page text again (text_html: when making its compiled page cache); set to [] to turn off. The output of text_plain may differ by a blank line if it is added here."),
+    ('caching_segment_store', False, "True to keep the page caches of the caching_formats in one segment store per wiki and format instead of one file per page (saves inodes and syscalls on big wikis)"),
 
     ('config_check_enabled', False, "if True, check configuration for unknown settings."),
 
@@ -1161,11 +1188,16 @@ options_no_group_name = {
      ],
      'mimetypes that can be embedded by the [[HelpOnMacros/EmbedObject|EmbedObject macro]]'),
 
+    ('parser_fast_scan', True, "if True, the wiki parser scans every line with only those of its rules that can match in it (same output, faster)"),
+
     ('refresh', None,
      "refresh = (minimum_delay_s, targets_allowed) enables use of `#refresh 5 PageName` processing instruction, targets_allowed must be either `'internal'` or `'external'`"),
     ('rss_cache', 60, "suggested caching time for Recent''''''Changes RSS, in second"),
 
     ('search_results_per_page', 25, "Number of hits shown per page in the search results"),
+    ('search_wordindex', True, "True to narrow down the pages the builtin (non-Xapian) search has to search using a word index kept in the cache directory"),
+
+    ('send_file_chunk_size', 64 * 1024, "size (bytes) of the chunks files (e.g. attachments) are read and sent in, if the server does not send them itself (wsgi.file_wrapper)"),
 
     ('siteid', 'default', None),
     ('xmlrpc_overwrite_user', True, "Overwrite authenticated user at start of xmlrpc code"),
@@ -1208,6 +1240,10 @@ options = {
        "ACL that is processed after the on-page/default ACL"),
       ('rights_valid', ['read', 'write', 'delete', 'revert', 'admin'],
        "Valid tokens for right sides of ACL entries."),
+      ('cache_size', 0,
+       "Maximum number of ACL decisions (page, user, right) cached per process, 0 to disable the cache (e.g. 10000). Only page, group page and dict page changes invalidate the cache, see acl_cache_ttl."),
+      ('cache_ttl', 300,
+       "Maximum age of a cached ACL decision in seconds. Changes of user accounts and of groups not defined on wiki pages (e.g. config or LDAP groups) may take that long to show up, also if they revoke rights."),
     )),
 
     'xapian': ('Xapian search', "Configuration of the Xapian based indexed search, see HelpOnXapian.", (
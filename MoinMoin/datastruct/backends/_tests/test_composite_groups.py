@@ -84,5 +84,11 @@ class TestCompositeGroup(object):
         assert u'UserGroup' in self.groups
         assert u'not existing group' not in self.groups
 
+    def test_clashed_groups_with_member(self):
+        john_groups = set(self.groups.groups_with_member(u'JohnDoe'))
+        assert john_groups == set([u'AdminGroup', u'EditorGroup', u'UserGroup'])
+        # AdminGroup of the second backend is hidden
+        assert list(self.groups.groups_with_member(u'TheHacker')) == []
+
 
 coverage_modules = ['MoinMoin.datastruct.backends.composite_groups']
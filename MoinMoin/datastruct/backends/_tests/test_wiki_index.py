@@ -0,0 +1,79 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - MoinMoin.datastruct.backends.wiki_index tests
+
+@copyright: 2026 MoinMoin development team
+@license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin.datastruct import CompositeGroups, ConfigGroups, WikiGroups
+from MoinMoin.datastruct.backends.wiki_index import GroupDictIndex
+from MoinMoin.PageEditor import PageEditor
+from MoinMoin._tests import become_trusted, create_page, nuke_page, wikiconfig
+
+
+class TestGroupDictIndex(object):
+
+    class Config(wikiconfig.Config):
+
+        def groups(self, request):
+            return CompositeGroups(request, WikiGroups(request),
+                                   ConfigGroups(request, {u'ConfigIndexTestGroup': [u'Carol']}))
+
+    pages = [u'IndexTestGroup', u'NestedIndexTestGroup', u'RenamedIndexTestGroup',
+             u'IndexTestDict']
+
+    def setup_method(self, method):
+        request = self.request
+        become_trusted(request)
+        create_page(request, u'IndexTestGroup', u' * Alice\n * NestedIndexTestGroup\n * ConfigIndexTestGroup')
+        create_page(request, u'NestedIndexTestGroup', u' * Bob')
+        create_page(request, u'IndexTestDict', u' One:: 1\n')
+
+    def teardown_method(self, method):
+        for pagename in self.pages:
+            nuke_page(self.request, pagename)
+
+    def testMemberships(self):
+        request = self.request
+        groups = request.groups
+        assert u'Bob' in groups[u'IndexTestGroup']
+        assert u'Carol' in groups[u'IndexTestGroup']
+        assert u'Carol' not in groups[u'NestedIndexTestGroup']
+        assert u'NestedIndexTestGroup' in groups[u'IndexTestGroup']
+
+        assert set(groups.groups_with_member(u'Bob')) == set([u'IndexTestGroup', u'NestedIndexTestGroup'])
+        assert set(groups.groups_with_member(u'Carol')) == set([u'IndexTestGroup', u'ConfigIndexTestGroup'])
+        assert request.dicts[u'IndexTestDict'][u'One'] == u'1'
+
+    def testChanges(self):
+        request = self.request
+        groups = request.groups
+        assert u'Bob' in groups[u'IndexTestGroup']
+
+        PageEditor(request, u'NestedIndexTestGroup').saveText(u' * Dave', 0)
+        assert u'Bob' not in groups[u'IndexTestGroup']
+        assert u'Dave' in groups[u'IndexTestGroup']
+
+        PageEditor(request, u'NestedIndexTestGroup').renamePage(u'RenamedIndexTestGroup')
+        assert u'Dave' not in groups[u'IndexTestGroup']
+        assert u'NestedIndexTestGroup' not in groups
+        assert u'Dave' in groups[u'RenamedIndexTestGroup']
+
+        PageEditor(request, u'IndexTestDict', do_editor_backup=0).deletePage()
+        assert u'IndexTestDict' not in request.dicts
+
+    def testPersisted(self):
+        request = self.request
+        index = request.cfg.cache.groupdict_index
+        index.refresh(request)
+        index.save(request)
+        # a new process loads the saved index and the edit-log changes
+        PageEditor(request, u'NestedIndexTestGroup').saveText(u' * Dave', 0)
+        index = GroupDictIndex()
+        assert index.get_group(request, u'NestedIndexTestGroup') == (frozenset([u'Dave']), frozenset())
+        assert index.groups_with_member(request, u'Dave') == set([u'IndexTestGroup', u'NestedIndexTestGroup'])
+        assert index.changes == 1
+
+
+coverage_modules = ['MoinMoin.datastruct.backends.wiki_index']
@@ -65,6 +65,27 @@ class CompositeGroups(BaseGroupsBackend):
                 return True
         return False
 
+    def groups_with_member(self, member):
+        """
+        List all group names of groups containing <member>, asking every
+        backend for its groups (the wiki groups backend knows them from
+        its index). Groups hidden by a group of the same name in an
+        earlier backend are skipped.
+
+        @param member: member name [unicode]
+        @return: list of group names [unicode]
+        """
+        yielded_groups = set()
+
+        for index, backend in enumerate(self._backends):
+            for group_name in backend.groups_with_member(member):
+                if group_name in yielded_groups:
+                    continue
+                if [other for other in self._backends[:index] if group_name in other]:
+                    continue
+                yield group_name
+                yielded_groups.add(group_name)
+
     def __repr__(self):
         return "<%s backends=%s>" % (self.__class__, self._backends)
 
@@ -11,7 +11,6 @@
 
 import re
 
-from MoinMoin import caching, wikiutil
 from MoinMoin.Page import Page
 from MoinMoin.datastruct.backends import BaseDict, BaseDictsBackend, DictDoesNotExistError
 
@@ -35,30 +34,16 @@ class WikiDict(BaseDict):
         request = self.request
         dict_name = self.name
 
-        page = Page(request, dict_name)
-        if page.exists():
-            arena = 'pagedicts'
-            key = wikiutil.quoteWikinameFS(dict_name)
-            cache = caching.CacheEntry(request, arena, key, scope='wiki', use_pickle=True)
-            try:
-                cache_mtime = cache.mtime()
-                page_mtime = wikiutil.version2timestamp(page.mtime_usecs())
-                # TODO: fix up-to-date check mtime granularity problems.
-                #
-                # cache_mtime is float while page_mtime is integer
-                # The comparision needs to be done on the lowest type of both
-                if int(cache_mtime) > int(page_mtime):
-                    # cache is uptodate
-                    return cache.content()
-                else:
-                    raise caching.CacheError
-            except caching.CacheError:
-                # either cache does not exist, is erroneous or not uptodate: recreate it
-                d = super(WikiDict, self)._load_dict()
-                cache.update(d)
-                return d
+        if self._backend.is_dict_name(dict_name):
+            items = request.cfg.cache.groupdict_index.get_dict(request, dict_name)
+        elif Page(request, dict_name).exists():
+            # not in the index
+            items = super(WikiDict, self)._load_dict()
         else:
+            items = None
+        if items is None:
             raise DictDoesNotExistError(dict_name)
+        return items
 
 
 class WikiDicts(BaseDictsBackend):
@@ -67,7 +52,8 @@ class WikiDicts(BaseDictsBackend):
     _dict_page_parse_regex = re.compile(ur'^ (?P<key>.+?):: (?P<val>.*?) *$', re.MULTILINE | re.UNICODE)
 
     def __contains__(self, dict_name):
-        return self.is_dict_name(dict_name) and Page(self.request, dict_name).exists()
+        index = self.request.cfg.cache.groupdict_index
+        return self.is_dict_name(dict_name) and index.has_dict(self.request, dict_name)
 
     def __getitem__(self, dict_name):
         return WikiDict(request=self.request, name=dict_name, backend=self)
@@ -11,7 +11,8 @@ pattern could be changed (e.g. for non-english languages etc.), see
 HelpOnConfiguration.
 
 MoinMoin.formatter.groups is used to extract group members from a
-page.
+page. The members of all group pages are kept in a per process index
+(see MoinMoin.datastruct.backends.wiki_index).
 
 
 @copyright: 2008 MoinMoin:ThomasWaldmann,
@@ -19,7 +20,6 @@ page.
 @license: GPL, see COPYING for details
 """
 
-from MoinMoin import caching, wikiutil
 from MoinMoin.Page import Page
 from MoinMoin.datastruct.backends import GreedyGroup, BaseGroupsBackend, GroupDoesNotExistError
 from MoinMoin.formatter.groups import Formatter
@@ -31,46 +31,53 @@ class WikiGroup(GreedyGroup):
         request = self.request
         group_name = self.name
 
-        page = Page(request, group_name)
-        if page.exists():
-            arena = 'pagegroups'
-            key = wikiutil.quoteWikinameFS(group_name)
-            cache = caching.CacheEntry(request, arena, key, scope='wiki', use_pickle=True)
-            try:
-                cache_mtime = cache.mtime()
-                page_mtime = wikiutil.version2timestamp(page.mtime_usecs())
-                # TODO: fix up-to-date check mtime granularity problems.
-                #
-                # cache_mtime is float while page_mtime is integer
-                # The comparision needs to be done on the lowest type of both
-                if int(cache_mtime) > int(page_mtime):
-                    # cache is uptodate
-                    return cache.content()
-                else:
-                    raise caching.CacheError
-            except caching.CacheError:
-                # either cache does not exist, is erroneous or not uptodate: recreate it
-                members, member_groups = super(WikiGroup, self)._load_group()
-                cache.update((members, member_groups))
-                return members, member_groups
+        if self._backend.is_group_name(group_name):
+            group = request.cfg.cache.groupdict_index.get_group(request, group_name)
+        elif Page(request, group_name).exists():
+            # not in the index
+            group = super(WikiGroup, self)._load_group()
         else:
+            group = None
+        if group is None:
             raise GroupDoesNotExistError(group_name)
+        return group
+
+    def __contains__(self, member, processed_groups=None):
+        """
+        Check if <member> is part of this group or of a group nested in it,
+        using the groups containing <member> from the index.
+        """
+        if not self._backend.is_group_name(self.name):
+            return super(WikiGroup, self).__contains__(member, processed_groups)
+
+        if processed_groups is None:
+            processed_groups = set()
+
+        processed_groups.add(self.name)
+
+        index = self.request.cfg.cache.groupdict_index
+        return index.has_member(self.request, self.name, member, processed_groups)
 
 
 class WikiGroups(BaseGroupsBackend):
 
     def __contains__(self, group_name):
-        return self.is_group_name(group_name) and Page(self.request, group_name).exists()
+        index = self.request.cfg.cache.groupdict_index
+        return self.is_group_name(group_name) and index.has_group(self.request, group_name)
 
     def __iter__(self):
         """
         To find group pages, request.cfg.cache.page_group_regexact pattern is used.
         """
-        return iter(self.request.rootpage.getPageList(user='', filter=self.page_group_regex.search))
+        return iter(self.request.cfg.cache.groupdict_index.get_group_names(self.request))
 
     def __getitem__(self, group_name):
         return WikiGroup(request=self.request, name=group_name, backend=self)
 
+    def groups_with_member(self, member):
+        index = self.request.cfg.cache.groupdict_index
+        return iter(index.groups_with_member(self.request, member))
+
     def _retrieve_members(self, group_name):
         """
         MoinMoin.formatter.groups is used to extract group members from a page.
@@ -0,0 +1,313 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - index of the wiki group and dict pages
+
+Keeps the members of all group pages and the items of all dict pages, so
+the wiki_groups and wiki_dicts backends do not need to load a cache file
+per group or dict, and the groups containing some member (directly or via
+nested groups) are known without expanding the nested groups again for
+every ACL check.
+
+There is one index per process (cfg.cache.groupdict_index). It is stored
+in the wiki cache together with the edit-log position it is up-to-date
+with. Before answering a query, the group and dict pages saved, renamed,
+copied or deleted since then are reloaded, so changes done by other
+processes are picked up, too.
+
+@copyright: 2026 MoinMoin development team
+@license: GNU GPL, see COPYING for details.
+"""
+
+import threading
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.Page import Page, PageListIndex
+
+
+class GroupDictIndex(object):
+    """ Members of the wiki groups and items of the wiki dicts
+
+        groups maps the names of existing group pages to (members,
+        member_groups) like GreedyGroup keeps them, dicts maps the names of
+        existing dict pages to their items. parents maps member names to
+        the groups listing them; memberships caches the groups containing a
+        member (also via nested groups, see get_memberships) and
+        other_groups the member groups that are no group pages.
+    """
+    arena = 'groupdictindex'
+    key = 'index'
+    version = 1
+    # only save the index after that many page updates
+    save_threshold = 20
+
+    def __init__(self):
+        # re-entrant: loading a group page renders it, which may check ACLs
+        self.lock = threading.RLock()
+        self.stamp = None
+        self.log_pos = None
+        self.changes = 0
+        self.groups = {}
+        self.dicts = {}
+        self.parents = {}
+        self.memberships = {}
+        self.other_groups = None
+
+    def _get_stamp(self, request):
+        cfg = request.cfg
+        return (PageListIndex()._get_stamp(request),
+                cfg.page_group_regex, cfg.page_dict_regex)
+
+    def _add_group(self, group_name, members, member_groups):
+        self.groups[group_name] = (members, member_groups)
+        for member in members | member_groups:
+            self.parents.setdefault(member, set()).add(group_name)
+
+    def _remove_group(self, group_name):
+        members, member_groups = self.groups.pop(group_name, (frozenset(), frozenset()))
+        for member in members | member_groups:
+            groups = self.parents.get(member)
+            if groups is not None:
+                groups.discard(group_name)
+                if not groups:
+                    del self.parents[member]
+
+    def update_pages(self, request, pagenames):
+        """ Reload the group and dict pages among some (changed) pages. """
+        from MoinMoin.datastruct.backends.wiki_dicts import WikiDicts
+        from MoinMoin.datastruct.backends.wiki_groups import WikiGroups
+        groups_backend = WikiGroups(request)
+        dicts_backend = WikiDicts(request)
+        for pagename in set(pagenames):
+            is_group = groups_backend.is_group_name(pagename)
+            is_dict = dicts_backend.is_dict_name(pagename)
+            if not (is_group or is_dict):
+                continue
+            exists = Page(request, pagename).exists()
+            if is_group:
+                self._remove_group(pagename)
+                if exists:
+                    members = frozenset(groups_backend._retrieve_members(pagename))
+                    member_groups = frozenset([member for member in members
+                                               if groups_backend.is_group_name(member)])
+                    self._add_group(pagename, members - member_groups, member_groups)
+                self.memberships, self.other_groups = {}, None
+            if is_dict:
+                self.dicts.pop(pagename, None)
+                if exists:
+                    self.dicts[pagename] = dicts_backend._retrieve_items(pagename)
+            self.changes += 1
+
+    def refresh(self, request):
+        """ Bring the index up-to-date with the edit-log, load or build it
+            if needed.
+        """
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        self.lock.acquire()
+        try:
+            stamp = self._get_stamp(request)
+            if self.log_pos is None or self.stamp != stamp or self.log_pos > elog.size():
+                self.load(request, elog, stamp)
+            else:
+                # set the new position first, in case loading the pages
+                # queries the index
+                self.log_pos, pagenames = elog.news(self.log_pos)
+                self.update_pages(request, pagenames)
+            if self.changes >= self.save_threshold:
+                self.save(request)
+        finally:
+            self.lock.release()
+
+    def load(self, request, elog, stamp):
+        """ Load the index from the cache and update it using the edit-log,
+            rebuild it if the cache is not usable.
+        """
+        self.groups, self.dicts, self.parents, self.memberships = {}, {}, {}, {}
+        self.other_groups = None
+        self.changes = 0
+        self.stamp = stamp
+        cache = caching.CacheEntry(request, self.arena, self.key, scope='wiki', use_pickle=True)
+        try:
+            data = cache.content()
+            if (data['version'] != self.version or data['stamp'] != stamp or
+                data['log_pos'] > elog.size()):
+                raise caching.CacheError
+        except (caching.CacheError, KeyError, TypeError):
+            # get the edit-log position first, so we do not miss changes
+            # happening while we load the pages
+            self.log_pos = elog.size()
+            cfg = request.cfg
+            regex_group, regex_dict = cfg.cache.page_group_regex, cfg.cache.page_dict_regex
+            self.update_pages(request, request.rootpage.getPageList(user='', exists=1,
+                filter=lambda name: regex_group.search(name) or regex_dict.search(name)))
+            self.save(request)
+        else:
+            for group_name, (members, member_groups) in data['groups'].iteritems():
+                self._add_group(group_name, members, member_groups)
+            self.dicts = data['dicts']
+            self.log_pos, pagenames = elog.news(data['log_pos'])
+            self.update_pages(request, pagenames)
+
+    def save(self, request):
+        """ Store the index into the cache. """
+        data = {
+            'version': self.version,
+            'stamp': self.stamp,
+            'log_pos': self.log_pos,
+            'groups': self.groups,
+            'dicts': self.dicts,
+        }
+        cache = caching.CacheEntry(request, self.arena, self.key, scope='wiki', use_pickle=True)
+        try:
+            cache.update(data)
+            self.changes = 0
+        except caching.CacheError, err:
+            logging.warning("could not save group and dict index: %s" % str(err))
+
+    def get_memberships(self, member):
+        """ Get the groups containing member, directly or via nested groups
+            (like GreedyGroup.__contains__ does, for groups of this index)
+
+        The caller has to hold the lock and refresh the index first.
+
+        @param member: member name (may be a group name)
+        @rtype: frozenset
+        @return: group names
+        """
+        memberships = self.memberships.get(member)
+        if memberships is None:
+            result = set()
+            todo = list(self.parents.get(member, []))
+            while todo:
+                group_name = todo.pop()
+                if group_name not in result:
+                    result.add(group_name)
+                    todo.extend(self.parents.get(group_name, []))
+            memberships = self.memberships[member] = frozenset(result)
+        return memberships
+
+    def get_group(self, request, group_name):
+        """ Get the members of a group page
+
+        @param group_name: name of the group page
+        @rtype: tuple
+        @return: (members, member_groups) as frozensets or None if there is
+                 no such group
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return self.groups.get(group_name)
+        finally:
+            self.lock.release()
+
+    def has_group(self, request, group_name):
+        """ Check if there is a group page group_name """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return group_name in self.groups
+        finally:
+            self.lock.release()
+
+    def get_group_names(self, request):
+        """ Get the names of all group pages """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return self.groups.keys()
+        finally:
+            self.lock.release()
+
+    def get_dict(self, request, dict_name):
+        """ Get the items of a dict page
+
+        @param dict_name: name of the dict page
+        @rtype: dict
+        @return: items or None if there is no such dict
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            items = self.dicts.get(dict_name)
+            if items is not None:
+                return dict(items)
+        finally:
+            self.lock.release()
+
+    def has_dict(self, request, dict_name):
+        """ Check if there is a dict page dict_name """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return dict_name in self.dicts
+        finally:
+            self.lock.release()
+
+    def get_other_groups(self):
+        """ Get the member groups that are no group pages, with the group
+            pages containing them
+
+        The caller has to hold the lock and refresh the index first.
+
+        @rtype: dict
+        @return: group name -> group page names (see get_memberships)
+        """
+        if self.other_groups is None:
+            self.other_groups = {}
+            for members, member_groups in self.groups.itervalues():
+                for group_name in member_groups:
+                    if group_name not in self.groups:
+                        self.other_groups[group_name] = self.get_memberships(group_name)
+        return self.other_groups
+
+    def _other_group_has_member(self, request, group_name, member, processed_groups):
+        groups = request.groups
+        return (group_name not in processed_groups and group_name in groups and
+                groups[group_name].__contains__(member, processed_groups))
+
+    def has_member(self, request, group_name, member, processed_groups):
+        """ Check if the group page group_name contains member
+
+        Member groups that are no group pages (e.g. groups of a
+        ConfigGroups backend used together with the wiki groups) are
+        checked using request.groups.
+
+        @param processed_groups: groups which were checked for containment
+                                 before [set], see GreedyGroup.__contains__
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            if group_name in self.get_memberships(member):
+                return True
+            other_groups = [other for other, memberships in self.get_other_groups().iteritems()
+                            if group_name in memberships]
+        finally:
+            self.lock.release()
+        for other in other_groups:
+            if self._other_group_has_member(request, other, member, processed_groups):
+                return True
+        return False
+
+    def groups_with_member(self, request, member):
+        """ Get the group pages containing member
+
+        @param member: member name
+        @rtype: set
+        @return: group names
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            result = set(self.get_memberships(member))
+            other_groups = self.get_other_groups().items()
+        finally:
+            self.lock.release()
+        for other, memberships in other_groups:
+            if not memberships <= result and self._other_group_has_member(request, other, member, set()):
+                result.update(memberships)
+        return result
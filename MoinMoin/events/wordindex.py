@@ -0,0 +1,45 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - updating the word index of the builtin search
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import MoinMoin.events as ev
+
+
+def _get_index(request):
+    if request.cfg.search_wordindex:
+        from MoinMoin.search.wordindex import WordIndex
+        index = WordIndex(request)
+        # the index is built when the builtin search is used the first time
+        if index.exists():
+            return index
+
+
+# the queued pages are indexed by the next search (see WordIndex.candidates)
+
+def handle_renamed(event):
+    """Updates word index when a page changes its name"""
+
+    index = _get_index(event.request)
+    if index:
+        index.update_item(event.old_page.page_name, now=False)
+        index.update_item(event.page.page_name, now=False)
+
+
+def handle_changed(event):
+    """Updates word index when a page is changed, copied or deleted"""
+
+    index = _get_index(event.request)
+    if index:
+        index.update_item(event.page.page_name, now=False)
+
+
+def handle(event):
+    if isinstance(event, ev.PageRenamedEvent):
+        handle_renamed(event)
+    elif isinstance(event, (ev.PageChangedEvent, ev.TrivialPageChangedEvent,
+                            ev.PageCopiedEvent, ev.PageDeletedEvent)):
+        handle_changed(event)
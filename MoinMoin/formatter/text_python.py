@@ -8,7 +8,6 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import time
 from MoinMoin import wikiutil
 
 
@@ -44,21 +43,19 @@ class Formatter:
         """inserts the code into the generated text
         """
         # Automatic invalidation due to moin code changes:
-        # we are called from Page.py, so moincode_timestamp is
-        # mtime of MoinMoin directory. If we detect, that the
-        # saved rendering code is older than the MoinMoin directory
-        # we invalidate it by raising an exception. This avoids
-        # calling functions that have changed by a code update.
+        # cfg.cache.code_version is computed once per process from the
+        # mtimes of the MoinMoin directory and the wiki config (and
+        # "moin maint invalidatecode" runs), see caching.get_code_version.
+        # If the saved rendering code was made with another version, we
+        # invalidate it by raising an exception. This avoids calling
+        # functions that have changed by a code update.
         # Hint: we don't check the mtime of the directories within
-        # MoinMoin, so better do a touch if you only modified stuff
-        # in a subdirectory.
-        waspcode_timestamp = int(time.time())
+        # MoinMoin, so better do a touch (or run invalidatecode) if you
+        # only modified stuff in a subdirectory.
         source = ["""
-moincode_timestamp = int(os.path.getmtime(os.path.dirname(__file__)))
-cfg_mtime = getattr(request.cfg, "cfg_mtime", None)
-if moincode_timestamp > %d or cfg_mtime is None or cfg_mtime > %d:
+if request.cfg.cache.code_version != %d:
     raise Exception("CacheNeedsUpdate")
-""" % (waspcode_timestamp, waspcode_timestamp)]
+""" % self.request.cfg.cache.code_version]
 
 
         text = text.split('<<<>>>', len(self.code_fragments))
@@ -2,9 +2,9 @@
 """
     MoinMoin - internationalization (aka i18n)
 
-    We use Python's gettext module for loading <language>.<domain>.mo files.
-    Domain is "MoinMoin" for MoinMoin distribution code and something else for
-    extension translations.
+    We use memory-mapped <language>.<domain>.mo files (see catalog.py),
+    compiled from the .po files. Domain is "MoinMoin" for MoinMoin
+    distribution code and something else for extension translations.
 
     Public attributes:
         languages -- dict of languages that MoinMoin knows metadata about
@@ -21,11 +21,12 @@
           load translations from there, too.
 
     @copyright: 2001-2004 Juergen Hermann <jh@web.de>,
-                2005-2008 MoinMoin:ThomasWaldmann
+                2005-2008 MoinMoin:ThomasWaldmann,
+                2026 MoinMoin development team
     @license: GNU GPL, see COPYING for details.
 """
 
-import os, gettext, glob
+import os, gettext, glob, threading
 from StringIO import StringIO
 
 from MoinMoin import log
@@ -33,6 +34,7 @@ logging = log.getLogger(__name__)
 
 from MoinMoin import caching
 from MoinMoin.i18n import strings
+from MoinMoin.i18n.catalog import get_catalog
 
 # This is a global for a reason: in persistent environments all languages in
 # use will be cached; Note: you have to restart if you update language data.
@@ -81,9 +83,7 @@ def i18n_init(request):
             for lang_file in glob.glob(po_filename(request, language='*', domain='MoinMoin')): # XXX only MoinMoin domain for now
                 language, domain, ext = os.path.basename(lang_file).split('.')
                 t = Translation(language, domain)
-                f = file(lang_file)
-                t.load_po(f)
-                f.close()
+                t.load_catalog(get_catalog(request, lang_file))
                 logging.debug("loading translation %r" % language)
                 encoding = 'utf-8'
                 _languages[language] = {}
@@ -92,7 +92,7 @@ def i18n_init(request):
                     _languages[language][key] = value.decode(encoding)
                 for pagename in strings.all_pages:
                     try:
-                        pagename_translated = t.translation._catalog[pagename]
+                        pagename_translated = t.raw[pagename]
                     except KeyError:
                         pass
                     else:
@@ -130,9 +130,6 @@ def bot_translations(request):
     for lang_file in glob.glob(po_filename(request, i18n_dir=po_dir, language='*', domain='JabberBot')):
         language, domain, ext = os.path.basename(lang_file).split('.')
         t = Translation(language, domain)
-        f = file(lang_file)
-        t.load_po(f)
-        f.close()
         t.loadLanguage(request, trans_dir=po_dir)
         translations[language] = {}
 
@@ -149,9 +146,15 @@ class Translation(object):
         translation of the MoinMoin distribution. If you do a translation for
         a third-party plugin, you have to use a different and unique value.
     """
+    # write the new formatted translations of a wiki to its cache if there
+    # are that many (otherwise, they are written at the end of the request)
+    formatted_save_threshold = 100
+
     def __init__(self, language, domain='MoinMoin'):
         self.language = language
         self.domain = domain
+        self.unsaved = {} # siteid -> new formatted translations
+        self.unsaved_lock = threading.Lock()
 
     def load_po(self, f):
         """ load the po file """
@@ -167,7 +170,18 @@ class Translation(object):
         """ load the mo file, setup some attributes from metadata """
         # binary files have to be opened in the binary file mode!
         self.translation = gettext.GNUTranslations(f)
-        self.info = info = self.translation.info()
+        self._set_info(self.translation.info())
+
+    def load_catalog(self, catalog):
+        """ use a Catalog (or a dict) for the translations, setup some
+            attributes from its metadata
+        """
+        self.raw = catalog
+        self._set_info(getattr(catalog, 'info', {}))
+
+    def _set_info(self, info):
+        self.info = info
+        self.has_wikimarkup = info.get('x-haswikimarkup', 'False') == 'True'
         try:
             self.name = info['x-language']
             self.ename = info['x-language-in-english']
@@ -222,36 +236,92 @@ class Translation(object):
 
     def loadLanguage(self, request, trans_dir="i18n"):
         request.clock.start('loadLanguage')
-        # see comment about per-wiki scope above
-        cache = caching.CacheEntry(request, arena='i18n', key=self.language, scope='wiki', use_pickle=True)
         langfilename = po_filename(request, self.language, self.domain, i18n_dir=trans_dir)
-        needsupdate = cache.needsUpdate(langfilename)
-        if not needsupdate:
-            try:
-                unformatted = cache.content()
-                logging.debug("pickle %s load success" % self.language)
-            except caching.CacheError:
-                logging.debug("pickle %s load failed" % self.language)
-                needsupdate = 1
-
-        if needsupdate:
-            logging.debug("langfilename %s needs update" % langfilename)
-            f = file(langfilename)
-            self.load_po(f)
-            f.close()
-            trans = self.translation
-            unformatted = trans._catalog
-            self.has_wikimarkup = self.info.get('x-haswikimarkup', 'False') == 'True'
-            logging.debug("dumping lang %s" % self.language)
-            try:
-                cache.update(unformatted)
-            except caching.CacheError:
-                pass
-
+        self.load_catalog(get_catalog(request, langfilename))
+        # the formatted translations depend on the catalog and on the code
+        # and configuration of the wiki they are used in
+        self.stamp = os.path.getmtime(langfilename)
         self.formatted = {}
-        self.raw = unformatted
+        self.formatted_siteids = set()
         request.clock.stop('loadLanguage')
 
+    def _get_formatted_cache(self, request):
+        # see comment about per-wiki scope above
+        return caching.CacheEntry(request, 'i18n', '%s.%s.formatted' % (self.language, self.domain),
+                                  scope='wiki', do_locking=False, use_pickle=True)
+
+    def _get_formatted_stamp(self, request):
+        return (self.stamp, request.cfg.cache.code_version)
+
+    def loadFormatted(self, request):
+        """ Load the translations formatted in the wiki of request before (by
+            this or other processes), see getText.
+        """
+        siteid = request.cfg.siteid
+        if siteid in self.formatted_siteids:
+            return
+        self.formatted_siteids.add(siteid)
+        try:
+            data = self._get_formatted_cache(request).content()
+            if data['stamp'] == self._get_formatted_stamp(request):
+                self.formatted.update(data['formatted'])
+        except (caching.CacheError, KeyError, TypeError):
+            pass
+
+    def saveFormatted(self, request, key, text):
+        """ Add a formatted translation to the cache of the wiki of request
+
+        It is written by flushFormatted, at the end of the request (see
+        save_formatted) or when there are formatted_save_threshold new ones.
+        """
+        siteid = request.cfg.siteid
+        self.unsaved_lock.acquire()
+        try:
+            unsaved = self.unsaved.setdefault(siteid, {})
+            unsaved[key] = text
+            flush = len(unsaved) >= self.formatted_save_threshold
+        finally:
+            self.unsaved_lock.release()
+        if flush:
+            self.flushFormatted(request)
+
+    def flushFormatted(self, request):
+        """ Write the new formatted translations of the wiki of request to
+            its cache
+        """
+        self.unsaved_lock.acquire()
+        try:
+            unsaved = self.unsaved.pop(request.cfg.siteid, None)
+        finally:
+            self.unsaved_lock.release()
+        if not unsaved:
+            return
+        stamp = self._get_formatted_stamp(request)
+        cache = self._get_formatted_cache(request)
+        cache.lock('w')
+        try:
+            try:
+                data = cache.content()
+                if data['stamp'] != stamp:
+                    raise KeyError
+            except (caching.CacheError, KeyError, TypeError):
+                data = {'stamp': stamp, 'formatted': {}}
+            data['formatted'].update(unsaved)
+            cache.update(data)
+        except caching.CacheError:
+            pass
+        finally:
+            cache.unlock()
+
+
+def save_formatted(request):
+    """ Write the translations formatted during the request to the cache
+        (see Translation.saveFormatted)
+    """
+    for translation in translations.values():
+        if translation.unsaved:
+            translation.flushFormatted(request)
+
 
 def getDirection(lang):
     """ Return the text direction for a language, either 'ltr' or 'rtl'. """
@@ -290,6 +360,7 @@ def getText(original, request, lang, **kw):
     if original in translation.raw:
         translated = translation.raw[original]
         if formatted:
+            translation.loadFormatted(request)
             # it is important to include siteid and percent into the key because
             # formatted output depends on the (farm) wiki in which the page is
             # rendered (e.g. for link urls) and also on the percent param
@@ -303,6 +374,7 @@ def getText(original, request, lang, **kw):
                 translation.formatted[key] = None # we use this as "formatting in progress" indicator
                 translated = translation.formatMarkup(request, translated, percent)
                 translation.formatted[key] = translated # remember it
+                translation.saveFormatted(request, key, translated)
     else:
         try:
             if languages is None:
@@ -0,0 +1,78 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.i18n.catalog Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import gettext, os, shutil, tempfile
+
+from MoinMoin import caching, i18n
+from MoinMoin.i18n import catalog
+
+
+class TestCatalog:
+
+    def setup_method(self, method):
+        self.po_filename = i18n.po_filename(self.request, 'de', 'MoinMoin')
+        self.mo_data = catalog.compile_po(self.po_filename)
+        self.tmpdir = tempfile.mkdtemp()
+        self.mo_filename = os.path.join(self.tmpdir, 'de.MoinMoin.mo')
+        f = open(self.mo_filename, 'wb')
+        f.write(self.mo_data)
+        f.close()
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmpdir)
+
+    def testSameAsGettext(self):
+        """ i18n.catalog: lookups give the same as gettext """
+        expected = gettext.GNUTranslations(open(self.mo_filename, 'rb'))
+        c = catalog.Catalog(self.mo_filename)
+        assert c.info == expected.info()
+        assert len(c.items()) > 100
+        expected = dict(expected._catalog)
+        del expected[u'']
+        assert dict(c.items()) == expected
+        assert c[u'Login'] == expected[u'Login']
+        assert u'Login' in c
+        assert u'no such original text' not in c
+        assert c.get(u'no such original text') is None
+        # the metadata is no translation
+        assert u'' not in c
+
+    def testCached(self):
+        """ i18n.catalog: catalogs without .mo file are compiled into the cache """
+        c = catalog.get_catalog(self.request, self.po_filename)
+        cache = caching.CacheEntry(self.request, 'i18n', 'i18n_de.MoinMoin.mo', scope='farm')
+        assert cache.content() == self.mo_data
+        assert c[u'Login'] == catalog.Catalog(self.mo_filename)[u'Login']
+
+    def testFormatted(self):
+        """ i18n: formatted translations are kept in the wiki cache """
+        request = self.request
+        t = i18n.Translation('de')
+        t.loadLanguage(request)
+        cache = t._get_formatted_cache(request)
+        cache.remove()
+        key = (u'Login', request.cfg.siteid, False)
+        t.saveFormatted(request, key, u'<p>Anmelden</p>')
+        # written at the end of the request
+        assert not cache.exists()
+        saved = i18n.translations.copy()
+        i18n.translations['de'] = t
+        try:
+            i18n.save_formatted(request)
+        finally:
+            i18n.translations.clear()
+            i18n.translations.update(saved)
+        assert not t.unsaved
+
+        t = i18n.Translation('de')
+        t.loadLanguage(request)
+        t.loadFormatted(request)
+        assert t.formatted == {key: u'<p>Anmelden</p>'}
+        cache.remove()
+
+coverage_modules = ['MoinMoin.i18n.catalog']
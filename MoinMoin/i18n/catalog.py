@@ -0,0 +1,189 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - memory-mapped binary message catalogs
+
+    The translations are compiled from the .po files into GNU .mo files
+    (see msgfmt.py), either by "make mo" in the i18n directory or, if there
+    is no up-to-date .mo file next to the .po file, at runtime into the
+    farm cache.
+
+    A Catalog maps such a file into memory and looks up the translations by
+    binary search in the (sorted) key table, so loading a language does not
+    need to parse or unpack anything and the strings are shared by all
+    processes using the file.
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import mmap, os, struct
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.i18n.msgfmt import MsgFmt
+
+LE_MAGIC = 0x950412deL
+BE_MAGIC = 0xde120495L
+
+
+class CatalogError(Exception):
+    """ raised if a .mo file can't be used """
+    pass
+
+
+class Catalog(object):
+    """ Read-only mapping of the original (unicode) texts of a .mo file to
+        their translations
+    """
+    def __init__(self, filename, offset=0):
+        """
+        @param filename: name of the .mo file
+        @param offset: position of the .mo data in the file
+        """
+        f = open(filename, 'rb')
+        try:
+            try:
+                self.data = data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (mmap.error, ValueError), err:
+                raise CatalogError("can't map %s: %s" % (filename, str(err)))
+        finally:
+            f.close()
+        self.offset = offset
+        if len(data) < offset + 20:
+            raise CatalogError("%s is too short" % filename)
+        magic = struct.unpack('<I', data[offset:offset + 4])[0]
+        if magic == LE_MAGIC:
+            self.order = '<'
+        elif magic == BE_MAGIC:
+            self.order = '>'
+        else:
+            raise CatalogError("%s is no .mo file" % filename)
+        version, self.length, self.keys_start, self.values_start = self._unpack('4I', 4)
+        if version >> 16 not in (0, 1):
+            raise CatalogError("%s has unsupported version %d" % (filename, version))
+        self.encoding = 'utf-8'
+        self.info = self._parse_info()
+
+    def _unpack(self, fmt, pos):
+        fmt = self.order + fmt
+        pos += self.offset
+        return struct.unpack(fmt, self.data[pos:pos + struct.calcsize(fmt)])
+
+    def _get_string(self, table, index):
+        length, pos = self._unpack('2I', table + 8 * index)
+        pos += self.offset
+        return self.data[pos:pos + length]
+
+    def _find(self, key):
+        """ Return the index of the utf-8 encoded key or -1 """
+        low, high = 0, self.length
+        while low < high:
+            middle = (low + high) // 2
+            current = self._get_string(self.keys_start, middle)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def _parse_info(self):
+        """ Parse the metadata (the translation of u'') like gettext does """
+        info = {}
+        index = self._find('')
+        if index >= 0:
+            lastkey = None
+            for line in self._get_string(self.values_start, index).split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    lastkey = key = key.strip().lower()
+                    info[key] = value.strip()
+                elif lastkey:
+                    info[lastkey] += '\n' + line
+            content_type = info.get('content-type', '')
+            if 'charset=' in content_type:
+                self.encoding = content_type.split('charset=')[1]
+        return info
+
+    def _encode(self, original):
+        if isinstance(original, unicode):
+            return original.encode(self.encoding)
+        return original
+
+    def __getitem__(self, original):
+        index = self._find(self._encode(original))
+        if index < 0 or not original:
+            raise KeyError(original)
+        return self._get_string(self.values_start, index).decode(self.encoding)
+
+    def get(self, original, default=None):
+        try:
+            return self[original]
+        except KeyError:
+            return default
+
+    def __contains__(self, original):
+        return bool(original) and self._find(self._encode(original)) >= 0
+
+    def __len__(self):
+        return self.length
+
+    def iteritems(self):
+        for index in xrange(self.length):
+            original = self._get_string(self.keys_start, index)
+            if original:
+                yield (original.decode(self.encoding),
+                       self._get_string(self.values_start, index).decode(self.encoding))
+
+    def items(self):
+        return list(self.iteritems())
+
+    def keys(self):
+        return [original for original, translated in self.iteritems()]
+
+
+def compile_po(po_filename):
+    """ Compile a .po file into .mo data """
+    mf = MsgFmt()
+    f = open(po_filename)
+    try:
+        mf.read_po(f.readlines())
+    finally:
+        f.close()
+    return mf.generate_mo()
+
+
+def _is_current(filename, po_filename):
+    try:
+        return os.path.getmtime(filename) >= os.path.getmtime(po_filename)
+    except os.error:
+        return False
+
+
+def get_catalog(request, po_filename):
+    """ Get the catalog for a .po file
+
+    Uses the .mo file next to it, if it is up-to-date, otherwise compiles
+    it into the farm cache.
+    """
+    mo_filename = os.path.splitext(po_filename)[0] + '.mo'
+    if _is_current(mo_filename, po_filename):
+        try:
+            return Catalog(mo_filename)
+        except CatalogError, err:
+            logging.warning(str(err))
+    parent, name = os.path.split(po_filename)
+    key = '%s_%s.mo' % (os.path.basename(parent), os.path.splitext(name)[0])
+    cache = caching.CacheEntry(request, 'i18n', key, scope='farm')
+    cache_filename = cache._filename()
+    if not _is_current(cache_filename, po_filename):
+        logging.debug("compiling %s" % po_filename)
+        cache.update(compile_po(po_filename))
+    # the cache file starts with a header
+    return Catalog(cache_filename, caching.HEADER.size)
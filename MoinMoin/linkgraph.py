@@ -0,0 +1,219 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - wiki-wide link graph
+
+    Keeps the links of all pages (forward adjacency, from the per page
+    'pagelinks' caches, see Page.getPageLinks) and the pages linking to
+    every page name (reverse adjacency), so OrphanedPages, WantedPages,
+    LocalSiteMap and linkto: searches do not need to load the links of
+    every page.
+
+    There is one graph per process (cfg.cache.linkgraph). It is stored in
+    the wiki cache together with the edit-log position it is up-to-date
+    with. Before answering a query, the links of the pages saved, renamed,
+    copied or deleted since then are reloaded, so changes done by other
+    processes are picked up, too.
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import threading
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.Page import Page, PageListIndex
+
+
+class LinkGraph(object):
+    """ Links between the pages of the wiki
+
+        links maps the name of every existing page to the list of page
+        names it links to, backlinks maps page names (existing or not) to
+        the set of pages linking to them.
+    """
+    arena = 'linkgraph'
+    key = 'index'
+    version = 1
+    # only save the graph after that many page updates,
+    # saving it is not cheap for big wikis
+    save_threshold = 100
+
+    def __init__(self):
+        # re-entrant: getting the links of a page may render it, which
+        # may run a macro querying the graph
+        self.lock = threading.RLock()
+        self.stamp = None
+        self.log_pos = None
+        self.changes = 0
+        self.links = {}
+        self.backlinks = {}
+
+    def _add_links(self, pagename, links):
+        self.links[pagename] = links
+        for link in links:
+            self.backlinks.setdefault(link, set()).add(pagename)
+
+    def _remove_links(self, pagename):
+        for link in self.links.pop(pagename, []):
+            pages = self.backlinks.get(link)
+            if pages is not None:
+                pages.discard(pagename)
+                if not pages:
+                    del self.backlinks[link]
+
+    def update_pages(self, request, pagenames):
+        """ Reload the links of some (changed) pages. """
+        for pagename in set(pagenames):
+            self._remove_links(pagename)
+            page = Page(request, pagename)
+            if page.exists():
+                self._add_links(pagename, list(page.getPageLinks(request)))
+            self.changes += 1
+
+    def refresh(self, request):
+        """ Bring the graph up-to-date with the edit-log, load or build it
+            if needed.
+        """
+        from MoinMoin.logfile import editlog
+        elog = editlog.EditLog(request)
+        self.lock.acquire()
+        try:
+            stamp = PageListIndex()._get_stamp(request)
+            if self.log_pos is None or self.stamp != stamp or self.log_pos > elog.size():
+                self.load(request, elog, stamp)
+            else:
+                # set the new position first, in case updating the pages
+                # queries the graph
+                self.log_pos, pagenames = elog.news(self.log_pos)
+                self.update_pages(request, pagenames)
+            if self.changes >= self.save_threshold:
+                self.save(request)
+        finally:
+            self.lock.release()
+
+    def load(self, request, elog, stamp):
+        """ Load the graph from the cache and update it using the edit-log,
+            rebuild it if the cache is not usable.
+        """
+        self.links, self.backlinks = {}, {}
+        self.changes = 0
+        self.stamp = stamp
+        cache = caching.CacheEntry(request, self.arena, self.key, scope='wiki', use_pickle=True)
+        try:
+            data = cache.content()
+            if (data['version'] != self.version or data['stamp'] != stamp or
+                data['log_pos'] > elog.size()):
+                raise caching.CacheError
+        except (caching.CacheError, KeyError, TypeError):
+            # get the edit-log position first, so we do not miss changes
+            # happening while we load the links
+            self.log_pos = elog.size()
+            self.update_pages(request, request.rootpage.getPageList(user='', exists=1))
+            self.save(request)
+        else:
+            for pagename, links in data['links'].iteritems():
+                self._add_links(pagename, links)
+            self.log_pos, pagenames = elog.news(data['log_pos'])
+            self.update_pages(request, pagenames)
+
+    def save(self, request):
+        """ Store the graph into the cache. """
+        data = {
+            'version': self.version,
+            'stamp': self.stamp,
+            'log_pos': self.log_pos,
+            'links': self.links,
+        }
+        cache = caching.CacheEntry(request, self.arena, self.key, scope='wiki', use_pickle=True)
+        try:
+            cache.update(data)
+            self.changes = 0
+        except caching.CacheError, err:
+            logging.warning("could not save link graph: %s" % str(err))
+
+    def links_from(self, request, pagename):
+        """ Get the page names a page links to
+
+        @param pagename: name of the page
+        @rtype: list
+        @return: page names (empty for pages that do not exist)
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return list(self.links.get(pagename, []))
+        finally:
+            self.lock.release()
+
+    def links_to(self, request, pagename):
+        """ Get the pages linking to a page name
+
+        @param pagename: name of the (existing or wanted) page
+        @rtype: set
+        @return: names of the pages linking to pagename
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return set(self.backlinks.get(pagename, []))
+        finally:
+            self.lock.release()
+
+    def links_to_matching(self, request, match):
+        """ Get the pages linking to any page name accepted by match
+
+        @param match: function getting a page name and returning bool
+        @rtype: set
+        @return: names of the pages linking to these page names
+        """
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            result = set()
+            for link, pages in self.backlinks.iteritems():
+                if match(link):
+                    result.update(pages)
+            return result
+        finally:
+            self.lock.release()
+
+    def orphans(self, request, pagenames):
+        """ Get the pages not linked from any other page
+
+        @param pagenames: names of the pages to check and to consider as
+                          link sources (e.g. the pages a user may read)
+        @rtype: set
+        @return: those of pagenames not linked from any of pagenames
+        """
+        pagenames = set(pagenames)
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            return set([pagename for pagename in pagenames
+                        if pagenames.isdisjoint(self.backlinks.get(pagename, []))])
+        finally:
+            self.lock.release()
+
+    def wanted(self, request, pagenames):
+        """ Get the pages that do not exist, but are linked from some page
+
+        @param pagenames: names of the pages to consider as link sources
+        @rtype: dict
+        @return: wanted page name -> set of those of pagenames linking to it
+        """
+        pagenames = set(pagenames)
+        self.lock.acquire()
+        try:
+            self.refresh(request)
+            result = {}
+            for link, pages in self.backlinks.iteritems():
+                if link not in self.links:
+                    pages = pages & pagenames
+                    if pages:
+                        result[link] = pages
+            return result
+        finally:
+            self.lock.release()
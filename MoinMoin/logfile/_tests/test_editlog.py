@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+    MoinMoin - MoinMoin.logfile.editlog Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+import os
+import tempfile
+import shutil
+
+from MoinMoin.logfile import editlog
+
+
+class TestEditLogIndex(object):
+    """ testing the edit-log index """
+    # mtime rev action pagename host hostname user_id extra comment
+    LOG = [
+           [u'1292630945000000', u'00000001', u'SAVENEW', u'foo', u'0.0.0.0', u'example.org', u'', u'', u''],
+           [u'1292630957849084', u'00000001', u'SAVENEW', u'bar', u'0.0.0.0', u'example.org', u'', u'', u''],
+           [u'1292680177309091', u'99999999', u'ATTNEW', u'foo', u'0.0.0.0', u'example.org', u'', u'file.txt', u''],
+           [u'1292680233866579', u'00000002', u'SAVE', u'bar', u'0.0.0.0', u'example.org', u'', u'', u''],
+           [u'1303073723000000', u'00000002', u'SAVE', u'foo(c3bc)', u'0.0.0.0', u'example.org', u'', u'', u''],
+          ]
+
+    def write_log(self, data, mode='wb'):
+        f = open(self.fname, mode)
+        for linedata in data:
+            f.write((u'\t'.join(linedata) + u'\n').encode('utf-8'))
+        f.close()
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'editlog_')
+        self.fname = os.path.join(self.test_dir, 'edit-log')
+        self.write_log(self.LOG)
+
+    def teardown_method(self, method):
+        editlog._indexes.pop(self.fname, None)
+        shutil.rmtree(self.test_dir)
+
+    def line_offset(self, count):
+        """ the offset of the line after the first count lines """
+        f = open(self.fname, 'rb')
+        try:
+            return len(''.join(f.readlines()[:count]))
+        finally:
+            f.close()
+
+    def since(self, ed_time_usecs):
+        log = editlog.EditLog(self.request, filename=self.fname)
+        return [line.rev for line in log.since(ed_time_usecs)]
+
+    def test_since(self):
+        index = editlog.EditLogIndex(self.fname)
+        index.checkpoint_interval = 2
+        index.update()
+        assert len(index.times) == 3
+        # we need to start at a checkpoint older than the wanted time
+        assert index.time_offset(1292680177309091) == 0
+        assert index.time_offset(1292680177309092) == self.line_offset(2)
+        editlog._indexes[self.fname] = index
+        log = editlog.EditLog(self.request, filename=self.fname)
+        times = [line.ed_time_usecs for line in log.since(1292680177309091)]
+        assert times == [1292680177309091, 1292680233866579, 1303073723000000]
+        assert list(log.since(1303073723000001)) == []
+
+    def test_update(self):
+        """ the index follows appended and replaced logs """
+        assert self.since(1292680233866579) == [u'00000002', u'00000002']
+        self.write_log([[u'1303073724000000', u'00000003', u'SAVE', u'bar', u'', u'', u'', u'', u'']], 'ab')
+        assert self.since(1292680233866579) == [u'00000002', u'00000002', u'00000003']
+        assert editlog.get_index(self.request, self.fname).count == 6
+        os.remove(self.fname)
+        self.write_log(self.LOG[:2])
+        assert self.since(1292630945000000) == [u'00000001', u'00000001']
+        assert editlog.get_index(self.request, self.fname).count == 2
+
+    def test_persistence(self):
+        index = editlog.EditLogIndex(self.fname)
+        index.update()
+        index.save(self.request)
+        assert os.path.exists(self.fname + '.index')
+        loaded = editlog.EditLogIndex(self.fname)
+        loaded.load(self.request)
+        assert loaded.log_pos == os.path.getsize(self.fname)
+        assert loaded.count == index.count
+        assert loaded.times == index.times
+        # a replaced log invalidates the sidecar file
+        os.remove(self.fname)
+        self.write_log(self.LOG)
+        loaded = editlog.EditLogIndex(self.fname)
+        loaded.load(self.request)
+        if os.stat(self.fname).st_ino != index.ino:
+            assert loaded.log_pos == 0
@@ -15,11 +15,15 @@
     @license: GNU GPL, see COPYING for details.
 """
 
+import os, errno
+from bisect import bisect_right
+from threading import Lock
+
 from MoinMoin import log
 logging = log.getLogger(__name__)
 
 from MoinMoin.logfile import LogFile
-from MoinMoin import wikiutil, user, config
+from MoinMoin import caching, wikiutil, user, config
 from MoinMoin.Page import Page
 
 class EditLogLine:
@@ -39,6 +43,13 @@ class EditLogLine:
     def __init__(self, usercache):
         self._usercache = usercache
 
+    def __getstate__(self):
+        # the user cache has User objects referencing the request, we
+        # neither can nor want to pickle it (see ItemCache.save_snapshot)
+        state = self.__dict__.copy()
+        state['_usercache'] = {}
+        return state
+
     def __cmp__(self, other):
         try:
             return cmp(self.ed_time_usecs, other.ed_time_usecs)
@@ -144,6 +155,161 @@ class EditLogLine:
                 request.formatter.span(0))
 
 
+class EditLogIndex:
+    """ Index of an edit-log file, kept in a sidecar file <edit-log>.index
+
+    It has a checkpoint (timestamp, offset) every checkpoint_interval lines,
+    so we can find the changes since some time without scanning the whole
+    log.
+
+    The index also remembers up to which offset of the edit-log it is
+    complete. As the edit-log is append-only, we bring it up-to-date by
+    just indexing the lines added since then. If the edit-log was replaced
+    (different inode) or truncated, the index gets rebuilt.
+
+    Use get_index() to get an up-to-date index, we keep one per file and
+    process.
+    """
+    version = 2
+    checkpoint_interval = 64 # lines
+    # save the sidecar file if that many lines were added since the last save
+    save_threshold = 100
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.ino = None
+        self.log_pos = 0 # offset up to which the log is indexed
+        self.count = 0 # number of indexed lines
+        self.times = [] # [(ed_time_usecs, offset), ...] checkpoints
+        self.unsaved = 0 # lines indexed since last load / save
+        self.lock = Lock()
+
+    def _cache(self, request):
+        dirname, basename = os.path.split(self.filename)
+        # no locking, we write to a temp file and rename it, which is all
+        # we need for derived data that is validated when loading it
+        return caching.CacheEntry(request, dirname, basename + '.index', scope='dir',
+                                  use_pickle=True, do_locking=False)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.filename)
+        except OSError, err:
+            if err.errno == errno.ENOENT:
+                return None, 0
+            raise
+        return st.st_ino, st.st_size
+
+    def load(self, request):
+        """ load the index from the sidecar file (if it is valid) """
+        ino, size = self._stat()
+        if ino is None:
+            return # no edit-log (maybe not even its directory)
+        cache = self._cache(request)
+        if not cache.exists():
+            return
+        try:
+            data = cache.content()
+            if (data['version'] != self.version or data['ino'] != ino or
+                data['log_pos'] > size):
+                return
+            self.ino, self.log_pos, self.count, self.times = (
+                data['ino'], data['log_pos'], data['count'], data['times'])
+        except (caching.CacheError, KeyError, TypeError), err:
+            logging.debug("not using edit-log index %s: %s" % (cache._fname, str(err)))
+
+    def save(self, request):
+        """ save the index to the sidecar file """
+        if self.ino is None:
+            return # no edit-log
+        data = {
+            'version': self.version,
+            'ino': self.ino,
+            'log_pos': self.log_pos,
+            'count': self.count,
+            'times': self.times,
+        }
+        try:
+            self._cache(request).update(data)
+            self.unsaved = 0
+        except caching.CacheError, err:
+            logging.warning("could not save edit-log index: %s" % str(err))
+
+    def clear(self):
+        self.ino = None
+        self.log_pos = self.count = 0
+        self.times = []
+
+    def update(self):
+        """ index the lines added to the edit-log since the last update
+
+            @return: True if the index changed
+        """
+        ino, size = self._stat()
+        if ino != self.ino or size < self.log_pos:
+            # new or replaced edit-log, start from scratch
+            self.clear()
+            self.ino = ino
+        if size == self.log_pos:
+            return False
+        f = file(self.filename, 'rb')
+        try:
+            f.seek(self.log_pos)
+            offset = self.log_pos
+            for line in f:
+                if not line.endswith('\n'):
+                    break # incomplete line, somebody is just writing it
+                fields = line.split('\t', 4)
+                if len(fields) >= 4:
+                    try:
+                        ed_time_usecs = long(fields[0] or '0')
+                    except ValueError:
+                        pass # broken line, the parser will deal with it
+                    else:
+                        if not self.count % self.checkpoint_interval:
+                            self.times.append((ed_time_usecs, offset))
+                        self.count += 1
+                        self.unsaved += 1
+                offset += len(line)
+        finally:
+            f.close()
+        changed = offset != self.log_pos
+        self.log_pos = offset
+        return changed
+
+    def time_offset(self, ed_time_usecs):
+        """ return an offset in the log before the first line with a timestamp
+            >= ed_time_usecs (assuming timestamps are increasing in the log)
+        """
+        i = bisect_right(self.times, (ed_time_usecs, -1)) - 1
+        if i < 0:
+            return 0
+        return self.times[i][1]
+
+
+_indexes = {}
+_indexes_lock = Lock()
+
+def get_index(request, filename):
+    """ return the up-to-date EditLogIndex for the edit-log filename """
+    _indexes_lock.acquire()
+    try:
+        index = _indexes.get(filename)
+        if index is None:
+            index = _indexes[filename] = EditLogIndex(filename)
+            index.load(request)
+    finally:
+        _indexes_lock.release()
+    index.lock.acquire()
+    try:
+        index.update()
+        if index.unsaved >= index.save_threshold:
+            index.save(request)
+    finally:
+        index.lock.release()
+    return index
+
+
 class EditLog(LogFile):
     """ Used for accessing the global edit-log (e.g. by RecentChanges) as
         well as for the local edit-log (e.g. PageEditor, info action).
@@ -156,6 +322,8 @@ class EditLog(LogFile):
             else:
                 filename = request.rootpage.getPagePath('edit-log', isfile=1)
         LogFile.__init__(self, filename, buffer_size)
+        self.request = request
+        self.filename = filename
         self._NUM_FIELDS = 9
         self._usercache = {}
 
@@ -208,6 +376,22 @@ class EditLog(LogFile):
                            comment,
                            )) + "\n"
         self._add(line)
+        if self.filename in _indexes:
+            # keep the index of this process up-to-date
+            get_index(request, self.filename)
+
+    def since(self, ed_time_usecs):
+        """ Yield the edit-log lines with ed_time_usecs >= ed_time_usecs,
+            oldest first. Uses the edit-log index to seek near the first
+            of them. Respects the filter set with set_filter.
+        """
+        offset = get_index(self.request, self.filename).time_offset(ed_time_usecs)
+        if offset >= self.size():
+            return
+        self.seek(offset)
+        for line in self:
+            if line.ed_time_usecs >= ed_time_usecs:
+                yield line
 
     def parser(self, line):
         """ Parse edit-log line into fields """
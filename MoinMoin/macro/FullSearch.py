@@ -30,6 +30,7 @@
 from MoinMoin import wikiutil, search
 
 Dependencies = ["pages"]
+FragmentCache = {'editlog': True, 'values': ['value']}
 
 
 def search_box(type, macro):
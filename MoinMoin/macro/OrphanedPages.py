@@ -7,6 +7,7 @@
 """
 
 Dependencies = ["pages"]
+FragmentCache = {'editlog': True}
 
 def macro_OrphanedPages(macro):
     _ = macro.request.getText
@@ -16,15 +17,9 @@ def macro_OrphanedPages(macro):
     if macro.request.isSpiderAgent: # reduce bot cpu usage
         return ''
 
-    # delete all linked pages from a dict of all pages
-    pages = macro.request.rootpage.getPageDict()
-    orphaned = {}
-    orphaned.update(pages)
-    for page in pages.values():
-        links = page.getPageLinks(macro.request)
-        for link in links:
-            if link in orphaned:
-                del orphaned[link]
+    # pages not linked from any page the user may read
+    pages = macro.request.rootpage.getPageList()
+    orphaned = macro.request.cfg.cache.linkgraph.orphans(macro.request, pages)
 
     result = []
     f = macro.formatter
@@ -34,8 +29,7 @@ def macro_OrphanedPages(macro):
         result.append(f.paragraph(0))
     else:
         # return a list of page links
-        orphanednames = orphaned.keys()
-        orphanednames.sort()
+        orphanednames = sorted(orphaned)
         result.append(f.number_list(1))
         for name in orphanednames:
             if not name:
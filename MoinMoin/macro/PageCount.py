@@ -7,6 +7,7 @@
 """
 
 Dependencies = ['namespace']
+FragmentCache = {'editlog': True}
 
 from MoinMoin import wikiutil
 
@@ -11,6 +11,7 @@
 """
 
 Dependencies = ["namespace"]
+FragmentCache = {'editlog': True}
 from MoinMoin import search, wikiutil
 from MoinMoin.macro.FullSearch import execute as fs_execute
 
@@ -290,9 +290,13 @@ def macro_RecentChanges(macro, abandoned=False):
     this_day = today
     day_count = 0
 
+    may_read = {} # pagename -> bool, most pages show up many times in the log
+
     for line in log.reverse():
 
-        if not request.user.may.read(line.pagename):
+        if line.pagename not in may_read:
+            may_read[line.pagename] = request.user.may.read(line.pagename)
+        if not may_read[line.pagename]:
             continue
 
         line.time_tuple = request.user.getTime(wikiutil.version2timestamp(line.ed_time_usecs))
@@ -11,6 +11,7 @@
 from MoinMoin.util import pysupport
 
 Dependencies = ["time24:00"]
+FragmentCache = {'ttl': 3600}
 
 def macro_StatsChart(macro, chart_type=''):
     _ = macro.request.getText
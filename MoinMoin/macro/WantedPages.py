@@ -9,6 +9,7 @@
 from MoinMoin import wikiutil
 
 Dependencies = ["pages"]
+FragmentCache = {'editlog': True, 'values': ['allpages']}
 
 def macro_WantedPages(macro):
     request = macro.request
@@ -34,32 +35,22 @@ def macro_WantedPages(macro):
     # Get page dict readable by current user
     pages = request.rootpage.getPageDict()
 
-    # build a dict of wanted pages
-    wanted = {}
-    deprecated_links = []
-    for name, page in pages.items():
-        # Skip system pages, because missing translations are not wanted pages,
-        # unless you are a translator and clicked "Include system pages"
-        if not allpages and wikiutil.isSystemPage(request, name):
-            continue
-
-        # Add links to pages which do not exist in pages dict
-        links = page.getPageLinks(request)
-        is_deprecated = page.parse_processing_instructions(
-                ).get('deprecated', False)
-
-        for link in links:
-            if not link in pages and request.user.may.read(link):
-                if is_deprecated:
-                    deprecated_links.append(link)
-                if link in wanted:
-                    wanted[link][name] = 1
-                else:
-                    wanted[link] = {name: 1}
+    # Skip system pages, because missing translations are not wanted pages,
+    # unless you are a translator and clicked "Include system pages"
+    sources = [name for name in pages
+               if allpages or not wikiutil.isSystemPage(request, name)]
 
-    for link in deprecated_links:
-        if len(wanted[link]) == 1:
+    # build a dict of wanted pages (and the pages linking to them)
+    wanted = request.cfg.cache.linkgraph.wanted(request, sources)
+    readable = set(request.user.may.read_many(wanted.keys()))
+    for link, where in wanted.items():
+        if link not in readable:
             del wanted[link]
+        elif len(where) == 1:
+            # a link only from a deprecated page is not wanted
+            name = list(where)[0]
+            if pages[name].parse_processing_instructions().get('deprecated', False):
+                del wanted[link]
 
     # Check for the extreme case when there are no wanted pages
     if not wanted:
@@ -81,8 +72,7 @@ def macro_WantedPages(macro):
 
         # Add links to pages that want this page, highliting
         # the link in those pages.
-        where = wanted[name].keys()
-        where.sort()
+        where = sorted(wanted[name])
         if macro.formatter.page.page_name in where:
             where.remove(macro.formatter.page.page_name)
         wherelinks = [pages[pagename].link_to(request, querystr={'highlight': name}, rel='nofollow')
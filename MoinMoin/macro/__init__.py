@@ -21,8 +21,10 @@ from MoinMoin import log
 logging = log.getLogger(__name__)
 
 import re, time, os
-from MoinMoin import action, config, util
+from MoinMoin import action, caching, config, util
 from MoinMoin import wikiutil, i18n
+from MoinMoin.logfile import editlog
+from MoinMoin.support.python_compatibility import hash_new
 from MoinMoin.Page import Page
 from MoinMoin.datastruct.backends.wiki_dicts import WikiDict
 
@@ -75,6 +77,22 @@ class Macro:
         "GetVal": ["pages"],
         }
 
+    # Output of these macros may be kept in the macro fragment cache,
+    # plugin macros declare it with a module level FragmentCache dict:
+    #  'editlog': True - output is valid until the edit-log changes
+    #  'pages': [pagename, ...] - output is valid until one of these pages changes
+    #  'ttl': seconds - output is valid for that many seconds
+    #  'values': [name, ...] - request values the output depends on
+    # The output is always cached per macro arguments, page, user and language.
+    FragmentCaches = {
+        "TitleIndex": {'editlog': True, 'values': ['allpages']},
+        "WordIndex": {'editlog': True, 'values': ['allpages']},
+        }
+    # keep at most that many entries in the macro fragment cache (the oldest
+    # get removed), checked every fragment_cache_check writes of a process
+    fragment_cache_max = 5000
+    fragment_cache_check = 100
+
 
     def __init__(self, parser):
         self.parser = parser
@@ -125,7 +143,15 @@ class Macro:
                     execute = self.__class__._m_lang
                 else:
                     raise ImportError("Cannot load macro %s" % macro_name)
+        if [dep for dep in self.get_dependencies(macro_name) if dep.startswith('time')]:
+            # the output of the page must not be cached
+            self.request.dynamic_content = 1
         try:
+            fragment_cache = None
+            if self.cfg.caching_macro_fragments and not self.request.mode_getpagelinks:
+                fragment_cache = self.get_fragment_cache(macro_name)
+            if fragment_cache:
+                return self._execute_cached(fragment_cache, execute, args)
             return execute(self, args)
         except Exception, err:
             # we do not want that a faulty macro aborts rendering of the page
@@ -169,6 +195,106 @@ class Macro:
         except wikiutil.PluginError:
             return self.defaultDependency
 
+    def get_fragment_cache(self, macro_name):
+        """ Get the fragment cache declaration of a macro
+
+        @return: dict (see FragmentCaches) or None if the output of the
+                 macro must not be cached
+        """
+        if macro_name in self.FragmentCaches:
+            return self.FragmentCaches[macro_name]
+        try:
+            return wikiutil.importPlugin(self.request.cfg, 'macro',
+                                         macro_name, 'FragmentCache')
+        except wikiutil.PluginError:
+            return None
+
+    def _fragment_key(self, fragment_cache, args):
+        """ Make the cache key for the output of the current macro call """
+        request = self.request
+        page = getattr(self.formatter, 'page', None)
+        if request.user.valid:
+            # ACLs grant rights to user names (and the groups they are in),
+            # the Trusted group depends on the auth method
+            user_class = (request.user.name, request.user.auth_method,
+                          request.user.auth_method in request.cfg.auth_methods_trusted)
+        else:
+            user_class = None
+        values = [(name, request.values.get(name))
+                  for name in fragment_cache.get('values', [])]
+        key = (self.name, args, page and page.page_name,
+               self.formatter.__class__.__module__, user_class,
+               request.lang, request.current_lang, values)
+        return hash_new('sha1', repr(key)).hexdigest()
+
+    def _fragment_pages(self, fragment_cache):
+        """ Get the modification times of the pages the output depends on """
+        return dict([(pagename, Page(self.request, pagename).mtime_usecs())
+                     for pagename in fragment_cache.get('pages', [])])
+
+    def _execute_cached(self, fragment_cache, execute, args):
+        """ Execute the current macro, using the macro fragment cache
+
+        @param fragment_cache: fragment cache declaration (see FragmentCaches)
+        @param execute: function executing the macro
+        @param args: macro arguments
+        """
+        request = self.request
+        cfg = request.cfg
+        cache = caching.CacheEntry(request, 'macrofragments',
+                                   self._fragment_key(fragment_cache, args),
+                                   scope='wiki', use_pickle=True)
+        log_pos = None
+        if fragment_cache.get('editlog'):
+            log_pos = editlog.EditLog(request).size()
+        ttl = fragment_cache.get('ttl')
+        now = time.time()
+        try:
+            data = cache.content()
+            if (data['code_version'] == cfg.cache.code_version and
+                data['log_pos'] == log_pos and
+                (ttl is None or now - data['time'] < ttl) and
+                data['pages'] == self._fragment_pages(fragment_cache)):
+                return data['html']
+        except (caching.CacheError, KeyError, TypeError):
+            pass
+        # get the page mtimes first, so we do not miss changes happening
+        # while we execute the macro
+        pages = self._fragment_pages(fragment_cache)
+        html = execute(self, args)
+        data = {
+            'code_version': cfg.cache.code_version,
+            'log_pos': log_pos,
+            'time': now,
+            'pages': pages,
+            'html': html,
+        }
+        try:
+            cache.update(data)
+        except caching.CacheError, err:
+            logging.warning("could not cache output of macro %s: %s" % (self.name, str(err)))
+        cfg.cache.macrofragment_writes += 1
+        if cfg.cache.macrofragment_writes % self.fragment_cache_check == 0:
+            self._limit_fragment_cache()
+        return html
+
+    def _limit_fragment_cache(self):
+        """ Remove the oldest entries of the macro fragment cache if it has
+            more than fragment_cache_max entries
+        """
+        request = self.request
+        keys = caching.get_cache_list(request, 'macrofragments', 'wiki')
+        if len(keys) <= self.fragment_cache_max:
+            return
+        entries = []
+        for key in keys:
+            cache = caching.CacheEntry(request, 'macrofragments', key, scope='wiki')
+            entries.append((cache.mtime(), key, cache))
+        entries.sort()
+        for mtime, key, cache in entries[:len(entries) - self.fragment_cache_max]:
+            cache.remove()
+        logging.debug("removed %d old macro fragments" % (len(entries) - self.fragment_cache_max))
+
     def macro_TitleSearch(self):
         from MoinMoin.macro.FullSearch import search_box
         return search_box("titlesearch", self)
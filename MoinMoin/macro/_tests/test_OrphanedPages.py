@@ -0,0 +1,33 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.macro OrphanedPages tested
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin._tests import become_trusted, create_page, make_macro, nuke_page
+
+class TestOrphanedPages:
+    """OrphanedPages: testing OrphanedPages macro """
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageForOrphanedPages'
+    linked = u'AutoCreatedMoinMoinTemporaryTestPageForOrphanedPagesLinked'
+
+    def setup_class(self):
+        request = self.request
+        become_trusted(request)
+        self.page = create_page(request, self.pagename, u"[[%s]]" % self.linked)
+        create_page(request, self.linked, u"Linked.")
+
+    def teardown_class(self):
+        nuke_page(self.request, self.pagename)
+        nuke_page(self.request, self.linked)
+
+    def testOrphanedPages(self):
+        """ macro OrphanedPages test: lists pages no page links to """
+        m = make_macro(self.request, self.page)
+        result = m.execute(u'OrphanedPages', u'')
+        assert u'%s"' % self.pagename in result
+        assert u'%s"' % self.linked not in result
+
+coverage_modules = ['MoinMoin.macro.OrphanedPages']
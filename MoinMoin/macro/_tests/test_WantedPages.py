@@ -0,0 +1,36 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.macro WantedPages tested
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin._tests import become_trusted, create_page, make_macro, nuke_page
+
+class TestWantedPages:
+    """WantedPages: testing WantedPages macro """
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageForWantedPages'
+    deprecated = u'AutoCreatedMoinMoinTemporaryTestPageForWantedPagesDeprecated'
+
+    def setup_class(self):
+        request = self.request
+        become_trusted(request)
+        self.page = create_page(request, self.pagename, u"WantedPagesTestWanted WantedPagesTestOther")
+        create_page(request, self.deprecated, u"#deprecated\nWantedPagesTestOther WantedPagesTestDeprecated")
+
+    def teardown_class(self):
+        nuke_page(self.request, self.pagename)
+        nuke_page(self.request, self.deprecated)
+
+    def testWantedPages(self):
+        """ macro WantedPages test: lists non-existing link targets """
+        m = make_macro(self.request, self.page)
+        result = m.execute(u'WantedPages', u'')
+        assert u'WantedPagesTestWanted' in result
+        assert u'WantedPagesTestOther' in result
+        # only linked from a deprecated page
+        assert u'WantedPagesTestDeprecated' not in result
+        assert u'FrontPage"' not in result
+
+coverage_modules = ['MoinMoin.macro.WantedPages']
@@ -7,7 +7,9 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-from MoinMoin import macro
+import os
+
+from MoinMoin import caching, macro
 from MoinMoin.parser.text import Parser
 from MoinMoin.formatter.text_html import Formatter
 from MoinMoin._tests import become_trusted, create_page, make_macro, nuke_page
@@ -30,5 +32,79 @@ class TestMacro:
         result = m.execute("BR", "")
         assert result == expected
 
+class TestFragmentCache:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageForFragmentCache'
+    newpage = u'AutoCreatedMoinMoinTemporaryTestPageForFragmentCacheNew'
+    args = u'FragmentCache'
+
+    def setup_method(self, method):
+        request = self.request
+        become_trusted(request)
+        self.page = create_page(request, self.pagename, u"<<PageList(FragmentCache)>>")
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+        nuke_page(self.request, self.newpage)
+        for key in caching.get_cache_list(self.request, 'macrofragments', 'wiki'):
+            caching.CacheEntry(self.request, 'macrofragments', key, scope='wiki').remove()
+
+    def _get_cache(self, m):
+        key = m._fragment_key(m.get_fragment_cache(u'PageList'), self.args)
+        return caching.CacheEntry(self.request, 'macrofragments', key,
+                                  scope='wiki', use_pickle=True)
+
+    def testCached(self):
+        """macro: output of PageList is cached until the edit-log changes"""
+        m = make_macro(self.request, self.page)
+        result = m.execute(u'PageList', self.args)
+        assert self.pagename in result
+        cache = self._get_cache(m)
+        data = cache.content()
+        assert data['html'] == result
+        data['html'] = u'cached output'
+        cache.update(data)
+        assert m.execute(u'PageList', self.args) == u'cached output'
+
+        create_page(self.request, self.newpage, u"New.")
+        result = m.execute(u'PageList', self.args)
+        assert self.newpage in result
+
+    def testDisabled(self):
+        """macro: no output is cached without FragmentCache or caching_macro_fragments"""
+        m = make_macro(self.request, self.page)
+        assert m.get_fragment_cache(u'BR') is None
+        self.request.cfg.caching_macro_fragments = False
+        try:
+            m.execute(u'PageList', self.args)
+        finally:
+            self.request.cfg.caching_macro_fragments = True
+        m.name = u'PageList'
+        assert not self._get_cache(m).exists()
+
+    def testUserKey(self):
+        """macro: output is cached per user and trusted auth method"""
+        request = self.request
+        m = make_macro(request, self.page)
+        fragment_cache = m.get_fragment_cache(u'PageList')
+        trusted_key = m._fragment_key(fragment_cache, self.args)
+        auth_method = request.user.auth_method
+        request.user.auth_method = 'untrusted_method'
+        try:
+            assert m._fragment_key(fragment_cache, self.args) != trusted_key
+        finally:
+            request.user.auth_method = auth_method
+
+    def testLimit(self):
+        """macro: only the newest entries of the fragment cache are kept"""
+        request = self.request
+        m = make_macro(request, self.page)
+        for i in range(3):
+            cache = caching.CacheEntry(request, 'macrofragments', 'key%d' % i, scope='wiki')
+            cache.update('x')
+            os.utime(cache._filename(), (i, i))
+        m.fragment_cache_max = 2
+        m._limit_fragment_cache()
+        assert sorted(caching.get_cache_list(request, 'macrofragments', 'wiki')) == ['key1', 'key2']
+
 coverage_modules = ['MoinMoin.macro']
 
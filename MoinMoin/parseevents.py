@@ -0,0 +1,155 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - parse events
+
+    Several formatters need the same page text parsed: text_html (for the
+    compiled page cache), pagelinks (for the links cache), groups (for group
+    pages) and text_plain. Instead of parsing the text once for each of them,
+    the Recorder formatter records the formatter calls of one parse as a list
+    of events, which is kept in the page cache (see Page.getParseEvents) and
+    replayed into each formatter that needs the page (see
+    cfg.caching_parse_events).
+
+    An event is either a (name, args, kw, write) tuple for a call of the
+    formatter method name or a unicode string the parser wrote directly.
+    Macro calls are recorded without their macro object, replay passes its
+    own one.
+
+    Parsers look at the in_p and in_pre state of their formatter, which the
+    Recorder keeps like FormatterBase does. Like with the code fragments of
+    text_python, the events are in the order of their output. Calls whose
+    output the parser did not write (write is False) change the formatter
+    state all the same, they are replayed before the next call made after
+    them.
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import re
+
+from MoinMoin import config
+from MoinMoin.formatter import FormatterBase
+
+# the recorder returns these markers instead of output
+marker_re = re.compile(u'\ufdd0(\\d+)\ufdd1', re.UNICODE)
+
+# FormatterBase methods that are not recorded, as they do not make output
+unrecorded = set(['set_highlight_re', 'setPage', 'sanitize_to_id',
+                  'make_id_unique', 'qualify_id'])
+
+
+class Recorder(FormatterBase):
+    """ Record the formatter calls of a parser """
+
+    def __init__(self, request, page, **kw):
+        FormatterBase.__init__(self, request, **kw)
+        self.page = page
+        self.calls = []
+
+    def record(self, name, args, kw):
+        self.calls.append((name, args, kw))
+        return u'\ufdd0%d\ufdd1' % (len(self.calls) - 1)
+
+    def paragraph(self, on, **kw):
+        FormatterBase.paragraph(self, on)
+        return self.record('paragraph', (on, ), kw)
+
+    def preformatted(self, on, **kw):
+        FormatterBase.preformatted(self, on)
+        return self.record('preformatted', (on, ), kw)
+
+    def rawHTML(self, markup):
+        # parsers may check if there is some markup
+        if not markup:
+            return u''
+        return self.record('rawHTML', (markup, ), {})
+
+    def macro(self, macro_obj, name, args, markup=None):
+        return self.record('macro', (name, args, markup), {})
+
+    def __getattr__(self, name):
+        """ Record calls of methods other formatters have in addition to
+            those of FormatterBase
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kw: self.record(name, args, kw)
+
+
+def _recording_method(name):
+    def method(self, *args, **kw):
+        return self.record(name, args, kw)
+    method.__name__ = name
+    return method
+
+for _name, _attr in FormatterBase.__dict__.items():
+    if (callable(_attr) and not _name.startswith('_') and
+        _name not in unrecorded and _name not in Recorder.__dict__):
+        setattr(Recorder, _name, _recording_method(_name))
+
+
+def record(request, parser, page):
+    """ Parse with parser and return the events
+
+    @param parser: parser instance for the page text
+    @param page: the page (formatters and parsers use it)
+    @rtype: list
+    @return: events (see module docstring)
+    """
+    recorder = Recorder(request, page)
+    # Save request state while parsing (see Page.makeCache)
+    saved_current_lang = request.current_lang
+    try:
+        text = request.redirectedOutput(parser.format, recorder)
+    finally:
+        request.current_lang = saved_current_lang
+    if isinstance(text, str):
+        text = text.decode(config.charset)
+
+    calls = recorder.calls
+    written = set([int(index) for index in marker_re.findall(text)])
+    events = []
+    pos = 0
+    next_call = 0
+    for match in marker_re.finditer(text):
+        start, index = match.start(), int(match.group(1))
+        if pos < start:
+            events.append(text[pos:start])
+        for unwritten in range(next_call, index):
+            if unwritten not in written:
+                events.append(calls[unwritten] + (False, ))
+        next_call = max(next_call, index + 1)
+        events.append(calls[index] + (True, ))
+        pos = match.end()
+    if pos < len(text):
+        events.append(text[pos:])
+    for unwritten in range(next_call, len(calls)):
+        events.append(calls[unwritten] + (False, ))
+    return events
+
+
+def replay(request, events, parser, formatter):
+    """ Write the output of formatter for events
+
+    @param events: events recorded by parsing with parser (see record)
+    @param parser: parser instance for the page text (used for macros)
+    @param formatter: formatter to replay the events into
+    """
+    write = request.write
+    parser.formatter = formatter
+    macro_obj = None
+    for event in events:
+        if isinstance(event, unicode):
+            write(event)
+            continue
+        name, args, kw, written = event
+        if name == 'macro':
+            if macro_obj is None:
+                from MoinMoin.macro import Macro
+                macro_obj = Macro(parser)
+            output = formatter.macro(macro_obj, *args, **kw)
+        else:
+            output = getattr(formatter, name)(*args, **kw)
+        if written:
+            write(output)
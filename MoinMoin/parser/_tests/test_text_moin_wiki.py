@@ -572,6 +572,56 @@ class TestMacrosInOneLine(ParserTestCase):
             result = self.needle.search(html).group(1)
             assert result == expected
 
+class TestLineScanner(ParserTestCase):
+    """ Test the line scanner (parser_fast_scan) against the full scan regex """
+    text = u"""\
+= Heading =
+ * item with ''emph'', '''strong''', '''''both''''' and __underline__
+ 1. ~-small-~ ~+big+~ --(strike)-- ^super^ ,,sub,, {{{tt}}} `bt`
+ term:: MoinMoin:FrontPage http://example.org/, mail@example.org :-) /* remark */
+||<-2> cell || WikiName ../SubPage /ChildPage ||
+## comment
+{{{#!python
+x = 1 }}} after {{{ pre
+----
+}}}
+&amp; &#42; <tag> [[FrontPage|link]] {{attachment:x.png}} <<Verbatim(''x'')>>
+"""
+    pagenames = [u'HelpOnMoinWikiSyntax', u'HelpOnTables', u'HelpOnLinking',
+                 u'HelpOnFormatting', u'HelpOnHeadlines',
+                 u'HelpOnSmileys', u'HelpOnMacros']
+    time_re = re.compile(r'\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d|ticket=[0-9a-f.]+')
+
+    def parse_both(self, body):
+        cfg = self.request.cfg
+        fast_scan = cfg.parser_fast_scan
+        page = self.request.page
+        self.request.page = Page(self.request, PAGENAME) # some macros need it
+        try:
+            cfg.parser_fast_scan = False
+            full = self.parse(body)
+            cfg.parser_fast_scan = True
+            fast = self.parse(body)
+        finally:
+            cfg.parser_fast_scan = fast_scan
+            self.request.page = page
+        return full, fast
+
+    def testSameOutput(self):
+        """ parser.wiki: line scanner output is the same as with the full scan regex """
+        full, fast = self.parse_both(self.text)
+        assert full == fast
+
+    def testSameOutputUnderlay(self):
+        """ parser.wiki: line scanner output is the same for markup help pages """
+        for pagename in self.pagenames:
+            body = Page(self.request, pagename).get_raw_body()
+            assert body
+            full, fast = self.parse_both(body)
+            # DateTime macros and attachment upload tickets depend on the time
+            full, fast = [self.time_re.sub(u'TIME', html) for html in (full, fast)]
+            assert full == fast, pagename
+
 
 coverage_modules = ['MoinMoin.parser.text_moin_wiki']
 
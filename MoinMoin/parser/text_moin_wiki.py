@@ -21,6 +21,161 @@ Dependencies = ['user'] # {{{#!wiki comment ... }}} has different output dependi
 
 _ = lambda x: x
 
+# regex characters, hints without them are checked with a substring test
+_hint_special_re = re.compile(r'[\\\[\](){}.*+?^$|]')
+
+
+class _LineScanner:
+    """ Scan lines with the alternatives of the scan rules that can match in them
+
+        Every alternative of the scan rules has a hint (see
+        Parser.scan_rule_list). The hints are checked for each line and only
+        the alternatives whose hints match are searched, each one with its own
+        regex (see _LineMatcher). Unlike the full scan regex, these regexes
+        mostly start with some literal, which makes searching them fast.
+    """
+
+    def __init__(self, rule_list, rule_vars, flags):
+        rules = [rule % rule_vars for hint, rule in rule_list]
+        full_re = re.compile(u'|'.join(rules), flags)
+        # names of all groups, match.groupdict() has them in this order
+        groupdict = {}
+        for name in full_re.groupindex.keys():
+            groupdict[name] = None
+        groupnames = groupdict.keys()
+        self.groupnames = set(groupnames)
+
+        # name of the outermost group of an alternative -> names of the
+        # groups in it, in groupdict order (see Parser.replace)
+        self.candidates = {}
+        self.rule_res = []
+        for rule in rules:
+            rule_re = re.compile(rule, flags)
+            groupindex = rule_re.groupindex
+            outer = min(groupindex.keys(), key=groupindex.get)
+            self.candidates[outer] = [name for name in groupnames
+                                      if name in groupindex and name != 'hmarker']
+            self.rule_res.append(rule_re)
+
+        # hint -> mask of the alternatives having it
+        masks = {}
+        for index, (hint, rule) in enumerate(rule_list):
+            hint = hint % rule_vars
+            masks[hint] = masks.get(hint, 0) | (1 << index)
+        self.literal_hints = [] # (substring, mask)
+        self.start_hints = [] # (regex matching at line start, mask)
+        self.hints = [] # (regex, mask)
+        for hint, mask in masks.items():
+            if hint.startswith(u'^'):
+                self.start_hints.append((re.compile(hint, re.UNICODE), mask))
+            elif _hint_special_re.search(hint):
+                self.hints.append((re.compile(hint, re.UNICODE), mask))
+            else:
+                self.literal_hints.append((hint, mask))
+        self.mask_res = {} # alternatives mask -> regexes
+
+    def get_matcher(self, line):
+        """ Return a _LineMatcher for line """
+        mask = 0
+        for hint, hint_mask in self.literal_hints:
+            if hint in line:
+                mask |= hint_mask
+        for hint_re, hint_mask in self.start_hints:
+            if hint_re.match(line):
+                mask |= hint_mask
+        for hint_re, hint_mask in self.hints:
+            if hint_re.search(line):
+                mask |= hint_mask
+        try:
+            rule_res = self.mask_res[mask]
+        except KeyError:
+            rule_res = self.mask_res[mask] = [rule_re for index, rule_re in enumerate(self.rule_res)
+                                              if mask & (1 << index)]
+        return _LineMatcher(line, rule_res)
+
+
+class _LineMatcher:
+    """ Search a line like the full scan regex does, using the regexes of
+        the alternatives
+
+        The full scan regex finds the leftmost position where one of its
+        alternatives matches and the first of the alternatives matching
+        there. The leftmost match of every alternative is kept until the
+        search position gets past it, so every alternative is searched about
+        once per match it has in the line.
+    """
+    def __init__(self, line, rule_res):
+        self.line = line
+        # [start of the next match, regex, next match] of the alternatives,
+        # in the order of the scan rules
+        self.pending = [[-1, rule_re, None] for rule_re in rule_res]
+
+    def search(self, pos):
+        """ Return the first match at or after pos (or None) """
+        line = self.line
+        first = None
+        pending = []
+        for item in self.pending:
+            if item[0] < pos:
+                match = item[1].search(line, pos)
+                if match is None:
+                    continue # it won't match later in the line either
+                item[0] = match.start()
+                item[2] = match
+            pending.append(item)
+            if first is None or item[0] < first[0]:
+                first = item
+        self.pending = pending
+        return first and first[2]
+
+
+class _MatchGroups:
+    """ The groups of a match of a _LineMatcher, looked up like in
+        match.groupdict() of a match of the full scan regex
+    """
+    def __init__(self, match, groupnames):
+        self.match = match
+        self.groupnames = groupnames
+
+    def get(self, name, default=None):
+        try:
+            return self.match.group(name)
+        except IndexError:
+            if name in self.groupnames:
+                return None # group of an alternative that was left out
+            return default
+
+    def __getitem__(self, name):
+        try:
+            return self.match.group(name)
+        except IndexError:
+            if name in self.groupnames:
+                return None
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self.groupnames
+
+
+# scan rules -> _LineScanner, or None if scan_rule_list does not make scan_rules
+_line_scanners = {}
+
+def _get_line_scanner(parser):
+    """ Get the _LineScanner for the scan rules of a parser (class) """
+    scan_rules = parser.scan_rules
+    try:
+        return _line_scanners[scan_rules]
+    except KeyError:
+        rule_list = parser.scan_rule_list
+        if u'|'.join([rule for hint, rule in rule_list]) % parser.scan_rule_vars != scan_rules:
+            # scan_rules changed in a subclass, we do not know the hints
+            scanner = None
+        else:
+            scanner = _LineScanner(rule_list, parser.scan_rule_vars, parser.scan_re.flags)
+        _line_scanners[scan_rules] = scanner
+        return scanner
+
+
 class Parser:
     """
         Parse wiki format markup (and call the formatter to generate output).
@@ -246,36 +401,56 @@ class Parser:
 
     # the big, fat, less ugly one ;)
     # please be very careful: blanks and # must be escaped with \ !
-    scan_rules = ur"""
+    # scan_rules is made of these alternatives (tried in this order), each one
+    # comes with a hint: a (non-verbose) regex that must match somewhere in a
+    # line for the alternative to match anywhere in it (see _LineScanner).
+    scan_rule_list = [
+        (u"''", ur"""
 (?P<emph_ibb>
     '''''(?=[^']+''')  # italic on, bold on, ..., bold off
-)|(?P<emph_ibi>
+)"""),
+        (u"''", ur"""
+(?P<emph_ibi>
     '''''(?=[^']+'')  # italic on, bold on, ..., italic off
-)|(?P<emph_ib_or_bi>
+)"""),
+        (u"''", ur"""
+(?P<emph_ib_or_bi>
     '{5}(?=[^'])  # italic and bold or bold and italic
-)|(?P<emph>
+)"""),
+        (u"''", ur"""
+(?P<emph>
     '{2,3}  # italic or bold
-)|(?P<u>
+)"""),
+        (u"__", ur"""
+(?P<u>
     __ # underline
-)|(?P<small>
+)"""),
+        (ur"~-|-~", ur"""
+(?P<small>
     (
      (?P<small_on>\~-\ ?)  # small on (we eat a trailing blank if it is there)
     |
      (?P<small_off>-\~)  # small off
     )
-)|(?P<big>
+)"""),
+        (ur"~\+|\+~", ur"""
+(?P<big>
     (
      (?P<big_on>\~\+\ ?)  # big on (eat trailing blank)
     |
      (?P<big_off>\+\~)  # big off
     )
-)|(?P<strike>
+)"""),
+        (ur"--\(|\)--", ur"""
+(?P<strike>
     (
      (?P<strike_on>--\()  # strike-through on
     |
      (?P<strike_off>\)--)  # strike-through off
     )
-)|(?P<remark>
+)"""),
+        (ur"/\*|\*/", ur"""
+(?P<remark>
     (
      (^|(?<=\s))  # we require either beginning of line or some whitespace before a remark begin
      (?P<remark_on>/\*\s)  # inline remark on (require and eat whitespace after it)
@@ -285,50 +460,76 @@ class Parser:
      (?P<remark_off>\s\*/)  # off (require and eat whitespace before it)
      (?=\s)  # we require some whitespace after a remark end
     )
-)|(?P<sup>
+)"""),
+        (ur"\^", ur"""
+(?P<sup>
     \^  # superscript on
     (?P<sup_text>.*?)  # capture the text
     \^  # off
-)|(?P<sub>
+)"""),
+        (u",,", ur"""
+(?P<sub>
     ,,  # subscript on
     (?P<sub_text>.*?)  # capture the text
     ,,  # off
-)|(?P<tt>
+)"""),
+        (ur"\{\{\{", ur"""
+(?P<tt>
     \{\{\{  # teletype on
     (?P<tt_text>.*?)  # capture the text
     \}\}\}  # off
-)|(?P<tt_bt>
+)"""),
+        (u"`", ur"""
+(?P<tt_bt>
     `  # teletype (using a backtick) on
     (?P<tt_bt_text>.*?)  # capture the text
     `  # off
-)|(?P<interwiki>
+)"""),
+        (u":", ur"""
+(?P<interwiki>
     %(interwiki_rule)s  # OtherWiki:PageName
-)|(?P<word>  # must come AFTER interwiki rule!
+)"""),
+        (ur"[%(u)s][%(l)s]+[%(u)s][%(l)s]", ur"""
+(?P<word>  # must come AFTER interwiki rule!
     %(word_rule)s  # CamelCase wiki words
-)|
+)"""),
+        (ur"\[\[", ur"""
 %(link_rule)s
-|
+"""),
+        (ur"\{\{", ur"""
 %(transclude_rule)s
-|(?P<url>
+"""),
+        (u":", ur"""
+(?P<url>
     %(url_rule)s
-)|(?P<email>
+)"""),
+        (u"@", ur"""
+(?P<email>
     [-\w._+]+  # name
     \@  # at
     [\w-]+(\.[\w-]+)+  # server/domain
-)|(?P<smiley>
+)"""),
+        (ur"%(smiley)s", ur"""
+(?P<smiley>
     (^|(?<=\s))  # we require either beginning of line or some space before a smiley
     (%(smiley)s)  # one of the smileys
     (?=\s)  # we require some space after the smiley
-)|(?P<macro>
+)"""),
+        (u"<<", ur"""
+(?P<macro>
     <<
     (?P<macro_name>\w+)  # name of the macro
     (?:\((?P<macro_args>.*?)\))?  # optionally macro arguments
     >>
-)|(?P<heading>
+)"""),
+        (u"^=", ur"""
+(?P<heading>
     ^(?P<hmarker>=+)\s+  # some === at beginning of line, eat trailing blanks
     (?P<heading_text>.*?)  # capture heading text
     \s+(?P=hmarker)\s$  # some === at end of line (matching amount as we have seen), eat blanks
-)|(?P<parser>
+)"""),
+        (ur"\{\{\{", ur"""
+(?P<parser>
     \{\{\{  # parser on
     (?P<parser_unique>(\{*|\w*))  # either some more {{{{ or some chars to solve the nesting problem
     (?P<parser_line>
@@ -345,33 +546,57 @@ class Parser:
      (?P<parser_nothing>\s*)  # no parser name, only whitespace up to EOL (eat it)
     )$
     # "parser off" detection is done with parser_scan_rule!
-)|(?P<comment>
+)"""),
+        (u"^##", ur"""
+(?P<comment>
     ^\#\#.*$  # src code comment, rest of line
-)|(?P<ol>
+)"""),
+        (ur"^\s", ur"""
+(?P<ol>
     %(ol_rule)s  # ordered list
-)|(?P<dl>
+)"""),
+        (ur"^\s", ur"""
+(?P<dl>
     %(dl_rule)s  # definition list
-)|(?P<li>
+)"""),
+        (ur"^\s", ur"""
+(?P<li>
     ^\s+\*\s*  # unordered list
-)|(?P<li_none>
+)"""),
+        (ur"^\s", ur"""
+(?P<li_none>
     ^\s+\.\s*  # unordered list, no bullets
-)|(?P<indent>
+)"""),
+        (ur"^\s", ur"""
+(?P<indent>
     ^\s+  # indented by some spaces
-)|(?P<tableZ>
+)"""),
+        (ur"\|\|", ur"""
+(?P<tableZ>
     \|\|\ $  # the right end of a table row
-)|(?P<table>
+)"""),
+        (ur"\|\|", ur"""
+(?P<table>
     (?:\|\|)+(?:<(?!<)[^>]*?>)?(?!\|?\s$) # a table
-)|(?P<rule>
+)"""),
+        (u"----", ur"""
+(?P<rule>
     -{4,}  # hor. rule, min. 4 -
-)|(?P<entity>
+)"""),
+        (u"&", ur"""
+(?P<entity>
     &(
       ([a-zA-Z]+)  # symbolic entity, like &uuml;
       |
       (\#(\d{1,5}|x[0-9a-fA-F]+))  # numeric entities, like &#42; or &#x42;
      );
-)|(?P<sgml_entity>  # must come AFTER entity rule!
+)"""),
+        (u"[<>&]", ur"""
+(?P<sgml_entity>  # must come AFTER entity rule!
     [<>&]  # needs special treatment for html/xml
-)"""  % {
+)"""),
+    ]
+    scan_rule_vars = {
         'url_scheme': url_scheme,
         'url_rule': url_rule,
         'punct': punct_pattern,
@@ -384,6 +609,7 @@ class Parser:
         'u': config.chars_upper,
         'l': config.chars_lower,
         'smiley': u'|'.join([re.escape(s) for s in config.smileys])}
+    scan_rules = u'|'.join([rule for hint, rule in scan_rule_list]) % scan_rule_vars
     scan_re = re.compile(scan_rules, re.UNICODE|re.VERBOSE)
 
     # Don't start p before these
@@ -402,6 +628,8 @@ class Parser:
         self.line_anchors = kw.get('line_anchors', True)
         self.start_line = kw.get('start_line', 0)
         self.macro = None
+        # scans lines with only the scan rules that can match in them
+        self._line_scanner = self.cfg.parser_fast_scan and _get_line_scanner(self) or None
 
         # currently, there is only a single, optional argument to this parser and
         # (when given), it is used as class(es) for a div wrapping the formatter output
@@ -1339,11 +1567,20 @@ class Parser:
         lastpos = 0 # absolute position within line
         line_length = len(line)
 
+        line_scanner = self._line_scanner
+        line_matcher = None
+
         ###result.append(u'<span class="info">[scan: <tt>"%s"</tt>]</span>' % line)
         while lastpos <= line_length: # it is <=, not <, because we need to process the empty line also
-            parser_scan_re = re.compile(self.parser_scan_rule % re.escape(self.parser_unique), re.VERBOSE|re.UNICODE)
-            scan_re = self.in_pre and parser_scan_re or self.scan_re
-            match = scan_re.search(line, lastpos)
+            if self.in_pre:
+                scan_re = re.compile(self.parser_scan_rule % re.escape(self.parser_unique), re.VERBOSE|re.UNICODE)
+                match = scan_re.search(line, lastpos)
+            elif line_scanner is None:
+                match = self.scan_re.search(line, lastpos)
+            else:
+                if line_matcher is None:
+                    line_matcher = line_scanner.get_matcher(line)
+                match = line_matcher.search(lastpos)
             if match:
                 start = match.start()
                 if lastpos < start:
@@ -1392,20 +1629,19 @@ class Parser:
 
     def replace(self, match, inhibit_p=False):
         """ Replace match using type name """
-        result = []
+        line_scanner = self._line_scanner
+        types = line_scanner and line_scanner.candidates.get(match.lastgroup)
+        if types:
+            # match of a _LineMatcher: only look at the groups of the
+            # matching alternative
+            for type in types:
+                hit = match.group(type)
+                if hit is not None:
+                    groups = _MatchGroups(match, line_scanner.groupnames)
+                    return self._replace_hit(type, hit, groups, inhibit_p)
         for type, hit in match.groupdict().items():
             if hit is not None and not type in ["hmarker", ]:
-
-                ##result.append(u'<span class="info">[replace: %s: "%s"]</span>' % (type, hit))
-                # Open p for certain types
-                if not (inhibit_p or self.inhibit_p or self.formatter.in_p
-                        or self.in_pre or (type in self.no_new_p_before)):
-                    result.append(self.formatter.paragraph(1, css_class="line891"))
-
-                # Get replace method and replace hit
-                replace_func = getattr(self, '_%s_repl' % type)
-                result.append(replace_func(hit, match.groupdict()))
-                return ''.join(result)
+                return self._replace_hit(type, hit, match.groupdict(), inhibit_p)
         else:
             # We should never get here
             import pprint
@@ -1417,6 +1653,20 @@ class Parser:
 
         return ""
 
+    def _replace_hit(self, type, hit, groups, inhibit_p):
+        """ Replace hit (the text of the group type) using type name """
+        result = []
+        ##result.append(u'<span class="info">[replace: %s: "%s"]</span>' % (type, hit))
+        # Open p for certain types
+        if not (inhibit_p or self.inhibit_p or self.formatter.in_p
+                or self.in_pre or (type in self.no_new_p_before)):
+            result.append(self.formatter.paragraph(1, css_class="line891"))
+
+        # Get replace method and replace hit
+        replace_func = getattr(self, '_%s_repl' % type)
+        result.append(replace_func(hit, groups))
+        return ''.join(result)
+
     def _line_anchordef(self):
         if self.line_anchors and not self.line_anchor_printed:
             self.line_anchor_printed = 1
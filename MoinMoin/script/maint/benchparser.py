@@ -0,0 +1,130 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - benchparser script
+
+@copyright: 2026 MoinMoin development team
+@license: GNU GPL, see COPYING for details.
+"""
+
+import re, time
+
+from MoinMoin.Page import Page
+from MoinMoin.formatter.text_html import Formatter
+from MoinMoin.parser.text_moin_wiki import Parser
+from MoinMoin.script import MoinScript
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script renders the wiki markup pages of the underlay to HTML with both
+scanning engines of the wiki parser: the full scan regex and the line scanner
+(used if parser_fast_scan is enabled). It shows the time each engine needs
+and checks that both make byte-identical HTML.
+
+Pages whose output changes between two renderings with the same engine (e.g.
+because of macros showing the current time) can't be compared and are only
+counted.
+
+Detailed Instructions:
+======================
+General syntax: moin [options] maint benchparser [benchparser-options]
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[benchparser-options] see below:
+    --pages=REGEX   only render pages with names matching REGEX
+    --rounds=N      render the pages N times with each engine (default: 3)
+    --all           also render pages that are not in the underlay
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+        self.parser.add_option(
+            "--pages", metavar="REGEX", dest="pages",
+            help="only render pages with names matching REGEX"
+        )
+        self.parser.add_option(
+            "--rounds", metavar="N", dest="rounds", type="int", default=3,
+            help="render the pages N times with each engine (default: 3)"
+        )
+        self.parser.add_option(
+            "--all", action="store_true", dest="all_pages",
+            help="also render pages that are not in the underlay"
+        )
+
+    def render(self, page, fast):
+        """ Render page to HTML with the fast or the full scanning engine """
+        request = self.request
+        request.cfg.parser_fast_scan = fast
+        request.page = page
+        request.reset()
+        formatter = Formatter(request)
+        formatter.setPage(page)
+        request.formatter = formatter
+        parser = Parser(page.get_raw_body(), request)
+        def send():
+            request.write(formatter.startDocument(page.page_name))
+            request.write(formatter.startContent())
+            parser.format(formatter)
+            request.write(formatter.endContent())
+            request.write(formatter.endDocument())
+        return request.redirectedOutput(send)
+
+    def get_pages(self):
+        request = self.request
+        pages = []
+        name_re = self.options.pages and re.compile(self.options.pages, re.UNICODE)
+        for pagename in request.rootpage.getPageList(user='', exists=1):
+            if name_re and not name_re.search(pagename):
+                continue
+            page = Page(request, pagename)
+            if not (self.options.all_pages or page.isUnderlayPage()):
+                continue
+            if page.pi['format'] == 'wiki':
+                pages.append(page)
+        return pages
+
+    def mainloop(self):
+        self.init_request()
+        request = self.request
+        fast_scan = request.cfg.parser_fast_scan
+        pages = self.get_pages()
+        rounds = max(self.options.rounds, 1)
+        try:
+            # the first rounds warm up the caches (e.g. of macros)
+            outputs = {}
+            for fast in (False, True):
+                outputs[fast] = [self.render(page, fast) for page in pages]
+            times = {False: [], True: []}
+            for i in range(rounds):
+                for fast in (False, True):
+                    start = time.time()
+                    output = [self.render(page, fast) for page in pages]
+                    times[fast].append(time.time() - start)
+                    if not fast:
+                        # pages changing between renderings can't be compared
+                        unstable = [index for index, html in enumerate(output)
+                                    if html != outputs[False][index]]
+                        for index in unstable:
+                            outputs[False][index] = outputs[True][index] = None
+        finally:
+            request.cfg.parser_fast_scan = fast_scan
+
+        compared = [index for index, html in enumerate(outputs[False]) if html is not None]
+        mismatches = [pages[index].page_name for index in compared
+                      if outputs[False][index] != outputs[True][index]]
+        full_time, fast_time = min(times[False]), min(times[True])
+        print "Pages: %d (%d compared, %d with changing output)" % (
+            len(pages), len(compared), len(pages) - len(compared))
+        print "Full scan regex: %.3fs" % full_time
+        print "Line scanner:    %.3fs" % fast_time
+        if fast_time:
+            print "Speedup:         %.2fx" % (full_time / fast_time)
+        if mismatches:
+            print "Output differs for %d pages:" % len(mismatches)
+            for pagename in mismatches:
+                print "    %s" % pagename.encode('utf-8')
+        else:
+            print "Output is identical for all compared pages."
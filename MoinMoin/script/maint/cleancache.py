@@ -7,6 +7,8 @@ MoinMoin - cleancache script
 @license: GNU GPL, see COPYING for details.
 """
 
+import os
+
 from MoinMoin import caching, i18n, user
 from MoinMoin.Page import Page
 from MoinMoin.script import MoinScript
@@ -43,7 +45,7 @@ General syntax: moin [options] maint cleancache
         request = self.request
 
         # clean page scope cache entries
-        keys = ['text_html', 'pagelinks', 'hitcounts', ]
+        keys = ['text_html', 'pagelinks', 'parseevents', 'hitcounts', ]
         pages = request.rootpage.getPageList(user='')
         for pagename in pages:
             arena = Page(request, pagename)
@@ -55,14 +57,24 @@ General syntax: moin [options] maint cleancache
             ('charts', 'hitcounts'),
             ('charts', 'pagehits'),
             ('charts', 'useragents'),
+            ('pagelists', 'index'),
+            ('itemcache', 'meta'),
+            ('linkgraph', 'index'),
+            ('groupdictindex', 'index'),
         ]
         for arena, key in arena_key_list:
             caching.CacheEntry(request, arena, key, scope='wiki').remove()
 
+        # clean the word index of the builtin search
+        caching.CacheEntry(request, os.path.join(request.cfg.cache_dir, 'wordindex'),
+                           'index', scope='dir').remove()
+
         # clean dict and groups related cache
         arena_scope_list =  [('pagedicts', 'wiki'),
                              ('pagegroups', 'wiki'),
                              ('users', 'userdir'),
+                             ('macrofragments', 'wiki'),
+                             ('pageoutput', 'wiki'),
         ]
         for arena, scope in arena_scope_list:
             for key in caching.get_cache_list(request, arena, scope):
@@ -78,3 +90,7 @@ General syntax: moin [options] maint cleancache
         wiki_languages = i18n.wikiLanguages().keys()
         for key in wiki_languages:
             caching.CacheEntry(request, 'i18n', key, scope='wiki').remove()
+            caching.CacheEntry(request, 'i18n', '%s.MoinMoin.formatted' % key, scope='wiki').remove()
+        # compiled translation catalogs
+        for key in caching.get_cache_list(request, 'i18n', 'farm'):
+            caching.CacheEntry(request, 'i18n', key, scope='farm').remove()
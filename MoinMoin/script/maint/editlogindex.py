@@ -0,0 +1,66 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - editlogindex script
+
+@copyright: 2026 MoinMoin development team
+@license: GNU GPL, see COPYING for details.
+"""
+
+import os
+
+from MoinMoin.Page import Page
+from MoinMoin.logfile import editlog
+from MoinMoin.script import MoinScript
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script rebuilds the index (sidecar) files of the edit-logs,
+data/edit-log.index for the global edit-log and optionally
+data/pages/PageName/edit-log.index for the local edit-logs of the pages.
+
+The index files are usually maintained automatically, you only need this
+if you edited a log file manually or want to build the indexes in advance.
+
+Detailed Instructions:
+======================
+General syntax: moin [options] maint editlogindex [editlogindex-options]
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+
+[editlogindex-options] see below:
+    --pages    also rebuild the indexes of the local edit-logs of all pages
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+
+        self.parser.add_option(
+            "--pages", action="store_true", dest="pages",
+            help="also rebuild the indexes of the local edit-logs of all pages"
+        )
+
+    def rebuild(self, filename):
+        index = editlog.EditLogIndex(filename)
+        index.update()
+        index.save(self.request)
+        return index
+
+    def mainloop(self):
+        self.init_request()
+        request = self.request
+
+        filename = request.rootpage.getPagePath('edit-log', isfile=1)
+        index = self.rebuild(filename)
+        print "%s: %d lines" % (filename, index.count)
+
+        if self.options.pages:
+            count = 0
+            for pagename in request.rootpage.getPageList(user='', exists=0):
+                filename = Page(request, pagename).getPagePath('edit-log', use_underlay=0, isfile=1, check_create=0)
+                if os.path.exists(filename):
+                    self.rebuild(filename)
+                    count += 1
+            print "rebuilt the edit-log indexes of %d pages" % count
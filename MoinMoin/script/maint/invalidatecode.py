@@ -0,0 +1,39 @@
+# -*- coding: iso-8859-1 -*-
+"""
+MoinMoin - invalidatecode script
+
+@copyright: 2026 MoinMoin development team
+@license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import caching
+from MoinMoin.script import MoinScript
+
+class PluginScript(MoinScript):
+    """\
+Purpose:
+========
+This script makes the wiki processes started afterwards ignore the compiled
+page caches (text_html) made so far, without removing them like cleancache.
+
+Compiled page caches contain a code version, which every process computes
+once when it loads the wiki config (from the mtimes of the MoinMoin directory
+and the config). Run this script when deploying changes that do not change
+these mtimes (e.g. in a subdirectory of MoinMoin or in plugins) and restart
+the wiki processes.
+
+Detailed Instructions:
+======================
+General syntax: moin [options] maint invalidatecode
+
+[options] usually should be:
+    --config-dir=/path/to/my/cfg/ --wiki-url=http://wiki.example.org/
+"""
+
+    def __init__(self, argv, def_values):
+        MoinScript.__init__(self, argv, def_values)
+
+    def mainloop(self):
+        self.init_request()
+        version = caching.invalidate_code_version(self.request.cfg)
+        print "New code version: %d (used by processes started from now on)" % version
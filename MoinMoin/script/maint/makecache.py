@@ -46,3 +46,7 @@ General syntax: moin [options] maint makecache
             request.page = page
             p = page.getPageLinks(request)
 
+        # let new processes start with the page meta data and page list
+        request.cfg.cache.meta.save_snapshot(request)
+        request.cfg.cache.pagelists.save_snapshot(request)
+
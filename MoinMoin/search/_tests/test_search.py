@@ -17,6 +17,8 @@ import py
 from MoinMoin.search import QueryError, _get_searcher
 from MoinMoin.search.queryparser import QueryParser
 from MoinMoin.search.builtin import MoinSearch
+from MoinMoin.search.wordindex import WordIndex, WordTable
+from MoinMoin.PageEditor import PageEditor
 from MoinMoin._tests import nuke_xapian_index, wikiconfig, become_trusted, create_page, nuke_page, append_page
 from MoinMoin.wikiutil import Version
 from MoinMoin.action import AttachFile
@@ -432,6 +434,103 @@ class TestMoinSearch(BaseSearchTest):
         assert found_pages == expected_pages
 
 
+class TestWordIndex(object):
+    """ search: test the word index of the builtin search """
+    pages = {u'ContentSearchUpper': u'Find the NEEDLE in the haystack.',
+             u'ContentSearchLower': u'Find the needle in the haystack.',
+             u'SearchTestLinksLowerCase': u'searchtestpage',
+             u'TestOnEditing': u'another test page',
+             u'TestLinkToEditing': u'See TestOnEditing.',
+            }
+
+    @classmethod
+    def setup_class(cls):
+        request = cls.request
+        become_trusted(request)
+        for page, text in cls.pages.iteritems():
+            create_page(request, page, text)
+
+    def teardown_class(self):
+        for page in self.pages:
+            nuke_page(self.request, page)
+
+    def candidates(self, query):
+        query = QueryParser().parse_query(query)
+        return WordIndex(self.request).candidates(query)
+
+    def search(self, query):
+        result = MoinSearch(self.request, QueryParser().parse_query(query)).run()
+        return set([hit.page_name for hit in result.hits])
+
+    def test_same_results(self):
+        request = self.request
+        for query in [u'needle', u'case:NEEDLE', u'ystac', u'the haystack', u'"the haystack"',
+                      u'title:lowercase', u'needle or editing', u'page -another', u'"need[le"',
+                      u'linkto:TestOnEditing', u'linkto:re:TestOn.*']:
+            request.cfg.search_wordindex = False
+            try:
+                expected = self.search(query)
+            finally:
+                request.cfg.search_wordindex = True
+            assert self.search(query) == expected
+
+    def test_candidates(self):
+        candidates = self.candidates(u'needle haystack')
+        assert u'ContentSearchUpper' in candidates
+        assert u'ContentSearchLower' in candidates
+        assert u'SearchTestPage' not in candidates
+        # parts of words and title words
+        candidates = self.candidates(u'eedl')
+        assert u'ContentSearchUpper' in candidates
+        assert u'SearchTestLinksLowerCase' in self.candidates(u'title:LowerCase')
+        assert u'SearchTestLinksLowerCase' not in self.candidates(u'title:needle')
+        candidates = self.candidates(u'needle or "another test"')
+        assert u'ContentSearchLower' in candidates
+        assert u'TestOnEditing' in candidates
+        # terms the index can't be used for
+        for query in [u'-needle', u're:need.e', u'need.e', u'needle or -haystack', u'category:CategoryHomepage']:
+            assert self.candidates(query) is None
+
+    def test_update(self):
+        pagename = u'TestWordIndexUpdate'
+        request = self.request
+        self.candidates(u'xyzzy') # builds the index
+        try:
+            create_page(request, pagename, u'xyzzy')
+            assert self.candidates(u'xyzzy') == set([pagename])
+            # changes without a page changed event are found in the edit-log
+            PageEditor(request, pagename).saveText(u'plugh', 0, notify=False)
+            assert self.candidates(u'xyzzy') == set()
+            assert self.candidates(u'plugh') == set([pagename])
+            # the index got saved, a new process loads it
+            request.cfg.cache.wordindex = WordTable()
+            assert self.candidates(u'plugh') == set([pagename])
+        finally:
+            nuke_page(request, pagename)
+
+    def test_table(self):
+        table = WordTable()
+        table.add_page(u'NeedlePage', u'a haystack with a needle')
+        table.add_page(u'OtherPage', u'a stack of hay')
+        needle, other = table.ids[u'NeedlePage'], table.ids[u'OtherPage']
+        assert table.lookup(u'stack') == set([needle, other])
+        assert table.lookup(u'ystac') == set([needle])
+        assert table.lookup(u'st') == set([needle, other])
+        assert table.lookup(u'needle', title=True) == set([needle])
+        assert table.lookup(u'xyz') == set()
+        table.remove_pages([u'NeedlePage'])
+        assert table.lookup(u'stack') == set([other])
+        assert table.lookup(u'needle') == set()
+        assert u'haystack' not in table.words
+        assert u'hay' not in table.trigrams[u'sta']
+        # a loaded table can remove pages, too
+        loaded = WordTable()
+        loaded.loads(table.dumps())
+        loaded.remove_pages([u'OtherPage'])
+        assert loaded.words == {}
+        assert loaded.titles == {}
+
+
 class TestXapianSearch(BaseSearchTest):
     """ search: test Xapian indexing / search """
 
@@ -352,13 +352,16 @@ class BaseSearch(object):
 
         @param hits: list of hits
         """
-        userMayRead = self.request.user.may.read
         fs_rootpage = self.fs_rootpage + "/"
         thiswiki = (self.request.cfg.interwikiname, 'Self')
+        existing = [page.page_name
+                    for wikiname, page, attachment, match, rev in hits
+                        if wikiname in thiswiki and page.exists()]
+        readable = set(self.request.user.may.read_many(existing))
         filtered = [(wikiname, page, attachment, match, rev)
                 for wikiname, page, attachment, match, rev in hits
                     if (not wikiname in thiswiki or
-                       page.exists() and userMayRead(page.page_name) or
+                       page.page_name in readable or
                        page.page_name.startswith(fs_rootpage)) and
                        (not self.mtime or self.mtime <= page.mtime_usecs()/1000000)]
         return filtered
@@ -460,12 +463,22 @@ class MoinSearch(BaseSearch):
         searching. If not, get a unfiltered page list. The filtering
         will happen later on the hits, which is faster with current
         slow storage.
+
+        If enabled, the word index is used to drop the pages that can't
+        match the query.
         """
         filter_ = self.query.pageFilter()
         if filter_:
             # There is no need to filter the results again.
             self.filtered = True
-            return self.request.rootpage.getPageList(filter=filter_)
+            pages = self.request.rootpage.getPageList(filter=filter_)
         else:
-            return self.request.rootpage.getPageList(user='', exists=0)
+            pages = self.request.rootpage.getPageList(user='', exists=0)
+
+        if self.request.cfg.search_wordindex:
+            from MoinMoin.search.wordindex import WordIndex
+            candidates = WordIndex(self.request).candidates(self.query)
+            if candidates is not None:
+                pages = [pagename for pagename in pages if pagename in candidates]
+        return pages
 
@@ -30,6 +30,9 @@ try:
 except ImportError:
     pass
 
+# characters that make a pattern a regular expression
+regex_chars_re = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
 
 class BaseExpression(object):
     """ Base class for all search terms """
@@ -79,6 +82,18 @@ class BaseExpression(object):
         """
         return None
 
+    def wordindex_candidates(self, index):
+        """ Return the pages that may match this term
+
+        Used by the builtin search to narrow down the pages it has to
+        search, see MoinMoin.search.wordindex.
+
+        The default expression can't be looked up in the index and
+        returns None (all pages). Sub classes may return a set of page
+        ids from the index, which must contain all pages they match.
+        """
+        return None
+
     def _get_matches(self, page):
         raise NotImplementedError
 
@@ -213,6 +228,21 @@ class AndExpression(BaseExpression):
         if terms:
             return lambda name: self._filter(terms, name)
 
+    def wordindex_candidates(self, index):
+        """ Return the pages all terms may match """
+        if self.negated:
+            return None
+        result = None
+        for term in self._subterms:
+            pages = term.wordindex_candidates(index)
+            if pages is None:
+                continue
+            if result is None:
+                result = pages
+            else:
+                result = result & pages
+        return result
+
     def sortByCost(self):
         self._subterms.sort(key=lambda t: t.costs)
 
@@ -290,6 +320,18 @@ class OrExpression(AndExpression):
         logging.debug("pageFilter OR returns %r" % result)
         return result
 
+    def wordindex_candidates(self, index):
+        """ Return the pages any term may match """
+        if self.negated:
+            return None
+        result = set()
+        for term in self._subterms:
+            pages = term.wordindex_candidates(index)
+            if pages is None:
+                return None
+            result |= pages
+        return result
+
     def search(self, page):
         """ Search page with terms
 
@@ -315,6 +357,19 @@ class BaseTextFieldSearch(BaseExpression):
 
     _field_to_search = None
 
+    def _wordindex_text(self):
+        """ Return the text every match of this term contains
+
+        Returns None if the term is negated or the pattern is a regular
+        expression (note that plain text patterns are used as regular
+        expressions, too, unless they are invalid ones).
+        """
+        if self.negated:
+            return None
+        if self.pattern == self._pattern and regex_chars_re.search(self._pattern):
+            return None
+        return self._pattern
+
     def xapian_term(self, request, connection):
         if self.use_re:
             queries = [self._get_query_for_search_re(connection, self._field_to_search)]
@@ -396,6 +451,11 @@ class TextSearch(BaseTextFieldSearch):
             title_query = TitleSearch(self._pattern, use_re=self.use_re, case=self.case).xapian_term(request, connection)
             return Query(OP_OR, [title_query, content_query])
 
+    def wordindex_candidates(self, index):
+        text = self._wordindex_text()
+        if text is not None:
+            return index.lookup(text)
+
     def xapian_need_postproc(self):
         # case-sensitive: xapian is case-insensitive, therefore we need postproc
         # regex: xapian can't do regex search. also we don't have full content
@@ -421,6 +481,11 @@ class TitleSearch(BaseTextFieldSearch):
             return result
         return filter
 
+    def wordindex_candidates(self, index):
+        text = self._wordindex_text()
+        if text is not None:
+            return index.lookup(text, title=True)
+
     def _get_matches(self, page):
         """ Get matches in page name """
         matches = []
@@ -468,6 +533,14 @@ class LinkSearch(BaseFieldSearch):
 
         return u"(%s)" % self._textpattern
 
+    def wordindex_candidates(self, index):
+        if self.negated:
+            return None
+        # the pages linking to a matching page name
+        request = index.request
+        pagenames = request.cfg.cache.linkgraph.links_to_matching(request, self.search_re.match)
+        return index.pageids(pagenames)
+
     def _get_matches(self, page):
         # Get matches in page links
         matches = []
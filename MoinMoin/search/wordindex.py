@@ -0,0 +1,400 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - inverted word index for the builtin search
+
+    Without Xapian, MoinSearch has to load every page body and run the
+    query's regular expressions on it. This index maps the (lowercased)
+    words of page names and bodies to the pages containing them, so text
+    and title searches only need to verify the candidate pages it returns
+    (see BaseExpression.wordindex_candidates).
+
+    Search terms match substrings, so a term fragment is looked up in the
+    words containing all of its trigrams (shorter fragments scan the
+    vocabulary). The candidates are always a superset of the matching pages.
+
+    The index is kept in memory (one WordTable per process, in
+    cfg.cache.wordindex) and stored in the cache directory together with the
+    edit-log position it is up-to-date with. Page change events only queue
+    the changed pages in the IndexerQueue. The queue and the edit-log lines
+    appended since then are processed by the next search, the index file is
+    only rewritten after save_threshold page updates.
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, re, sys, marshal, threading
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.Page import Page, PageListIndex
+from MoinMoin.logfile import editlog
+from MoinMoin.search.builtin import BaseIndex
+
+word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def get_words(text):
+    """ Return the set of (lowercased) words in text """
+    return set(word_re.findall(text.lower()))
+
+
+def get_trigrams(word):
+    """ Return the set of 3 character substrings of word """
+    return set([word[i:i+3] for i in range(len(word) - 2)])
+
+
+class WordTable(object):
+    """ In-memory word index, shared by the requests of a process
+
+        words maps every word of a page name or body to the set of ids of
+        the pages containing it, titles does the same for page name words
+        only. page_words maps the page ids to their words, so a page can be
+        removed without looking at the whole vocabulary. trigrams maps
+        trigrams to the words containing them, it is made by the first
+        lookup needing it.
+    """
+    version = 1
+
+    def __init__(self):
+        # re-entrant: linkto: terms query the link graph, which may render
+        # pages, which may run a search
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        self.uid = None # uid of the index file we loaded or saved
+        self.stamp = None
+        self.log_pos = None
+        self.next_id = 0
+        self.ids = {} # page name -> page id
+        self.names = {} # page id -> page name
+        self.words = {}
+        self.titles = {}
+        self.page_words = {}
+        self.trigrams = None
+        self.changes = 0 # page updates since the last load or save
+
+    def loads(self, data):
+        """ Load the table from a string made by dumps().
+
+            Raises ValueError if data is not usable.
+        """
+        try:
+            (version, stamp, log_pos, next_id,
+             ids, words, titles) = marshal.loads(data)
+        except (EOFError, TypeError), err:
+            raise ValueError(str(err))
+        if version != self.version:
+            raise ValueError("word index version mismatch")
+        self.stamp, self.log_pos, self.next_id = stamp, log_pos, next_id
+        self.ids, self.words, self.titles = ids, words, titles
+        self.names = dict([(pageid, pagename) for pagename, pageid in ids.iteritems()])
+        page_words = {}
+        for word, pageids in words.iteritems():
+            for pageid in pageids:
+                page_words.setdefault(pageid, []).append(word)
+        self.page_words = page_words
+        self.trigrams = None
+        self.changes = 0
+
+    def dumps(self):
+        return marshal.dumps((self.version, self.stamp, self.log_pos, self.next_id,
+                              self.ids, self.words, self.titles))
+
+    def add_page(self, pagename, body):
+        """ Add a page, which must not be in the table yet """
+        pageid = self.next_id
+        self.next_id += 1
+        self.ids[pagename] = pageid
+        self.names[pageid] = pagename
+        title_words = get_words(pagename)
+        for word in title_words:
+            self.titles.setdefault(word, set()).add(pageid)
+        page_words = title_words | get_words(body)
+        trigrams = self.trigrams
+        for word in page_words:
+            if word not in self.words:
+                self.words[word] = set()
+                if trigrams is not None:
+                    for trigram in get_trigrams(word):
+                        trigrams.setdefault(trigram, set()).add(word)
+            self.words[word].add(pageid)
+        self.page_words[pageid] = list(page_words)
+        self.changes += 1
+
+    def remove_pages(self, pagenames):
+        """ Remove pages from the table (if they are in there) """
+        for pagename in pagenames:
+            pageid = self.ids.pop(pagename, None)
+            if pageid is None:
+                continue
+            del self.names[pageid]
+            self._remove_postings(self.titles, pageid, get_words(pagename))
+            removed = self._remove_postings(self.words, pageid, self.page_words.pop(pageid, []))
+            if self.trigrams is not None:
+                for word in removed:
+                    for trigram in get_trigrams(word):
+                        words = self.trigrams.get(trigram)
+                        if words is not None:
+                            words.discard(word)
+                            if not words:
+                                del self.trigrams[trigram]
+            self.changes += 1
+
+    def _remove_postings(self, postings, pageid, words):
+        """ Remove pageid from the postings of words
+
+            @return: the words no page has any more
+        """
+        removed = []
+        for word in words:
+            pages = postings.get(word)
+            if pages is not None:
+                pages.discard(pageid)
+                if not pages:
+                    del postings[word]
+                    removed.append(word)
+        return removed
+
+    def _get_trigrams(self):
+        if self.trigrams is None:
+            trigrams = {}
+            for word in self.words:
+                for trigram in get_trigrams(word):
+                    trigrams.setdefault(trigram, set()).add(word)
+            self.trigrams = trigrams
+        return self.trigrams
+
+    def lookup(self, fragment, title=False):
+        """ Return ids of the pages having a word containing fragment
+
+            @param fragment: lowercased word or part of a word
+            @param title: only look at the words of the page names
+        """
+        postings = title and self.titles or self.words
+        if len(fragment) < 3:
+            words = postings
+        else:
+            all_trigrams = self._get_trigrams()
+            words = None
+            # start with the rarest trigram
+            for trigram in sorted(get_trigrams(fragment),
+                                  key=lambda trigram: len(all_trigrams.get(trigram, ()))):
+                trigram_words = all_trigrams.get(trigram)
+                if not trigram_words:
+                    return set()
+                if words is None:
+                    words = set(trigram_words)
+                else:
+                    words &= trigram_words
+        pageids = set()
+        for word in words:
+            if fragment in word and word in postings:
+                pageids.update(postings[word])
+        return pageids
+
+
+class WordIndex(BaseIndex):
+    """ Inverted word index for the builtin search """
+    # only save the index after that many page updates
+    save_threshold = 20
+
+    def __init__(self, request):
+        BaseIndex.__init__(self, request)
+        self.table = request.cfg.cache.wordindex
+
+    def _main_dir(self):
+        return os.path.join(self.request.cfg.cache_dir, 'wordindex')
+
+    def _get_cache(self):
+        return caching.CacheEntry(self.request, self.main_dir, 'index',
+                                  scope='dir', use_pickle=False, do_locking=False)
+
+    def _get_stamp(self):
+        """ Return values that change when the index can't be updated from
+            the edit-log any more (see PageListIndex._get_stamp).
+        """
+        return PageListIndex()._get_stamp(self.request)
+
+    def exists(self):
+        """ Check if index exists """
+        return self._get_cache().exists()
+
+    def mtime(self):
+        """ Modification time of the index """
+        return self._get_cache().mtime()
+
+    def _load(self, cache):
+        """ Load the on-disk index into the table, unless the table already
+            has it.
+
+            @return: True if the table has the on-disk index
+        """
+        table = self.table
+        uid = cache.uid()
+        if uid is None:
+            return False
+        if uid == table.uid:
+            return True
+        try:
+            table.loads(cache.content())
+        except (caching.CacheError, ValueError), err:
+            logging.debug("can't load word index: %s" % str(err))
+            table.clear()
+            return False
+        table.uid = uid
+        return True
+
+    def _save(self, cache):
+        try:
+            cache.update(self.table.dumps())
+            self.table.uid = cache.uid()
+            self.table.changes = 0
+        except caching.CacheError, err:
+            logging.warning("could not save word index: %s" % str(err))
+            self.table.uid = None
+
+    def _rebuild(self, elog, stamp):
+        """ Rebuild the table from all existing pages """
+        request = self.request
+        table = self.table
+        table.clear()
+        # get the edit-log position first, so we do not miss changes
+        # happening while we index the pages
+        table.log_pos = elog.size()
+        table.stamp = stamp
+        for pagename in request.rootpage.getPageList(user='', exists=1):
+            table.add_page(pagename, Page(request, pagename).get_raw_body())
+        table.uid = None
+        logging.info("word index rebuilt (%d pages, %d words)" % (len(table.ids), len(table.words)))
+
+    def _update(self, cache, amount):
+        """ Process queued updates and the edit-log changes.
+
+            Must be called with the table lock held.
+
+            @return: number of processed queue entries
+        """
+        request = self.request
+        table = self.table
+        elog = editlog.EditLog(request)
+        stamp = self._get_stamp()
+        if amount < 0:
+            amount = sys.maxint
+        entries = self.update_queue.mget(amount)
+        if (not self._load(cache) or table.stamp != stamp or
+            table.log_pos > elog.size()):
+            self._rebuild(elog, stamp)
+        else:
+            table.log_pos, pagenames = elog.news(table.log_pos)
+            pagenames = set(pagenames)
+            pagenames.update([pagename for pagename, attachmentname, revno in entries])
+            table.remove_pages(pagenames)
+            for pagename in pagenames:
+                page = Page(request, pagename)
+                if page.exists():
+                    table.add_page(pagename, page.get_raw_body())
+        return len(entries)
+
+    def _refresh(self, force=False, amount=-1):
+        """ Bring the table up-to-date
+
+            @param force: update even if the table looks current
+            @param amount: how many queue entries to process (-1 == all)
+            @return: number of processed queue entries
+        """
+        table = self.table
+        table.lock.acquire()
+        try:
+            cache = self._get_cache()
+            if (not force and self._load(cache) and
+                table.stamp == self._get_stamp() and
+                table.log_pos == editlog.EditLog(self.request).size()):
+                return 0
+            processed = self._update(cache, amount)
+            # the table is ahead of the index file, other processes catch up
+            # from the edit-log until it is saved
+            if table.uid is None or table.changes >= self.save_threshold:
+                cache.lock('w', 60.0)
+                try:
+                    self._save(cache)
+                finally:
+                    cache.unlock()
+            return processed
+        finally:
+            table.lock.release()
+
+    def do_queued_updates(self, amount=-1):
+        """ Perform updates in the queue (and those found in the edit-log)
+
+        @keyword amount: how many queue entries to process (default: -1 == all)
+        """
+        return self._refresh(force=True, amount=amount)
+
+    def _index_pages(self, request, files=None, mode='update', pages=None):
+        """ Rebuild the index (files, mode and pages are ignored, the index
+            always covers all pages)
+        """
+        table = self.table
+        table.lock.acquire()
+        try:
+            cache = self._get_cache()
+            cache.lock('w', 60.0)
+            try:
+                self._rebuild(editlog.EditLog(self.request), self._get_stamp())
+                self._save(cache)
+            finally:
+                cache.unlock()
+        finally:
+            table.lock.release()
+
+    def lookup(self, text, title=False):
+        """ Return ids of the pages that may contain text
+
+        Every word (or part of a word) of text must be contained in a
+        word of the page. Must be called with the table lock held (see
+        candidates).
+
+        @param text: text of a search term (not a regular expression)
+        @param title: only look at the words of the page names
+        @return: set of page ids or None if text has no words
+        """
+        result = None
+        for fragment in get_words(text):
+            pageids = self.table.lookup(fragment, title)
+            if result is None:
+                result = pageids
+            else:
+                result &= pageids
+        return result
+
+    def pageids(self, pagenames):
+        """ Return ids of those of pagenames that are in the index
+
+        Must be called with the table lock held (see candidates).
+        """
+        ids = self.table.ids
+        return set([ids[pagename] for pagename in pagenames if pagename in ids])
+
+    def candidates(self, query):
+        """ Get the pages that may match query
+
+        The index is brought up-to-date (or built) first.
+
+        @param query: the search query objects tree
+        @return: set of page names or None if the index can't narrow down
+                 the pages for this query
+        """
+        self._refresh()
+        table = self.table
+        table.lock.acquire()
+        try:
+            pageids = query.wordindex_candidates(self)
+            if pageids is None:
+                return None
+            return set([table.names[pageid] for pageid in pageids])
+        finally:
+            table.lock.release()
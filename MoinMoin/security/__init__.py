@@ -19,7 +19,9 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import re
+import re, time
+from collections import OrderedDict
+from threading import Lock
 
 from MoinMoin import wikiutil, user
 from MoinMoin.Page import Page
@@ -31,6 +33,25 @@ from MoinMoin.Page import Page
 def _check(request, pagename, username, right):
     """ Check <right> access permission for user <username> on page <pagename>
 
+    Uses the ACL decision cache (if enabled), see _check_uncached for details.
+    """
+    decisions = request.cfg.cache.acl_decisions
+    if decisions is None:
+        return _check_uncached(request, pagename, username, right)
+    # _special_Trusted depends on how the current user authenticated:
+    trusted = (request.user.name == username and
+               request.user.auth_method in request.cfg.auth_methods_trusted)
+    key = (pagename, username, right, trusted, request.cfg.acl_hierarchic)
+    allowed = decisions.get(request, key)
+    if allowed is None:
+        allowed = _check_uncached(request, pagename, username, right)
+        decisions.put(key, allowed)
+    return allowed
+
+
+def _check_uncached(request, pagename, username, right):
+    """ Check <right> access permission for user <username> on page <pagename>
+
     For cfg.acl_hierarchic=False we just check the page in question.
 
     For cfg.acl_hierarchic=True we, we check each page in the hierarchy. We
@@ -94,6 +115,86 @@ def _check(request, pagename, username, right):
     return False
 
 
+def _check_many(request, pagenames, username, right):
+    """ Check <right> access permission for user <username> on many pages
+
+    This gives the same results as calling _check for each page, but does
+    the expensive work only once per batch: acl_rights_before/default/after
+    are evaluated once, every page (or parent page, for
+    cfg.acl_hierarchic=True) ACL is fetched once and each distinct ACL is
+    evaluated once, so the cost depends on the number of distinct ACLs
+    rather than on the number of pages.
+
+    This method should not be called by users, use __getattr__ instead.
+
+    @param request: the current request object
+    @param pagenames: iterable of pagenames to check
+    @param username: the user name
+    @param right: the right to check
+
+    @rtype: list
+    @return: pagenames the user has the right for (in the given order)
+    """
+    cache = request.cfg.cache
+    allowed = cache.acl_rights_before.may(request, username, right)
+    if allowed is not None:
+        if allowed:
+            return list(pagenames)
+        return []
+
+    decisions = {} # acl lines -> result of acl.may
+    def acl_may(acl):
+        if acl.acl_lines is None:
+            key = None # no page acl, acl.may uses acl_rights_default
+        else:
+            key = tuple(acl.acl_lines)
+        try:
+            return decisions[key]
+        except KeyError:
+            allowed = decisions[key] = acl.may(request, username, right)
+            return allowed
+
+    after = [] # cached result of the acl_rights_after check
+    def after_may():
+        if not after:
+            after.append(bool(cache.acl_rights_after.may(request, username, right)))
+        return after[0]
+
+    acls = {} # pagename -> acl, parent pages are shared by their sub pages
+    def get_acl(name):
+        try:
+            return acls[name]
+        except KeyError:
+            if request.page is not None and name == request.page.page_name:
+                p = request.page # reuse is good
+            else:
+                p = Page(request, name)
+            acl = acls[name] = p.getACL(request)
+            return acl
+
+    hierarchic = request.cfg.acl_hierarchic
+    result = []
+    for pagename in pagenames:
+        if hierarchic:
+            allowed = None
+            pages = pagename.split('/') # create page hierarchy list
+            for i in range(len(pages), 0, -1):
+                acl = get_acl('/'.join(pages[:i]))
+                if acl.acl:
+                    # the deepest page with an acl decides, see _check
+                    allowed = acl_may(acl)
+                    break
+            else:
+                allowed = acl_may(cache.acl_rights_default)
+        else:
+            allowed = acl_may(get_acl(pagename))
+        if allowed is None:
+            allowed = after_may()
+        if allowed:
+            result.append(pagename)
+    return result
+
+
 class Permissions:
     """ Basic interface for user permissions and system policy.
 
@@ -140,11 +241,27 @@ class Permissions:
         if attr is one of the rights in acl_rights_valid, then return a
         checking function for it. Else raise an AttributeError.
 
+        if attr is one of these rights with a "_many" suffix (e.g. read_many),
+        return a function accepting a list of pagenames and returning the
+        list of those pagenames the user has that right for. Use this if you
+        need to filter many pages, it is a lot faster than checking the pages
+        one by one.
+
         @param attr: one of ACL rights as defined in acl_rights_valid
         @rtype: function
         @return: checking function for that right, accepting a pagename
         """
         request = self.request
+        if attr.endswith('_many'):
+            right = attr[:-5]
+            if right not in request.cfg.acl_rights_valid:
+                raise AttributeError(attr)
+            if hasattr(self.__class__, right):
+                # a security policy customized the check for this right,
+                # we must not bypass it:
+                check = getattr(self, right)
+                return lambda pagenames: [pagename for pagename in pagenames if check(pagename)]
+            return lambda pagenames: _check_many(self.request, pagenames, self.name, right)
         if attr not in request.cfg.acl_rights_valid:
             raise AttributeError(attr)
         return lambda pagename: _check(self.request, pagename, self.name, attr)
@@ -373,6 +490,97 @@ class AccessControlList:
         return self.acl_lines != other.acl_lines
 
 
+class ACLDecisionCache:
+    """ LRU cache of final ACL decisions
+
+    Maps (pagename, username, right, ...) keys as built by _check to the
+    boolean result of _check_uncached, so repeated checks don't need to
+    fetch ACLs and expand groups again. One instance per process lives in
+    cfg.cache.acl_decisions.
+
+    Entries are invalidated using the edit-log: a change of a page drops
+    the decisions for this page and its sub pages (hierarchic ACLs), a change
+    of a group or dict page drops everything. Changes that do not show up in
+    the edit-log (user accounts, groups not defined on wiki pages) are
+    picked up when the entries expire after ttl seconds.
+    """
+    def __init__(self, size, ttl):
+        """
+        @param size: maximum number of cached decisions
+        @param ttl: maximum age of a cached decision in seconds
+        """
+        self.size = size
+        self.ttl = ttl
+        self.decisions = OrderedDict() # key -> (timestamp, allowed), oldest first
+        self.log_pos = None
+        self.lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, request, key):
+        """ Return the cached decision for key or None """
+        self.refresh(request)
+        self.lock.acquire()
+        try:
+            try:
+                timestamp, allowed = self.decisions.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            if timestamp + self.ttl < time.time():
+                self.misses += 1
+                return None
+            self.decisions[key] = timestamp, allowed # now the most recently used
+            self.hits += 1
+            return allowed
+        finally:
+            self.lock.release()
+
+    def put(self, key, allowed):
+        """ Remember a decision, evicting the least recently used ones """
+        self.lock.acquire()
+        try:
+            self.decisions.pop(key, None)
+            self.decisions[key] = time.time(), allowed
+            while len(self.decisions) > self.size:
+                self.decisions.popitem(last=False)
+                self.evictions += 1
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.decisions.clear()
+        finally:
+            self.lock.release()
+
+    def refresh(self, request):
+        """ Drop the decisions affected by changes logged in the edit-log """
+        from MoinMoin.logfile import editlog
+        new_pos, items = editlog.EditLog(request).news(self.log_pos)
+        if items:
+            cache = request.cfg.cache
+            changed = set(items)
+            for pagename in changed:
+                if (cache.page_group_regexact.search(pagename) or
+                    cache.page_dict_regexact.search(pagename)):
+                    # membership may have changed, we can't tell for whom
+                    self.clear()
+                    break
+            else:
+                self.lock.acquire()
+                try:
+                    for key in self.decisions.keys():
+                        pages = key[0].split('/')
+                        for i in range(len(pages), 0, -1):
+                            if '/'.join(pages[:i]) in changed:
+                                del self.decisions[key]
+                                break
+                finally:
+                    self.lock.release()
+        self.log_pos = new_pos
+
+
 class ACLStringIterator:
     """ Iterator for acl string
 
@@ -391,4 +391,55 @@ class TestPageAcls(object):
             for right in mayNot:
                 yield _not_have_right, u, right, pagename, hierarchic
 
+    def testManyPageACLs(self):
+        """ security: test checking rights for many pages at once """
+        pagenames = [page_name for page_name, dummy in self.pages] + [u'NonExistingPage']
+        for hierarchic in (False, True):
+            self.request.cfg.acl_hierarchic = hierarchic
+            for username in (u'WikiAdmin', u'AnyUser', u'JaneDoe', u'JoeDoe'):
+                u = User(self.request, auth_username=username)
+                u.valid = True
+                for right in self.request.cfg.acl_rights_valid:
+                    check = getattr(u.may, right)
+                    expected = [pagename for pagename in pagenames if check(pagename)]
+                    assert getattr(u.may, right + '_many')(pagenames) == expected
+        py.test.raises(AttributeError, getattr, u.may, 'foo_many')
+
+
+class TestACLDecisionCache(object):
+    """ security: caching of ACL decisions """
+    pagename = u'AclDecisionCacheTestPage'
+
+    class Config(wikiconfig.Config):
+        acl_rights_before = u"+TrustedUser:admin,delete,write"
+        acl_cache_size = 10000
+
+    def teardown_method(self, method):
+        become_trusted(self.request)
+        nuke_page(self.request, self.pagename)
+
+    def testEviction(self):
+        cache = security.ACLDecisionCache(2, 300)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, True)
+        assert cache.get(self.request, 'a') is None
+        assert cache.get(self.request, 'c') is True
+        assert cache.evictions == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def testExpiry(self):
+        cache = security.ACLDecisionCache(2, -1)
+        cache.put('a', True)
+        assert cache.get(self.request, 'a') is None
+
+    def testPageChange(self):
+        request = self.request
+        become_trusted(request)
+        create_page(request, self.pagename, u"#acl All:\n")
+        assert not request.user.may.read(self.pagename)
+        assert not request.user.may.read(self.pagename) # cached
+        create_page(request, self.pagename, u"#acl All:read\n")
+        assert request.user.may.read(self.pagename)
+
+
 coverage_modules = ['MoinMoin.security']
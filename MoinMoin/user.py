@@ -23,7 +23,6 @@
 import os, time, codecs, base64
 import hashlib
 import hmac
-from copy import deepcopy
 import md5crypt
 
 try:
@@ -43,6 +42,14 @@ from MoinMoin.wikiutil import url_quote_plus
 # the attribute names in here should be uniquely identifying a user.
 CACHED_USER_ATTRS = ['name', 'email', 'jid', 'openids', ]
 
+# The userid lookup index is kept on disk, split into LOOKUP_BUCKETS files
+# (by a hash of the looked up value), so a lookup only reads one small file.
+# Every bucket holds lines "<attrname>\t<value>\t<userid>", lowercased
+# values use <attrname>_lower. The bucket of a userid also holds lines
+# "id:<attrname>\t<userid>\t<value>", so saving a profile can remove its
+# old entries without looking at the other entries.
+LOOKUP_BUCKETS = 256
+
 
 def getUserList(request):
     """ Get a list of all (numerical) user IDs.
@@ -94,126 +101,125 @@ def _getUserIdByKey(request, key, search, case=True):
         raise ValueError("unsupported key, must be in CACHED_USER_ATTRS")
     if not search:
         return None
-    cfg_cache_attr = key + "2id"
     if not case:
-        cfg_cache_attr += "_lower"
+        key += "_lower"
         search = search.lower()
-    cfg = request.cfg
-    try:
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        from_disk = False
-    except AttributeError:
-        # no in-memory cache there - initialize it / load it from disk
-        loadLookupCaches(request)
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        from_disk = True  # we just loaded the stuff from disk
-    uid = attr2id.get(search, None)
-    if uid is None and not from_disk:
-        # we do not have the entry we searched for.
-        # we didn't find it in some in-memory cache, try refreshing these from disk
-        loadLookupCaches(request)
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        from_disk = True  # we just loaded the stuff from disk
-        uid = attr2id.get(search, None)
-    if uid is None:
-        # we do not have the entry we searched for.
-        # we don't have it in the on-disk cache, cache MISS.
-        # could be because:
-        # a) ok: we have no such search value in the profiles
-        # b) fault: the cache is incoherent with the profiles
-        # c) fault: reading the cache from disk failed, due to an error
-        # d) ok: same as c), but just because no ondisk cache has been built yet
-        rebuildLookupCaches(request)  # XXX expensive
-        attr2id = getattr(cfg.cache, cfg_cache_attr)
-        uid = attr2id.get(search, None)
-    return uid
-
-
-def setMemoryLookupCaches(request, cache):
-    """set the in-memory cache from the given cache contents
+    if not _getLookupEntry(request, 'lookup.index').exists():
+        # no index there yet (or it was cleaned) - build it once
+        _buildLookupCaches(request, force=False)
+    value = _encodeLookupValue(search)
+    data = _readLookupBucket(request, _getLookupBucket(value))
+    uids = _findLookupLines(data, key, value)
+    if uids:
+        # the profile saved last wins
+        return uids[-1]
+    # cache MISS: we have no such search value in the profiles. Profiles
+    # saved with User.save are always in the index, so we do not rebuild it.
+    return None
 
-    @param request: the request object
-    @param cache: either a dict of attrname -> attrcache to set the in-memory cache,
-                  or None to delete the in-memory cache.
-    """
-    for attrname in CACHED_USER_ATTRS:
-        if cache is None:
-            try:
-                delattr(request.cfg.cache, attrname + "2id")
-            except:
-                pass
-            try:
-                delattr(request.cfg.cache, attrname + "2id_lower")
-            except:
-                pass
-        else:
-            setattr(request.cfg.cache, attrname + "2id", cache[attrname])
-            setattr(request.cfg.cache, attrname + "2id_lower", cache[attrname + "_lower"])
+
+def _getLookupEntry(request, key):
+    # the lookup.index entry is locked when changing the index
+    return caching.CacheEntry(request, 'users', key, scope='userdir', do_locking=False)
 
 
-def loadLookupCaches(request):
-    """load lookup cache contents into memory: cfg.cache.XXX2id"""
-    scope, arena, cachekey = 'userdir', 'users', 'lookup'
-    diskcache = caching.CacheEntry(request, arena, cachekey, scope=scope, use_pickle=True)
+def _getLookupBucket(value):
+    return 'lookup.%02x' % (int(hashlib.md5(value).hexdigest()[:4], 16) % LOOKUP_BUCKETS)
+
+
+def _encodeLookupValue(value):
+    """ encode value for the index (no tabs or newlines) """
+    return value.encode(config.charset).encode('string_escape')
+
+
+def _readLookupBucket(request, bucket):
     try:
-        cache = diskcache.content()
+        return _getLookupEntry(request, bucket).content()
     except caching.CacheError:
-        cache = {}
-        for attrname in CACHED_USER_ATTRS:
-            cache[attrname] = {}
-    cache_with_lowercase = addLowerCaseKeys(cache)
-    setMemoryLookupCaches(request, cache_with_lowercase)
+        return '\n'
+
+
+def _findLookupLines(data, attrname, value):
+    """ return the last fields of the lines for attrname and value """
+    prefix = '\n%s\t%s\t' % (attrname, value)
+    result = []
+    pos = data.find(prefix)
+    while pos != -1:
+        start = pos + len(prefix)
+        end = data.index('\n', start)
+        result.append(data[start:end])
+        pos = data.find(prefix, end)
+    return result
+
+
+def _getLookupLines(theuser):
+    """ get the index lines for a user: (bucket, line) """
+    userid = theuser.id
+    lines = []
+    for attrname in CACHED_USER_ATTRS:
+        value = getattr(theuser, attrname, None)
+        if not value:
+            # we do not store empty values, likely not unique
+            continue
+        if not isinstance(value, list):
+            value = [value]
+        for val in value:
+            if not val:
+                continue
+            for attr, v in ((attrname, val), (attrname + '_lower', val.lower())):
+                v = _encodeLookupValue(v)
+                lines.append((_getLookupBucket(v), '%s\t%s\t%s\n' % (attr, v, userid)))
+            lines.append((_getLookupBucket(userid),
+                          'id:%s\t%s\t%s\n' % (attrname, userid, _encodeLookupValue(val))))
+    return lines
 
 
-def rebuildLookupCaches(request):
-    """complete attrs -> userid lookup cache rebuild"""
+def _buildLookupCaches(request, force=True):
+    """complete attrs -> userid lookup index (re)build
+
+    @param force: rebuild even if there is an index (otherwise, we only build
+                  it if no other process did while we waited for the lock)
+    """
     # as there may be thousands of users and reading all profiles is
-    # expensive, we just have 1 lookup cache for all interesting user attrs,
-    # so we only need to read all profiles ONCE to build the cache.
-    scope, arena, key = 'userdir', 'users', 'lookup'
-    diskcache = caching.CacheEntry(request, arena, key, scope=scope, use_pickle=True, do_locking=False)
-    diskcache.lock('w')
+    # expensive, we just have 1 lookup index for all interesting user attrs,
+    # so we only need to read all profiles ONCE to build it.
+    index = _getLookupEntry(request, 'lookup.index')
+    index.lock('w')
+    try:
+        if not force and index.exists():
+            return
+        buckets = {}
+        for userid in getUserList(request):
+            u = User(request, id=userid)
+            if u.valid:
+                for bucket, line in _getLookupLines(u):
+                    buckets.setdefault(bucket, []).append(line)
+        for i in range(LOOKUP_BUCKETS):
+            bucket = 'lookup.%02x' % i
+            _getLookupEntry(request, bucket).update('\n' + ''.join(buckets.get(bucket, [])))
+        index.update('%d\n' % LOOKUP_BUCKETS)
+    finally:
+        index.unlock()
 
-    cache = {}
-    for attrname in CACHED_USER_ATTRS:
-        cache[attrname] = {}
-    for userid in getUserList(request):
-        u = User(request, id=userid)
-        if u.valid:
-            for attrname in CACHED_USER_ATTRS:
-                if hasattr(u, attrname):
-                    attr2id = cache[attrname]
-                    value = getattr(u, attrname)
-                    if isinstance(value, list):
-                        for val in value:
-                            attr2id[val] = userid
-                    else:
-                        attr2id[value] = userid
 
-    cache_with_lowercase = addLowerCaseKeys(cache)
-    setMemoryLookupCaches(request, cache_with_lowercase)
-    diskcache.update(cache)
-    diskcache.unlock()
-    return cache
+def rebuildLookupCaches(request):
+    """complete attrs -> userid lookup index rebuild"""
+    _buildLookupCaches(request)
 
 
 def clearLookupCaches(request):
-    """kill the userid lookup cache"""
-    # this triggers a rebuild of the cache.
-    setMemoryLookupCaches(request, None)
-    scope, arena, key = 'userdir', 'users', 'lookup'
-    caching.CacheEntry(request, arena, key, scope=scope).remove()
-
-
-def addLowerCaseKeys(cache):
-    """add lowercased lookup keys, so we can support case-insensitive lookup"""
-    c = deepcopy(cache)  # we do not want to modify cache itself
-    for attrname in CACHED_USER_ATTRS:
-        attr2id = c[attrname]
-        attr2id_lower = c[attrname + "_lower"] = {}
-        for key, value in attr2id.iteritems():
-            attr2id_lower[key.lower()] = value
-    return c
+    """kill the userid lookup index"""
+    # this triggers a rebuild of the index.
+    index = _getLookupEntry(request, 'lookup.index')
+    index.lock('w')
+    try:
+        index.remove()
+        for i in range(LOOKUP_BUCKETS):
+            _getLookupEntry(request, 'lookup.%02x' % i).remove()
+        # pickled lookup cache of older versions
+        _getLookupEntry(request, 'lookup').remove()
+    finally:
+        index.unlock()
 
 
 def getUserId(request, searchName):
@@ -573,6 +579,8 @@ class User:
     def remove(self):
         """ Remove user profile from disk """
         os.remove(self.__filename())
+        self.valid = 0
+        self.updateLookupCaches()
 
     def load_from_id(self, password=None):
         """ Load user account data from disk.
@@ -1021,43 +1029,43 @@ class User:
         cache.unlock()
 
     def updateLookupCaches(self):
-        """ When a user profile is saved, we update the userid lookup caches """
-
-        scope, arena, key = 'userdir', 'users', 'lookup'
-
-        diskcache = caching.CacheEntry(self._request, arena=arena, key=key, scope=scope, use_pickle=True, do_locking=False)
-        if not diskcache.exists():
-            return  # if no cache file exists, just don't do anything
-
-        diskcache.lock('w')
-        cache = diskcache.content()
-        userid = self.id
-
-        # first remove all old entries mapping to this userid:
-        for attrname in CACHED_USER_ATTRS:
-            attr2id = cache[attrname]
-            for key, value in attr2id.items():
-                if value == userid:
-                    del attr2id[key]
+        """ When a user profile is saved, we update the userid lookup index """
+        request = self._request
+        index = _getLookupEntry(request, 'lookup.index')
+        if not index.exists():
+            return  # if no index exists, just don't do anything
 
-        # then, if user is valid, update with the current attr values:
-        if self.valid:
+        index.lock('w')
+        try:
+            userid = self.id
+            buckets = {}
+            def get_bucket(bucket):
+                if bucket not in buckets:
+                    buckets[bucket] = _readLookupBucket(request, bucket)
+                return buckets[bucket]
+
+            # first remove all old entries mapping to this userid:
+            id_bucket = _getLookupBucket(userid)
             for attrname in CACHED_USER_ATTRS:
-                if hasattr(self, attrname):
-                    value = getattr(self, attrname)
-                    if value:
-                        # we do not store empty values, likely not unique
-                        attr2id = cache[attrname]
-                        if isinstance(value, list):
-                            for val in value:
-                                attr2id[val] = userid
-                        else:
-                            attr2id[value] = userid
-
-        cache_with_lowercase = addLowerCaseKeys(cache)
-        setMemoryLookupCaches(self._request, cache_with_lowercase)
-        diskcache.update(cache)
-        diskcache.unlock()
+                for value in _findLookupLines(get_bucket(id_bucket), 'id:' + attrname, userid):
+                    buckets[id_bucket] = get_bucket(id_bucket).replace(
+                        '\nid:%s\t%s\t%s\n' % (attrname, userid, value), '\n', 1)
+                    value = value.decode('string_escape').decode(config.charset)
+                    for attr, v in ((attrname, value), (attrname + '_lower', value.lower())):
+                        v = _encodeLookupValue(v)
+                        bucket = _getLookupBucket(v)
+                        buckets[bucket] = get_bucket(bucket).replace(
+                            '\n%s\t%s\t%s\n' % (attr, v, userid), '\n', 1)
+
+            # then, if user is valid, update with the current attr values:
+            if self.valid:
+                for bucket, line in _getLookupLines(self):
+                    buckets[bucket] = get_bucket(bucket) + line
+
+            for bucket, data in buckets.items():
+                _getLookupEntry(request, bucket).update(data)
+        finally:
+            index.unlock()
 
     # -----------------------------------------------------------------
     # Quicklinks
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+    MoinMoin - MoinMoin.util.segmentstore Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+import os, shutil, tempfile
+
+from MoinMoin.util import segmentstore
+
+
+class TestSegmentStore:
+    """ test the segment store """
+
+    def setup_method(self, method):
+        self.test_dir = tempfile.mkdtemp('', 'segstore_')
+        self.store = segmentstore.SegmentStore(self.test_dir)
+
+    def teardown_method(self, method):
+        self.store._close()
+        shutil.rmtree(self.test_dir)
+
+    def testEmpty(self):
+        assert self.store.get('foo') is None
+        assert 'foo' not in self.store
+        assert self.store.keys() == []
+        self.store.remove('foo') # no error
+
+    def testPutGet(self):
+        self.store.put('foo', 'foo value', 123.0)
+        self.store.put_many([('bar', 'bar value', None), ('empty', '', 1.0)])
+        assert self.store.get('foo') == ('foo value', 123.0)
+        assert self.store.get('bar')[0] == 'bar value'
+        assert self.store.get('empty') == ('', 1.0)
+        assert sorted(self.store.keys()) == ['bar', 'empty', 'foo']
+
+    def testOverwriteRemove(self):
+        self.store.put('foo', 'old')
+        self.store.put('foo', 'new')
+        assert self.store.get('foo')[0] == 'new'
+        self.store.remove('foo')
+        assert self.store.get('foo') is None
+        self.store.put('foo', 'again')
+        assert self.store.get('foo')[0] == 'again'
+        assert self.store.keys() == ['foo']
+
+    def testOtherInstance(self):
+        """ a second instance (like another process) sees changes """
+        other = segmentstore.SegmentStore(self.test_dir)
+        assert other.get('foo') is None
+        self.store.put('foo', 'value')
+        assert other.get('foo')[0] == 'value'
+        other.put('foo', 'changed')
+        assert self.store.get('foo')[0] == 'changed'
+        other._close()
+
+    def testCompaction(self):
+        """ growing the index compacts the store, other instances reopen it """
+        other = segmentstore.SegmentStore(self.test_dir)
+        self.store.put('first', 'value')
+        assert other.get('first')[0] == 'value'
+        generation = self.store.generation
+        count = int(segmentstore.MIN_SLOTS * segmentstore.MAX_LOAD) + 1
+        items = [('key%d' % i, 'value%d' % i, None) for i in range(count)]
+        self.store.put_many(items)
+        assert self.store.generation > generation
+        assert not os.path.exists(self.store._data_fname(generation))
+        assert other.get('first')[0] == 'value'
+        assert other.get('key%d' % (count - 1))[0] == 'value%d' % (count - 1)
+        assert len(other.keys()) == count + 1
+        other._close()
+
+    def testCorruptedRecord(self):
+        """ a record not matching its checksum is not returned """
+        self.store.put('foo', 'value')
+        slot, offset, length = self.store._find('foo', segmentstore._hash('foo'))
+        self.store._close()
+        f = open(self.store._data_fname(1), 'r+b')
+        f.seek(offset + length - 1)
+        f.write('X')
+        f.close()
+        assert self.store.get('foo') is None
+
+
+coverage_modules = ['MoinMoin.util.segmentstore']
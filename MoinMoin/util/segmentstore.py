@@ -0,0 +1,435 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - segment store
+
+    A key/value store keeping many small values (like compiled page caches)
+    in 2 files instead of one file per value:
+
+    * data.<generation> - an append-only segment file with the records
+    * index - a hash table (open addressing, linear probing) pointing to the
+      records in the segment file
+
+    Both files are memory-mapped. Readers do not lock at all: every record
+    carries its key and a checksum, so a reader racing with a writer just sees
+    a miss. Writers serialize using one lock directory per store, append all
+    records of a batch to the segment file, fsync it once (put_many only, a
+    single put does not sync, as a record lost by a crash is just a miss) and
+    then update the index in place.
+
+    When the index gets too full or the segment file contains too much garbage,
+    the store is compacted into a new generation: a new segment file and a new
+    index are written and the new index is renamed over the old one. The old
+    index is then marked obsolete, so readers still having it mapped notice
+    that they have to reopen the store.
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, errno, mmap, struct, zlib, time
+from threading import Lock
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin.support.python_compatibility import hash_new
+from MoinMoin.util import filesys, lock
+
+INDEX_MAGIC = 'MOINIDX1'
+OBSOLETE_MAGIC = 'MOINIDX0' # written into an index replaced by compaction
+DATA_MAGIC = 'MOINSEG1'
+
+# index header: magic, generation, slot count, used slots, live data bytes
+HEADER = struct.Struct('<8sQQQQ')
+# index slot: key hash (0 == empty), record offset (0 == deleted), record length
+SLOT = struct.Struct('<QQQ')
+# record header: key length, value length, mtime, crc32 of key + value
+RECORD = struct.Struct('<IIdI')
+
+MIN_SLOTS = 1024
+MAX_LOAD = 0.5 # grow the index if more slots are used
+MIN_GARBAGE = 1024 * 1024 # compact if there is more garbage than this ...
+MAX_GARBAGE = 0.5 # ... and the garbage ratio is bigger than this
+
+
+class SegmentStoreError(Exception):
+    """ raised if we have trouble locking or writing the store """
+
+
+def _hash(key):
+    """ 64bit hash of key (str), never 0 (0 marks an empty slot) """
+    h = struct.unpack('<Q', hash_new('md5', key).digest()[:8])[0]
+    return h or 1
+
+
+class SegmentStore:
+    """ Key/value store using a segment file and a hash index, see module docs.
+
+        Keys and values are str. Use get_store() to get a store, it caches
+        the (memory-mapped) stores per process.
+    """
+    def __init__(self, path):
+        """
+        @param path: directory for the store files (gets created if needed)
+        """
+        self.path = path
+        if not os.path.exists(path):
+            try:
+                os.makedirs(path)
+            except OSError, err:
+                if not os.path.isdir(path):
+                    raise
+        self.index_fname = os.path.join(path, 'index')
+        self.lock_dir = os.path.join(path, '__lock__')
+        self._index = None # mmap of the index
+        self._data = None # mmap of the current segment file
+        self._data_fd = None
+        self._index_writable = False
+        self._mutex = Lock() # protects our mmaps against other threads
+        self.generation = None
+
+    # reading ----------------------------------------------------------------
+
+    def _data_fname(self, generation):
+        return os.path.join(self.path, 'data.%d' % generation)
+
+    def _close(self):
+        for m in (self._index, self._data):
+            if m is not None:
+                m.close()
+        if self._data_fd is not None:
+            os.close(self._data_fd)
+        self._index = self._data = self._data_fd = self.generation = None
+
+    def _open(self, write=False):
+        """ (re)open index and segment file if needed
+
+            @return: True if the store exists, False otherwise
+        """
+        if self._index is not None and self._index[:8] == INDEX_MAGIC:
+            if not write or self._index_writable:
+                return True
+        self._close()
+        try:
+            f = open(self.index_fname, write and 'r+b' or 'rb')
+        except IOError, err:
+            if err.errno == errno.ENOENT:
+                return False
+            raise
+        try:
+            access = write and mmap.ACCESS_WRITE or mmap.ACCESS_READ
+            index = mmap.mmap(f.fileno(), 0, access=access)
+        finally:
+            f.close()
+        magic, generation, nslots, used, live = HEADER.unpack_from(index, 0)
+        if magic != INDEX_MAGIC:
+            index.close()
+            return False
+        try:
+            self._data_fd = os.open(self._data_fname(generation), os.O_RDONLY)
+        except OSError, err:
+            index.close()
+            if err.errno == errno.ENOENT: # compacted meanwhile
+                return False
+            raise
+        self._index = index
+        self._index_writable = write
+        self.generation = generation
+        self._map_data()
+        return True
+
+    def _map_data(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if os.fstat(self._data_fd).st_size:
+            self._data = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+
+    def _header(self):
+        return HEADER.unpack_from(self._index, 0)
+
+    def _find(self, key, h):
+        """ find the slot for key
+
+            @return: (slot number, offset, length) - offset is 0 if the
+                     key was not found, slot number is the first free slot
+                     for it then (None if there is no free slot).
+        """
+        nslots = self._header()[2]
+        index = self._index
+        i = h % nslots
+        free = None
+        for dummy in xrange(nslots):
+            slot_h, offset, length = SLOT.unpack_from(index, HEADER.size + i * SLOT.size)
+            if slot_h == 0:
+                if free is None:
+                    free = i
+                return free, 0, 0
+            if slot_h == h:
+                if offset and self._read_record(offset, length, key) is not None:
+                    return i, offset, length
+                if not offset and free is None:
+                    free = i # reuse deleted slot of same key
+            elif not offset and free is None:
+                free = i
+            i = (i + 1) % nslots
+        return free, 0, 0
+
+    def _read_record(self, offset, length, key):
+        """ read and check record at offset
+
+            @return: (value, mtime) or None if the record does not belong
+                     to key or is corrupted
+        """
+        if self._data is None or offset + length > len(self._data):
+            self._map_data() # segment file has grown
+            if self._data is None or offset + length > len(self._data):
+                return None
+        data = self._data
+        if length < RECORD.size:
+            return None
+        keylen, valuelen, mtime, crc = RECORD.unpack_from(data, offset)
+        if RECORD.size + keylen + valuelen != length:
+            return None
+        start = offset + RECORD.size
+        if data[start:start+keylen] != key:
+            return None
+        payload = data[start:start+keylen+valuelen]
+        if zlib.crc32(payload) & 0xffffffff != crc:
+            return None
+        return payload[keylen:], mtime
+
+    def get(self, key):
+        """ get value and mtime stored for key
+
+            @return: (value, mtime) or None
+        """
+        self._mutex.acquire()
+        try:
+            if not self._open():
+                return None
+            slotno, offset, length = self._find(key, _hash(key))
+            if not offset:
+                return None
+            return self._read_record(offset, length, key)
+        finally:
+            self._mutex.release()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        """ return list of all keys (expensive, reads the whole store) """
+        self._mutex.acquire()
+        try:
+            if not self._open():
+                return []
+            return [key for key, offset, length in self._records()]
+        finally:
+            self._mutex.release()
+
+    def _records(self):
+        """ yield (key, offset, length) for all live records """
+        magic, generation, nslots, used, live = self._header()
+        for i in xrange(nslots):
+            h, offset, length = SLOT.unpack_from(self._index, HEADER.size + i * SLOT.size)
+            if h and offset:
+                if self._data is None or offset + length > len(self._data):
+                    self._map_data()
+                keylen = RECORD.unpack_from(self._data, offset)[0]
+                start = offset + RECORD.size
+                yield self._data[start:start+keylen], offset, length
+
+    # writing ----------------------------------------------------------------
+
+    def _lock(self):
+        _lock = lock.ExclusiveLock(self.lock_dir, 60.0)
+        if not _lock.acquire(10.0):
+            err = "Can't acquire write lock in %s" % self.lock_dir
+            logging.error(err)
+            raise SegmentStoreError(err)
+        return _lock
+
+    def _create(self, generation, nslots, records):
+        """ write a new generation of the store from records and make it current
+
+            @param records: iterable of (key, value, mtime)
+        """
+        data_fname = self._data_fname(generation)
+        f = open(data_fname, 'wb')
+        try:
+            f.write(DATA_MAGIC)
+            offset = len(DATA_MAGIC)
+            slots = {}
+            live = 0
+            for key, value, mtime in records:
+                record = self._make_record(key, value, mtime)
+                f.write(record)
+                h = _hash(key)
+                i = h % nslots
+                while i in slots:
+                    i = (i + 1) % nslots
+                slots[i] = (h, offset, len(record))
+                offset += len(record)
+                live += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+
+        tmp_fname = self.index_fname + '.%d.tmp' % generation
+        f = open(tmp_fname, 'wb')
+        try:
+            f.write(HEADER.pack(INDEX_MAGIC, generation, nslots, len(slots), live))
+            empty = SLOT.pack(0, 0, 0)
+            for i in xrange(nslots):
+                if i in slots:
+                    f.write(SLOT.pack(*slots[i]))
+                else:
+                    f.write(empty)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        filesys.rename(tmp_fname, self.index_fname)
+
+    def _make_record(self, key, value, mtime):
+        payload = key + value
+        return RECORD.pack(len(key), len(value), mtime, zlib.crc32(payload) & 0xffffffff) + payload
+
+    def _compact(self, extra=0):
+        """ rewrite the store to a new generation (must be called locked)
+
+            @param extra: number of keys we are about to add
+        """
+        if self._open(write=True):
+            magic, generation, nslots, used, live = self._header()
+            records = []
+            for key, offset, length in self._records():
+                record = self._read_record(offset, length, key)
+                if record is not None: # skip corrupted records
+                    records.append((key, ) + record)
+            old_index = self._index
+            old_generation = generation
+        else:
+            records, old_index, old_generation, generation = [], None, None, 0
+        nslots = MIN_SLOTS
+        while (len(records) + extra) > nslots * MAX_LOAD:
+            nslots *= 2
+        logging.debug("compacting segment store %s (%d records, %d slots)" % (self.path, len(records), nslots))
+        self._create(generation + 1, nslots, records)
+        if old_index is not None:
+            # tell other processes still using the old generation to reopen
+            old_index[:8] = OBSOLETE_MAGIC
+            self._close()
+            if old_generation:
+                try:
+                    os.remove(self._data_fname(old_generation))
+                except OSError:
+                    pass
+
+    def _needs_compaction(self, extra):
+        magic, generation, nslots, used, live = self._header()
+        if used + extra > nslots * MAX_LOAD:
+            return True
+        garbage = len(self._data or '') - len(DATA_MAGIC) - live
+        return garbage > MIN_GARBAGE and garbage > (live + garbage) * MAX_GARBAGE
+
+    def _set_slot(self, i, h, offset, length):
+        self._index[HEADER.size + i * SLOT.size:HEADER.size + (i + 1) * SLOT.size] = SLOT.pack(h, offset, length)
+
+    def _set_header(self, used, live):
+        magic, generation, nslots, old_used, old_live = self._header()
+        self._index[:HEADER.size] = HEADER.pack(magic, generation, nslots, used, live)
+
+    def put_many(self, items, sync=True):
+        """ store many values, with only one fsync
+
+            @param items: list of (key, value, mtime), mtime None means now
+            @param sync: fsync the segment file before updating the index
+        """
+        now = time.time()
+        self._mutex.acquire()
+        try:
+            _lock = self._lock()
+            try:
+                if not self._open(write=True) or self._needs_compaction(len(items)):
+                    self._compact(len(items))
+                    self._open(write=True)
+                data_fname = self._data_fname(self.generation)
+                f = open(data_fname, 'ab')
+                try:
+                    f.seek(0, 2)
+                    offset = f.tell()
+                    new_slots = []
+                    for key, value, mtime in items:
+                        if mtime is None:
+                            mtime = now
+                        record = self._make_record(key, value, mtime)
+                        f.write(record)
+                        new_slots.append((key, offset, len(record)))
+                        offset += len(record)
+                    if sync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                finally:
+                    f.close()
+                # readers map the new records when they need them (see _read_record)
+                magic, generation, nslots, used, live = self._header()
+                for key, offset, length in new_slots:
+                    h = _hash(key)
+                    i, old_offset, old_length = self._find(key, h)
+                    if old_offset:
+                        live -= old_length
+                    else:
+                        used += 1
+                    self._set_slot(i, h, offset, length)
+                    live += length
+                self._set_header(used, live)
+            finally:
+                _lock.release()
+        except (IOError, OSError, mmap.error), err:
+            raise SegmentStoreError(str(err))
+        finally:
+            self._mutex.release()
+
+    def put(self, key, value, mtime=None):
+        """ store value for key (without fsync) """
+        self.put_many([(key, value, mtime)], sync=False)
+
+    def remove(self, key):
+        """ remove key from the store (no error if it is not there) """
+        self._mutex.acquire()
+        try:
+            _lock = self._lock()
+            try:
+                if not self._open(write=True):
+                    return
+                h = _hash(key)
+                i, offset, length = self._find(key, h)
+                if offset:
+                    self._set_slot(i, h, 0, 0) # keep hash, so probing continues
+                    magic, generation, nslots, used, live = self._header()
+                    self._set_header(used, live - length)
+            finally:
+                _lock.release()
+        except (IOError, OSError, mmap.error), err:
+            raise SegmentStoreError(str(err))
+        finally:
+            self._mutex.release()
+
+
+_stores = {}
+_stores_lock = Lock()
+
+def get_store(path):
+    """ get the SegmentStore for path, we keep one instance per process """
+    _stores_lock.acquire()
+    try:
+        try:
+            return _stores[path]
+        except KeyError:
+            store = _stores[path] = SegmentStore(path)
+            return store
+    finally:
+        _stores_lock.release()
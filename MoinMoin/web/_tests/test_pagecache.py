@@ -0,0 +1,93 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.web.pagecache Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+from MoinMoin import caching
+from MoinMoin.web import pagecache
+from MoinMoin._tests import become_trusted, create_page, nuke_page, wikiconfig
+
+
+class TestPageCache:
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageForPageCache'
+
+    class Config(wikiconfig.Config):
+        caching_anonymous_pages = True
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+        create_page(self.request, self.pagename, u"Some text.")
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+        for key in self._get_keys():
+            caching.CacheEntry(self.request, pagecache.arena, key, scope='wiki').remove()
+
+    def _get_keys(self):
+        return caching.get_cache_list(self.request, pagecache.arena, 'wiki')
+
+    def _get(self, query='', headers=None):
+        appiter, status, headers = self.client.get('/%s%s' % (self.pagename, query),
+                                                   headers=headers or [])
+        return ''.join(appiter), status, dict(headers)
+
+    def testCached(self):
+        output, status, headers = self._get()
+        assert status[:3] == '200'
+        assert 'Some text.' in output
+        keys = self._get_keys()
+        assert len(keys) == 1
+
+        cache = caching.CacheEntry(self.request, pagecache.arena, keys[0],
+                                   scope='wiki', use_pickle=True)
+        data = cache.content()
+        assert data['body'] == output
+        data['body'] = 'cached output'
+        cache.update(data)
+        output, status, headers = self._get()
+        assert status[:3] == '200'
+        assert output == 'cached output'
+        assert headers['ETag'] == '"%s"' % data['etag']
+        assert 'Last-Modified' in headers
+
+        output, status, headers = self._get(headers=[('If-None-Match', headers['ETag'])])
+        assert status[:3] == '304'
+        assert output == ''
+
+        # changing the page changes the edit-log
+        create_page(self.request, self.pagename, u"Other text.")
+        output, status, headers = self._get()
+        assert 'Other text.' in output
+
+    def testNotCached(self):
+        output, status, headers = self._get('?highlight=text')
+        assert status[:3] == '200'
+        assert 'ETag' not in headers
+        # the output of RandomPage changes over time
+        create_page(self.request, self.pagename, u"<<RandomPage>>")
+        output, status, headers = self._get()
+        assert status[:3] == '200'
+        assert not self._get_keys()
+
+    def testUnknownHost(self):
+        output, status, headers = self._get(headers=[('Host', 'unknown.example.org')])
+        assert status[:3] == '200'
+        assert 'Some text.' in output
+        assert not self._get_keys()
+
+    def testRepeatedHeaders(self):
+        output, status, headers = self._get()
+        cache = caching.CacheEntry(self.request, pagecache.arena, self._get_keys()[0],
+                                   scope='wiki', use_pickle=True)
+        data = cache.content()
+        data['headers'] += [('X-Test', 'a'), ('X-Test', 'b')]
+        cache.update(data)
+        appiter, status, headers = self.client.get('/%s' % self.pagename)
+        ''.join(appiter)
+        assert [value for name, value in headers if name == 'X-Test'] == ['a', 'b']
+        assert len([name for name, value in headers if name.lower() == 'content-type']) == 1
+
+coverage_modules = ['MoinMoin.web.pagecache']
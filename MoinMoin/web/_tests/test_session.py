@@ -0,0 +1,155 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - MoinMoin.web.session Tests
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import os, shutil, tempfile, time
+
+from MoinMoin import wikiutil
+from MoinMoin.web import session
+from MoinMoin.web.request import TestRequest
+from MoinMoin.wsgiapp import init
+from MoinMoin._tests import wikiconfig
+
+
+class TestSQLiteSessionService:
+
+    def setup_method(self, method):
+        self.session_dir = self.request.cfg.session_dir
+        self.request.cfg.session_dir = tempfile.mkdtemp()
+        self.service = session.SQLiteSessionService()
+        self.store = self.service._store_get(self.request)
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.request.cfg.session_dir)
+        self.request.cfg.session_dir = self.session_dir
+
+    def _new(self, expires, **data):
+        s = self.store.new()
+        s.update(data)
+        s['expires'] = expires
+        self.store.save(s)
+        return s.sid
+
+    def _stored_expires(self, sid):
+        return self.store._connect().execute('SELECT expires FROM sessions WHERE sid = ?',
+                                             (sid, )).fetchone()[0]
+
+    def testSaveGet(self):
+        """ web.session: sessions are stored and loaded """
+        expires = int(time.time()) + 3600
+        sid = self._new(expires, trail=[u'FrontPage'])
+        assert self.store.list() == [sid]
+        s = self.service.get_session(self.request, sid)
+        assert not s.new
+        assert dict(s) == {'expires': expires, 'trail': [u'FrontPage']}
+
+        self.service.destroy_session(self.request, s)
+        assert self.store.list() == []
+        s = self.store.get(sid)
+        assert dict(s) == {}
+
+    def testExpiresOnly(self):
+        """ web.session: expiry-only changes are only written if needed """
+        now = int(time.time())
+        sid = self._new(now + 36000)
+        s = self.store.get(sid)
+        s['expires'] = now + 36060
+        self.store.save(s)
+        assert self._stored_expires(sid) == now + 36000
+
+        s['expires'] = now + 40000
+        self.store.save(s)
+        assert self._stored_expires(sid) == now + 40000
+
+        s['trail'] = [u'FrontPage']
+        s['expires'] = now + 40060
+        self.store.save(s)
+        assert self._stored_expires(sid) == now + 40060
+        assert dict(self.store.get(sid)) == {'expires': now + 40060, 'trail': [u'FrontPage']}
+
+    def testDestroySessions(self):
+        """ web.session: expired sessions are destroyed in bulk """
+        now = int(time.time())
+        expired = self._new(now - 60)
+        expired_user = self._new(now - 60, **{'user.id': '1.2.3'})
+        valid = self._new(now + 3600)
+        valid_user = self._new(now + 3600, **{'user.id': '1.2.3'})
+
+        assert self.service.destroy_sessions(self.request, user_id='1.2.3') == 1
+        assert sorted(self.store.list()) == sorted([expired, valid, valid_user])
+        assert self.service.destroy_sessions(self.request) == 1
+        assert sorted(self.store.list()) == sorted([valid, valid_user])
+        assert self.service.destroy_sessions(self.request, expired=False) == 2
+        assert self.store.list() == []
+
+
+class TestCookieSessionService:
+
+    class Config(wikiconfig.Config):
+        session_service = session.CookieSessionService()
+        cookie_lifetime = (1, 12)
+        session_dir = tempfile.mkdtemp()
+
+    def teardown_class(self):
+        shutil.rmtree(self.request.cfg.session_dir)
+
+    def _get(self, pagename, cookie=None):
+        # only send the cookie given
+        self.client.cookie_jar.clear()
+        headers = cookie and [('Cookie', cookie)] or []
+        appiter, status, headers = self.client.get('/%s' % pagename, headers=headers)
+        ''.join(appiter)
+        cookies = [value.split(';')[0] for name, value in headers if name == 'Set-Cookie']
+        return cookies and cookies[0] or None
+
+    def _get_data(self, cookie):
+        name, value = cookie.split('=', 1)
+        assert name.startswith('MOIN_ANONSESSION_')
+        sid, data = self.request.cfg.session_service._decode(self.request, value)
+        return data
+
+    def _init_request(self, cookie):
+        request = TestRequest(path='/FrontPage', environ_overrides={'HTTP_COOKIE': cookie})
+        request.given_config = self.Config
+        return init(request)
+
+    def testAnonymous(self):
+        """ web.session: anonymous sessions are kept in a signed cookie """
+        cookie = self._get('FrontPage')
+        assert self._get_data(cookie)['trail'] == [u'FrontPage']
+        cookie = self._get('RecentChanges', cookie)
+        assert self._get_data(cookie)['trail'] == [u'FrontPage', u'RecentChanges']
+        assert os.listdir(self.request.cfg.session_dir) == []
+
+        # a tampered cookie is not used
+        name, value = cookie.split('=', 1)
+        payload, signature = value.split('.')
+        cookie = self._get('FrontPage', '%s=%s.%s' % (name, payload, '0' * len(signature)))
+        assert self._get_data(cookie)['trail'] == [u'FrontPage']
+
+    def testTicket(self):
+        """ web.session: tickets stay valid for the next request of a cookie session """
+        cookie = self._get('FrontPage')
+        request = self._init_request(cookie)
+        assert request.session
+        ticket = wikiutil.createTicket(request)
+        next_request = self._init_request(cookie)
+        assert next_request.session.sid == request.session.sid
+        assert wikiutil.checkTicket(next_request, ticket)
+
+    def testEncode(self):
+        """ web.session: cookie values are checked """
+        service = self.request.cfg.session_service
+        expires = int(time.time()) + 60
+        value = service._encode(self.request, 'sid', {'trail': [u'FrontPage']}, expires)
+        assert service._decode(self.request, value) == ('sid', {'trail': [u'FrontPage'], 'expires': expires})
+        value = service._encode(self.request, 'sid', {'trail': [u'FrontPage']}, expires - 120)
+        assert service._decode(self.request, value) is None
+        assert service._decode(self.request, 'garbage') is None
+        assert service._encode(self.request, 'sid', {'object': object()}, expires) is None
+
+coverage_modules = ['MoinMoin.web.session']
@@ -8,6 +8,7 @@
 import py
 
 from MoinMoin.web import utils
+from MoinMoin._tests import become_trusted, create_page, nuke_page
 
 class TestUniqueIDGenerator(object):
 
@@ -27,3 +28,45 @@ class TestUniqueIDGenerator(object):
 
     def testDocuments(self):
         py.test.skip("TODO: needs implementation")
+
+class TestMakeConditional(object):
+    pagename = u'AutoCreatedMoinMoinTemporaryTestPageForConditionalGet'
+
+    def setup_method(self, method):
+        become_trusted(self.request)
+        create_page(self.request, self.pagename, u"Some text.")
+
+    def teardown_method(self, method):
+        nuke_page(self.request, self.pagename)
+
+    def _get(self, query, headers=None):
+        appiter, status, headers = self.client.get('/%s%s' % (self.pagename, query),
+                                                   headers=headers or [])
+        return ''.join(appiter), status[:3], dict(headers)
+
+    def testRaw(self):
+        output, status, headers = self._get('?action=raw')
+        assert status == '200'
+        assert output == 'Some text.'
+        output, status, dummy = self._get('?action=raw', [('If-None-Match', headers['ETag'])])
+        assert status == '304'
+        assert output == ''
+        create_page(self.request, self.pagename, u"Other text.")
+        output, status, dummy = self._get('?action=raw', [('If-None-Match', headers['ETag'])])
+        assert status == '200'
+        assert output == 'Other text.'
+
+    def testShow(self):
+        output, status, headers = self._get('')
+        assert status == '200'
+        output, status, dummy = self._get('', [('If-None-Match', headers['ETag'])])
+        assert status == '304'
+        assert output == ''
+        # other pages may change the output of the page
+        create_page(self.request, self.pagename + u'/Sub', u"Text.")
+        try:
+            output, status, dummy = self._get('', [('If-None-Match', headers['ETag'])])
+            assert status == '200'
+            assert 'Some text.' in output
+        finally:
+            nuke_page(self.request, self.pagename + u'/Sub')
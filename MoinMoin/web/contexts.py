@@ -8,7 +8,7 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-import time, inspect, StringIO, sys, warnings
+import os, time, inspect, StringIO, sys, warnings
 
 from werkzeug import Headers, http_date, create_environ, redirect, abort
 from werkzeug.exceptions import Unauthorized, NotFound
@@ -19,7 +19,7 @@ from MoinMoin.formatter import text_html
 from MoinMoin.theme import load_theme_fallback
 from MoinMoin.util.clock import Clock
 from MoinMoin.web.request import Request, MoinMoinFinish
-from MoinMoin.web.utils import UniqueIDGenerator
+from MoinMoin.web.utils import UniqueIDGenerator, get_byte_ranges, iter_file_ranges
 from MoinMoin.web.exceptions import Forbidden, SurgeProtection
 
 from MoinMoin import log
@@ -308,18 +308,59 @@ class HTTPContext(BaseContext):
         else:
             self.write = self.writestack.pop()
 
-    def send_file(self, fileobj, bufsize=8192, do_flush=None):
+    def send_file(self, fileobj, bufsize=None, do_flush=None, length=None):
         """ Send a file to the output stream.
 
-        @param fileobj: a file-like object (supporting read, close)
+        The complete file is sent using the wsgi.file_wrapper of the server,
+        if it has one (many use sendfile to send the file without copying
+        the data through Python buffers).
+
+        @param fileobj: a file-like object (supporting read, close and,
+                        if length is given, seek)
         @param bufsize: size of chunks to read/write
+                        (default: cfg.send_file_chunk_size)
         @param do_flush: call flush after writing?
+        @param length: length of the file, if given, Range requests are
+                       answered with the requested parts of the file
         """
+        if bufsize is None:
+            bufsize = self.cfg.send_file_chunk_size
         def simple_wrapper(fileobj, bufsize):
             return iter(lambda: fileobj.read(bufsize), '')
         file_wrapper = self.environ.get('wsgi.file_wrapper', simple_wrapper)
+        ranges = None
+        if length is not None:
+            self.headers['Accept-Ranges'] = 'bytes'
+            ranges = get_byte_ranges(self.request, length)
+        if ranges is None:
+            response = file_wrapper(fileobj, bufsize)
+        elif not ranges:
+            fileobj.close()
+            self.status_code = 416
+            self.headers['Content-Range'] = 'bytes */%d' % length
+            self.headers['Content-Length'] = '0'
+            response = []
+        elif len(ranges) == 1:
+            start, stop = ranges[0]
+            self.status_code = 206
+            self.headers['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, length)
+            self.headers['Content-Length'] = str(stop - start)
+            response = iter_file_ranges(fileobj, ranges, bufsize)
+        else:
+            boundary = os.urandom(12).encode('hex')
+            content_type = self.headers.get('Content-Type', 'application/octet-stream')
+            heads = ['\r\n--%s\r\nContent-Type: %s\r\nContent-Range: bytes %d-%d/%d\r\n\r\n' % (
+                         boundary, content_type, start, stop - 1, length)
+                     for start, stop in ranges]
+            tail = '\r\n--%s--\r\n' % boundary
+            self.status_code = 206
+            self.headers['Content-Type'] = 'multipart/byteranges; boundary=%s' % boundary
+            self.headers['Content-Length'] = str(sum([len(head) + stop - start
+                                                      for head, (start, stop) in zip(heads, ranges)])
+                                                 + len(tail))
+            response = iter_file_ranges(fileobj, ranges, bufsize, heads, tail)
         self.request.direct_passthrough = True
-        self.request.response = file_wrapper(fileobj, bufsize)
+        self.request.response = response
         raise MoinMoinFinish('sent file')
 
     # fully deprecated functions, with warnings
@@ -367,6 +408,8 @@ class AuxilaryMixin(object):
     _fmt_hd_counters = EnvironProxy('_fmt_hd_counters')
     parsePageLinks_running = EnvironProxy('parsePageLinks_running', lambda o: {})
     mode_getpagelinks = EnvironProxy('mode_getpagelinks', 0)
+    # set when the output depends on the time (see Macro.execute)
+    dynamic_content = EnvironProxy('dynamic_content', 0)
 
     pragma = EnvironProxy('pragma', lambda o: {})
     _login_messages = EnvironProxy('_login_messages', lambda o: [])
@@ -400,6 +443,8 @@ class AuxilaryMixin(object):
             del self._fmt_hd_counters
         if hasattr(self, 'uid_generator'):
             del self.uid_generator
+        if hasattr(self, '_interwiki_state'):
+            del self._interwiki_state
 
     def getPragma(self, key, defval=None):
         """ Query a pragma value (#pragma processing instruction)
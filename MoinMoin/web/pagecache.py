@@ -0,0 +1,178 @@
+# -*- coding: iso-8859-1 -*-
+"""
+    MoinMoin - conditional GET and output cache for anonymous page views
+
+    Page views (action=show) of anonymous users get an ETag computed
+    before rendering from everything the output depends on: page name,
+    revision and mtime, query args, theme, language, base URL, edit-log
+    size (this covers other pages, group and ACL pages and attachments)
+    and code version (this covers the wiki config, see
+    caching.get_code_version). A conditional GET matching it gets a 304
+    response without rendering the page.
+
+    Pages that run macros with time dependencies (see Macro.execute) get no
+    ETag, as their output may change although nothing above did.
+
+    If caching_anonymous_pages is enabled, the complete responses are also
+    kept in the cache (keyed the same way, except the edit-log size and the
+    code version), so the next anonymous view of the same page does not
+    need to render the theme and run the compiled page code again. As the
+    base URL comes from the Host header, this is only done for the hosts in
+    caching_anonymous_pages_hosts.
+
+    @copyright: 2026 MoinMoin development team
+    @license: GNU GPL, see COPYING for details.
+"""
+
+import time
+
+from MoinMoin import log
+logging = log.getLogger(__name__)
+
+from MoinMoin import caching
+from MoinMoin.logfile import editlog, eventlog
+from MoinMoin.Page import Page
+from MoinMoin.support.python_compatibility import hash_new
+from MoinMoin.web.utils import make_conditional
+
+arena = 'pageoutput'
+
+# request args allowed for anonymous page views we handle here, other args
+# (e.g. highlight or redirect) change the output in ways we do not want to
+# cache
+cacheable_args = set(['action', 'rev'])
+
+# response headers we do not keep in the cache
+uncached_headers = set(['set-cookie', 'content-length', 'date', 'etag', 'last-modified'])
+
+
+def is_cacheable(context, action_name):
+    """ Check if the response for the current request may be validated with
+        an ETag and come from (and go into) the page output cache
+    """
+    cfg = context.cfg
+    return (action_name == 'show' and
+            context.request.method in ('GET', 'HEAD') and
+            not context.user.valid and
+            # anonymous sessions have a page trail
+            not cfg.cookie_lifetime[0] and
+            set(context.request.args.keys()) <= cacheable_args and
+            # messages of earlier processing steps (e.g. login)
+            not context.theme._status)
+
+
+def _is_cached_host(context):
+    """ Check if the page output cache may be used for the host of the
+        current request (see caching_anonymous_pages_hosts)
+    """
+    request = context.request
+    hosts = context.cfg.caching_anonymous_pages_hosts
+    if hosts is None:
+        environ = request.environ
+        host = environ.get('SERVER_NAME', '')
+        port = environ.get('SERVER_PORT', '')
+        if port and port != {'http': '80', 'https': '443'}.get(request.scheme):
+            host = '%s:%s' % (host, port)
+        hosts = [host]
+    return request.host.lower() in [host.lower() for host in hosts]
+
+
+def _get_key(context):
+    request = context.request
+    key = (context.page.page_name, sorted(request.args.items(multi=True)),
+           context.theme.name, context.lang, request.url_root,
+           context.isSpiderAgent)
+    return hash_new('sha1', repr(key)).hexdigest()
+
+
+def _get_cache(context, key):
+    return caching.CacheEntry(context, arena, key, scope='wiki', use_pickle=True)
+
+
+def get_etag(context, key):
+    """ Make the ETag of the current page view (before rendering it)
+
+    @param key: key of the page view (see _get_key)
+    """
+    page = context.page
+    if context.rev:
+        page = Page(context, page.page_name, rev=context.rev)
+    validators = (key, page.get_real_rev(), page.mtime_usecs(),
+                  editlog.EditLog(context).size(), context.cfg.cache.code_version)
+    return hash_new('sha1', repr(validators)).hexdigest()
+
+
+def _send_cached(context, key, etag):
+    """ Send the cached response for the current request, if it is still
+        valid.
+
+    @return: True if the response was sent from the cache
+    """
+    try:
+        data = _get_cache(context, key).content()
+        if data['etag'] != etag:
+            return False
+    except (caching.CacheError, KeyError, TypeError):
+        return False
+    request = context.request
+    request.status_code = 200
+    headers = request.headers
+    for name in set([name for name, value in data['headers']]):
+        del headers[name]
+    for name, value in data['headers']:
+        headers.add(name, value)
+    request.response = [data['body']]
+    make_conditional(request, etag, data['time'])
+    return True
+
+
+def _store(context, key, etag):
+    """ Put the response for the current request into the cache """
+    request = context.request
+    if request.direct_passthrough or not request.is_sequence:
+        return
+    body = ''.join(request.iter_encoded())
+    now = time.time()
+    data = {
+        'etag': etag,
+        'time': now,
+        'headers': [(name, value) for name, value in request.headers
+                    if name.lower() not in uncached_headers],
+        'body': body,
+    }
+    try:
+        _get_cache(context, key).update(data)
+    except caching.CacheError, err:
+        logging.warning("could not cache output of page %s: %s" % (context.page.page_name, str(err)))
+        return
+    make_conditional(request, etag, now)
+
+
+def send_page(context, send):
+    """ Send the response for the current (anonymous) page view
+
+    Sends a 304 or the cached response if possible, otherwise uses send
+    and caches the response.
+
+    @param send: function sending the response
+    """
+    key = _get_key(context)
+    # computing the etag gets the edit-log position first, so we do not
+    # miss changes happening while we render the page
+    etag = get_etag(context, key)
+    if make_conditional(context.request, etag):
+        # 304 responses for page views are still page views
+        eventlog.EventLog(context).add(context, 'VIEWPAGE', {'pagename': context.page.page_name})
+        return
+    use_cache = context.cfg.caching_anonymous_pages and _is_cached_host(context)
+    if use_cache and _send_cached(context, key, etag):
+        eventlog.EventLog(context).add(context, 'VIEWPAGE', {'pagename': context.page.page_name})
+        return
+    # only keep the etag if the page turns out to be cacheable
+    del context.request.headers['ETag']
+    send()
+    if context.request.status_code == 200 and not context.dynamic_content:
+        if use_cache:
+            _store(context, key, etag)
+        else:
+            make_conditional(context.request, etag)
@@ -67,7 +67,7 @@ class ProxyTrust(object):
             del environ['REMOTE_ADDR']
         return self.app(environ, start_response)
 
-def make_application(shared=None, trusted_proxies=None):
+def make_application(shared=None, trusted_proxies=None, warm=False, warm_urls=None):
     """
     Make an instance of the MoinMoin WSGI application. This involves
     wrapping it in middlewares as needed (static files, debugging, etc.).
@@ -76,11 +76,18 @@ def make_application(shared=None, trusted_proxies=None):
                    If falsy, do not use static serving app.
     @param trusted_proxies: list of trusted proxies. If None or empty, do not
                             use the ProxyTrust middleware.
+    @param warm: warm up the application now (use this if the server forks
+                 worker processes afterwards), see Application.warm
+    @param warm_urls: URLs of the wikis to warm up (default: the wiki of
+                      wikiconfig.py)
     @rtype: callable
     @return: a WSGI callable
     """
     from MoinMoin.wsgiapp import application
 
+    if warm:
+        application.warm(warm_urls)
+
     if trusted_proxies:
         application = ProxyTrust(application, trusted_proxies)
 
@@ -135,7 +142,8 @@ def run_server(hostname='localhost', port=8080,
                threaded=True,
                **kw):
     """ Run a standalone server on specified host/port. """
-    application = make_application(shared=docs)
+    # forked processes start with what we build before
+    application = make_application(shared=docs, warm=kw.get('processes', 1) > 1)
 
     if port < 1024:
         if os.name == 'posix' and os.getuid() != 0:
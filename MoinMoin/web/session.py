@@ -8,12 +8,15 @@
     to the documentation of `SessionService` in this module.
 
     @copyright: 2008 MoinMoin:FlorianKrupicka,
-                2009 MoinMoin:ThomasWaldmann
+                2009 MoinMoin:ThomasWaldmann,
+                2026 MoinMoin development team
     @license: GNU GPL, see COPYING for details.
 """
-import time
+import os, time, threading, base64, hmac, hashlib, json
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
 
-from werkzeug.contrib.sessions import Session, FilesystemSessionStore
+from werkzeug.contrib.sessions import Session, SessionStore, FilesystemSessionStore, generate_key
+from werkzeug.security import safe_str_cmp
 
 from MoinMoin import config
 from MoinMoin.util import filesys
@@ -60,6 +63,27 @@ class SessionService(object):
         """
         raise NotImplementedError
 
+    def destroy_sessions(self, request, expired=True, user_id=None):
+        """
+        Destroy the expired sessions (if expired is True) of the user with
+        id user_id (if given). Sessions without expiry (made before 1.9.1)
+        count as expired. Return the number of destroyed sessions.
+
+        This default implementation loads every session, services keeping
+        an index of the sessions should do better.
+        """
+        now = time.time()
+        count = 0
+        for sid in self.get_all_session_ids(request):
+            session = self.get_session(request, sid)
+            if expired and session.get('expires', 0) >= now:
+                continue
+            if user_id is not None and session.get('user.id') != user_id:
+                continue
+            self.destroy_session(request, session)
+            count += 1
+        return count
+
 
 def _get_session_lifetime(request, userobj):
     """ Get session lifetime for the user object userobj
@@ -124,6 +148,24 @@ def get_cookie_name(request, name, usage, software='MOIN'):
     return "%s_%s_%s" % (software, usage, name)
 
 
+def get_cookie_args(request):
+    """
+    Get the path, domain, secure and httponly arguments for setting a
+    session cookie.
+    """
+    cfg = request.cfg
+    return {
+        # we always use path='/' except if explicitly overridden by configuration,
+        # which is usually not needed and not recommended:
+        'path': cfg.cookie_path or '/',
+        'domain': cfg.cookie_domain,
+        # a secure cookie is not transmitted over unsecure connections:
+        'secure': (cfg.cookie_secure or  # True means: force secure cookies
+                   cfg.cookie_secure is None and request.is_secure),  # None means: https -> secure cookie
+        'httponly': cfg.cookie_httponly,
+    }
+
+
 class FileSessionService(SessionService):
     """
     This sample session service stores session information in a temporary
@@ -187,12 +229,7 @@ class FileSessionService(SessionService):
         cfg = request.cfg
         # we use different cookie names for different wikis:
         cookie_name = get_cookie_name(request, name=cfg.cookie_name, usage=self.cookie_usage)
-        # we always use path='/' except if explicitly overridden by configuration,
-        # which is usually not needed and not recommended:
-        cookie_path = cfg.cookie_path or '/'
-        # a secure cookie is not transmitted over unsecure connections:
-        cookie_secure = (cfg.cookie_secure or  # True means: force secure cookies
-                         cfg.cookie_secure is None and request.is_secure)  # None means: https -> secure cookie
+        cookie_args = get_cookie_args(request)
 
         cookie_lifetime = _get_session_lifetime(request, userobj)
         # we use 60s granularity, so we don't trigger session storage updates too often
@@ -206,12 +243,12 @@ class FileSessionService(SessionService):
             logging.debug("setting session cookie: %r" % (session.sid, ))
             request.set_cookie(cookie_name, session.sid,
                                max_age=cookie_lifetime, expires=cookie_expires,
-                               path=cookie_path, domain=cfg.cookie_domain,
-                               secure=cookie_secure, httponly=cfg.cookie_httponly)
+                               **cookie_args)
         elif not session.new:
             # we still got a cookie, but we don't want it. kill it.
             logging.debug("deleting session cookie!")
-            request.delete_cookie(cookie_name, path=cookie_path, domain=cfg.cookie_domain)
+            request.delete_cookie(cookie_name, path=cookie_args['path'],
+                                  domain=cookie_args['domain'])
 
         def update_session(key, val):
             """ put key/val into session, avoid writing if it is unchanged """
@@ -265,3 +302,306 @@ class FileSessionService(SessionService):
             logging.debug("destroying session: %r" % session)
             self.destroy_session(request, session)
 
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store keeping all sessions of a wiki in one sqlite database,
+    with an index on their expiry, so expired sessions can be purged
+    without loading them.
+
+    The expiry of a session is kept in its own column (not in the pickled
+    session data), so it can be updated without writing the session data.
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            expires INTEGER,
+            user_id TEXT,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires);
+        CREATE INDEX IF NOT EXISTS sessions_user_id ON sessions (user_id);
+    """
+
+    def __init__(self, path, session_class=None, mode=0644, expires_slack=3600,
+                 purge_interval=3600):
+        SessionStore.__init__(self, session_class)
+        self.path = path
+        self.mode = mode
+        self.expires_slack = expires_slack
+        self.purge_interval = purge_interval
+        self.next_purge = 0
+        # sqlite connections can't be shared by threads
+        self.local = threading.local()
+
+    def _connect(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            import sqlite3
+            directory = os.path.dirname(self.path)
+            try:
+                filesys.mkdir(directory)
+            except OSError:
+                pass
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.text_factory = str
+            connection.executescript(self.schema)
+            try:
+                os.chmod(self.path, self.mode)
+            except OSError:
+                pass
+            self.local.connection = connection
+        return connection
+
+    def _execute(self, sql, args=()):
+        """ Run sql in a transaction of its own, return the cursor """
+        connection = self._connect()
+        try:
+            cursor = connection.execute(sql, args)
+            connection.commit()
+        except:
+            connection.rollback()
+            raise
+        return cursor
+
+    def get(self, sid):
+        now = time.time()
+        if now >= self.next_purge:
+            self.next_purge = now + self.purge_interval
+            self.purge(now)
+        if not self.is_valid_key(sid):
+            return self.new()
+        row = self._connect().execute('SELECT expires, data FROM sessions WHERE sid = ?',
+                                      (sid, )).fetchone()
+        if row is None:
+            data, stored = {}, None
+        else:
+            expires, data = row
+            try:
+                data = loads(str(data))
+            except Exception:
+                data = {}
+            if expires is not None:
+                data['expires'] = expires
+            stored = dict(data)
+        session = self.session_class(data, sid, False)
+        # to find out what changed when saving the session
+        session.stored = stored
+        return session
+
+    def save(self, session):
+        data = dict(session)
+        expires = data.pop('expires', None)
+        stored = getattr(session, 'stored', None)
+        if stored is not None:
+            stored = dict(stored)
+            stored_expires = stored.pop('expires', None)
+            if stored == data and expires is not None and stored_expires is not None:
+                # only the expiry changed (it moves every minute): do not
+                # write it if the stored one is still good for most of the
+                # session lifetime
+                now = time.time()
+                slack = min(self.expires_slack, (expires - now) / 10)
+                if 0 <= expires - stored_expires <= slack:
+                    return
+                sql, args = 'UPDATE sessions SET expires = ? WHERE sid = ?', (expires, session.sid)
+            else:
+                stored = None
+        if stored is None:
+            sql = 'INSERT OR REPLACE INTO sessions (sid, expires, user_id, data) VALUES (?, ?, ?, ?)'
+            args = (session.sid, expires, data.get('user.id'),
+                    buffer(dumps(data, HIGHEST_PROTOCOL)))
+        try:
+            self._execute(sql, args)
+        except Exception, err:
+            logging.warning("could not save session %r: %s" % (session.sid, str(err)))
+            return
+        session.stored = dict(session)
+
+    def delete(self, session):
+        self._execute('DELETE FROM sessions WHERE sid = ?', (session.sid, ))
+        session.stored = None
+
+    def list(self):
+        return [sid for sid, in self._connect().execute('SELECT sid FROM sessions')]
+
+    def purge(self, now=None, expired=True, user_id=None):
+        """ Delete the sessions that expired before now (if expired is True)
+            of the user with id user_id (if given) in one go. Return the
+            number of deleted sessions.
+        """
+        conditions, args = [], []
+        if expired:
+            if now is None:
+                now = time.time()
+            conditions.append('(expires IS NULL OR expires < ?)')
+            args.append(int(now))
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            args.append(user_id)
+        sql = 'DELETE FROM sessions'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        try:
+            return self._execute(sql, args).rowcount
+        except Exception, err:
+            logging.warning("could not purge sessions: %s" % str(err))
+            return 0
+
+
+class SQLiteSessionService(FileSessionService):
+    """
+    Like FileSessionService, but keeps all sessions in one sqlite database
+    (filename in cfg.session_dir) instead of one file per session, see
+    SQLiteSessionStore. Expiry-only updates are only written if the stored
+    expiry is more than expires_slack seconds (at most a tenth of the session
+    lifetime) behind, and expired sessions are purged in bulk every
+    purge_interval seconds.
+    """
+    def __init__(self, cookie_usage='SESSION', filename='sessions.sqlite',
+                 expires_slack=3600, purge_interval=3600):
+        FileSessionService.__init__(self, cookie_usage)
+        self.filename = filename
+        self.expires_slack = expires_slack
+        self.purge_interval = purge_interval
+        self.stores = {}
+
+    def _store_get(self, request):
+        path = os.path.join(request.cfg.session_dir, self.filename)
+        store = self.stores.get(path)
+        if store is None:
+            store = self.stores[path] = SQLiteSessionStore(path, session_class=MoinSession,
+                mode=0666 & config.umask, expires_slack=self.expires_slack,
+                purge_interval=self.purge_interval)
+        return store
+
+    def destroy_sessions(self, request, expired=True, user_id=None):
+        return self._store_get(request).purge(expired=expired, user_id=user_id)
+
+
+class CookieSession(MoinSession):
+    """ Session of an anonymous user kept in a signed cookie """
+
+
+class CookieSessionService(SessionService):
+    """
+    Keeps the sessions of anonymous users (usually just the page trail) in
+    a cookie signed with cfg.secrets['web/session'], so they need no
+    server-side storage. The sessions of logged-in users, sessions given by
+    sid (e.g. xmlrpc auth tokens) and sessions that are too big for a
+    cookie or can't be serialized to JSON are handled by server_service
+    (default: a FileSessionService).
+
+    When an anonymous user logs in, the session moves to server_service,
+    after logging out it is a cookie session again.
+    """
+    secret_key_name = 'web/session'
+
+    def __init__(self, server_service=None, cookie_usage='ANONSESSION', max_cookie_size=3000):
+        if server_service is None:
+            server_service = FileSessionService()
+        self.server_service = server_service
+        self.cookie_usage = cookie_usage
+        self.max_cookie_size = max_cookie_size
+
+    def _get_signature(self, request, payload):
+        return hmac.new(request.cfg.secrets[self.secret_key_name], payload,
+                        digestmod=hashlib.sha1).hexdigest()
+
+    def _encode(self, request, sid, data, expires):
+        """ Make the cookie value for session data, None if data can't be
+            serialized to JSON
+
+        The sid is kept in the cookie, too, so it stays the same for all
+        requests of a session (e.g. createTicket uses it).
+        """
+        try:
+            payload = json.dumps([expires, sid, data], separators=(',', ':'))
+        except (TypeError, ValueError, UnicodeError):
+            return None
+        # without padding, so the cookie value needs no quoting
+        payload = base64.urlsafe_b64encode(payload).rstrip('=')
+        return '%s.%s' % (payload, self._get_signature(request, payload))
+
+    def _decode(self, request, value):
+        """ Get the (sid, session data) from a cookie value, None if it is
+            invalid or expired
+        """
+        try:
+            payload, signature = str(value).rsplit('.', 1)
+            if not safe_str_cmp(signature, self._get_signature(request, payload)):
+                return None
+            payload += '=' * (-len(payload) % 4)
+            expires, sid, data = json.loads(base64.urlsafe_b64decode(payload))
+        except (TypeError, ValueError, UnicodeError):
+            return None
+        if not isinstance(data, dict) or not isinstance(sid, basestring) or expires < time.time():
+            return None
+        data['expires'] = expires
+        return str(sid), data
+
+    def _get_cookie_name(self, request, usage):
+        return get_cookie_name(request, name=request.cfg.cookie_name, usage=usage)
+
+    def get_session(self, request, sid=None):
+        server_cookie_name = self._get_cookie_name(request, getattr(self.server_service, 'cookie_usage', 'SESSION'))
+        if sid is not None or server_cookie_name in request.cookies:
+            return self.server_service.get_session(request, sid)
+        value = request.cookies.get(self._get_cookie_name(request, self.cookie_usage))
+        decoded = value and self._decode(request, value)
+        if not decoded:
+            session = CookieSession({}, generate_key(), True)
+        else:
+            sid, data = decoded
+            session = CookieSession(data, sid, False)
+        logging.debug("get_session returns session %r" % session)
+        return session
+
+    def get_all_session_ids(self, request):
+        return self.server_service.get_all_session_ids(request)
+
+    def destroy_session(self, request, session):
+        if isinstance(session, CookieSession):
+            # finalize deletes the cookie of an empty session
+            session.clear()
+        else:
+            self.server_service.destroy_session(request, session)
+
+    def destroy_sessions(self, request, expired=True, user_id=None):
+        return self.server_service.destroy_sessions(request, expired=expired, user_id=user_id)
+
+    def finalize(self, request, session):
+        userobj = request.user
+        if not isinstance(session, CookieSession):
+            return self.server_service.finalize(request, session)
+
+        cookie_name = self._get_cookie_name(request, self.cookie_usage)
+        cookie_args = get_cookie_args(request)
+        cookie_lifetime = _get_session_lifetime(request, userobj)
+        # we use 60s granularity, so we don't set the cookie too often
+        cookie_expires = int(time.time() / 60) * 60 + cookie_lifetime
+        data = dict(session)
+        data.pop('expires', None)
+        value = None
+        if cookie_lifetime and data and not userobj.valid:
+            value = self._encode(request, session.sid, data, cookie_expires)
+            if value is not None and len(value) > self.max_cookie_size:
+                value = None
+            if value is None:
+                logging.debug("session does not fit into a cookie: %r" % session)
+        if value is not None:
+            if session.should_save or session.get('expires') != cookie_expires:
+                request.set_cookie(cookie_name, value,
+                                   max_age=cookie_lifetime, expires=cookie_expires,
+                                   **cookie_args)
+            return
+        if cookie_name in request.cookies:
+            request.delete_cookie(cookie_name, path=cookie_args['path'],
+                                  domain=cookie_args['domain'])
+        if userobj.valid or data and cookie_lifetime:
+            # logged-in user or a big session: move it to the server
+            logging.debug("moving session to the server: %r" % session)
+            session.new = False
+            session.modified = True
+            self.server_service.finalize(request, session)
@@ -9,11 +9,13 @@
 import time
 
 from werkzeug import abort, redirect, cookie_date, Response
+from werkzeug.http import is_resource_modified, parse_range_header, quote_etag
 
 from MoinMoin import caching
 from MoinMoin import log
 from MoinMoin import wikiutil
 from MoinMoin.Page import Page
+from MoinMoin.util import timefuncs
 from MoinMoin.web.exceptions import Forbidden, SurgeProtection
 
 logging = log.getLogger(__name__)
@@ -170,6 +172,88 @@ def redirect_last_visited(request):
     url = request.getQualifiedURL(url)
     return abort(redirect(url))
 
+def make_conditional(request, etag=None, last_modified=None):
+    """ Add validators to the response and check the conditions of the
+    request (If-None-Match, If-Modified-Since) against them.
+
+    Call this before rendering the response body or opening files, if it
+    returns True, the response is a 304 Not Modified and needs no body.
+
+    @param etag: entity tag (not quoted) or None
+    @param last_modified: modification time (UNIX timestamp) or None
+    @return: True if the response is a 304
+    """
+    if etag is not None:
+        request.headers['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        request.headers['Last-Modified'] = timefuncs.formathttpdate(int(last_modified))
+    if (etag is None and last_modified is None or
+        request.method not in ('GET', 'HEAD') or
+        is_resource_modified(request.environ, request.headers.get('ETag'),
+                             last_modified=request.headers.get('Last-Modified'))):
+        return False
+    request.status_code = 304
+    return True
+
+def get_byte_ranges(request, length):
+    """ Get the byte ranges the Range header of a GET request asks for.
+
+    The Range header (RFC 7233) is ignored if it is malformed (this includes
+    overlapping ranges), is not about bytes or has an If-Range condition not
+    matching the validators of the response (see make_conditional).
+
+    @param length: length of the complete entity
+    @return: None if the complete entity shall be sent, otherwise a list of
+             (start, stop) tuples (stop is exclusive), empty if none of the
+             ranges is satisfiable
+    """
+    environ = request.environ
+    if request.method != 'GET':
+        return None
+    rng = parse_range_header(environ.get('HTTP_RANGE'))
+    if rng is None or rng.units != 'bytes':
+        return None
+    if 'HTTP_IF_RANGE' in environ and is_resource_modified(
+            environ, request.headers.get('ETag'),
+            last_modified=request.headers.get('Last-Modified'), ignore_if_range=False):
+        return None
+    ranges = []
+    for start, stop in rng.ranges:
+        if start < 0: # suffix range: last -start bytes
+            start, stop = max(length + start, 0), length
+        elif stop is None or stop > length:
+            stop = length
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+def iter_file_ranges(fileobj, ranges, bufsize, heads=None, tail=''):
+    """ Iterate over the data of some byte ranges of a file, closes the file
+    at the end.
+
+    @param fileobj: a file-like object (supporting seek, read, close)
+    @param ranges: list of (start, stop) tuples (stop is exclusive)
+    @param bufsize: size of chunks to read
+    @param heads: list of strings to yield before the data of each range
+    @param tail: string to yield at the end
+    """
+    try:
+        for index, (start, stop) in enumerate(ranges):
+            if heads:
+                yield heads[index]
+            fileobj.seek(start)
+            left = stop - start
+            while left > 0:
+                data = fileobj.read(min(bufsize, left))
+                if not data:
+                    break
+                left -= len(data)
+                yield data
+        if tail:
+            yield tail
+    finally:
+        fileobj.close()
+
 class UniqueIDGenerator(object):
     def __init__(self, pagename=None):
         self.unique_stack = []
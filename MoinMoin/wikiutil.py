@@ -462,57 +462,134 @@ def get_max_mtime(file_list, page):
     else:
         return 0 # no files / pages there
 
-def load_wikimap(request):
-    """ load interwiki map (once, and only on demand) """
-    from MoinMoin.Page import Page
-
-    now = int(time.time())
-    if getattr(request.cfg, "shared_intermap_files", None) is None:
-        generate_file_list(request)
+# compiled intermap files, shared by all wikis (of a farm) using them:
+# filename -> (stamp, {wikitag: urlprefix})
+_intermap_files = {}
+
+# check the intermap files for changes at least that often [s], also if
+# there were no changes in the edit-log
+intermap_check_interval = 60
+
+def _parse_intermap(lines):
+    """ Parse intermap lines into a dict wikitag -> urlprefix (None if the
+        line has no urlprefix, load_wikimap uses the InterWiki page of the
+        wiki then).
+    """
+    result = {}
+    for line in lines:
+        if not line or line[0] == '#':
+            continue
+        words = line.split(None, 2)
+        if len(words) > 1:
+            result[words[0]] = words[1]
+        elif words:
+            result[words[0]] = None
+    return result
 
+def _get_file_stamp(filename):
     try:
-        _interwiki_list = request.cfg.cache.interwiki_list
-        old_mtime = request.cfg.cache.interwiki_mtime
-        if request.cfg.cache.interwiki_ts + (1*60) < now: # 1 minutes caching time
-            max_mtime = get_max_mtime(request.cfg.shared_intermap_files, Page(request, INTERWIKI_PAGE))
-            if max_mtime > old_mtime:
-                raise AttributeError # refresh cache
-            else:
-                request.cfg.cache.interwiki_ts = now
-    except AttributeError:
-        _interwiki_list = {}
-        lines = []
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
 
-        for filename in request.cfg.shared_intermap_files:
-            f = codecs.open(filename, "r", config.charset)
-            lines.extend(f.readlines())
-            f.close()
+def load_intermap_file(request, filename):
+    """ Get the compiled map of an intermap file
 
-        # add the contents of the InterWikiMap page
-        lines += Page(request, INTERWIKI_PAGE).get_raw_body().splitlines()
+    The map is compiled once per process (for all wikis of a farm using the
+    file) and kept in the farm cache, so other processes do not need to
+    parse the file again.
 
-        for line in lines:
-            if not line or line[0] == '#':
-                continue
+    @param filename: name of the intermap file
+    @rtype: dict
+    @return: wikitag -> urlprefix (or None), do not modify it
+    """
+    stamp = _get_file_stamp(filename)
+    entry = _intermap_files.get(filename)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    from MoinMoin import caching
+    key = hashlib.sha1(repr(os.path.abspath(filename))).hexdigest()
+    cache = caching.CacheEntry(request, 'interwiki', key, scope='farm', use_pickle=True)
+    try:
+        data = cache.content()
+        if data['stamp'] != stamp:
+            raise KeyError
+        intermap = data['intermap']
+    except (caching.CacheError, KeyError, TypeError):
+        try:
+            f = codecs.open(filename, "r", config.charset)
             try:
-                line = "%s %s/InterWiki" % (line, request.script_root)
-                wikitag, urlprefix, dummy = line.split(None, 2)
-            except ValueError:
-                pass
-            else:
-                _interwiki_list[wikitag] = urlprefix
+                intermap = _parse_intermap(f.readlines())
+            finally:
+                f.close()
+        except IOError, err:
+            logging.warning("could not read intermap file %s: %s" % (filename, str(err)))
+            intermap = {}
+        try:
+            cache.update({'stamp': stamp, 'intermap': intermap})
+        except caching.CacheError:
+            pass
+    _intermap_files[filename] = stamp, intermap
+    return intermap
 
-        del lines
+def load_wikimap(request):
+    """ load interwiki map (once, and only on demand)
 
-        # add own wiki as "Self" and by its configured name
-        _interwiki_list['Self'] = request.script_root + '/'
-        if request.cfg.interwikiname:
-            _interwiki_list[request.cfg.interwikiname] = request.script_root + '/'
+    The map is made from the intermap files (see load_intermap_file) and
+    the InterWikiMap page. It is made again if the page was changed (as seen
+    in the edit-log) or one of the files was changed. The files are only
+    checked if there were changes in the edit-log or intermap_check_interval
+    seconds after the last check. The edit-log is checked once per request
+    (see Context.reset), at least every intermap_check_interval seconds.
+    """
+    from MoinMoin.Page import Page
+    from MoinMoin.logfile import editlog
 
-        # save for later
-        request.cfg.cache.interwiki_list = _interwiki_list
-        request.cfg.cache.interwiki_ts = now
-        request.cfg.cache.interwiki_mtime = get_max_mtime(request.cfg.shared_intermap_files, Page(request, INTERWIKI_PAGE))
+    cfg = request.cfg
+    now = time.time()
+    if getattr(cfg, "shared_intermap_files", None) is None:
+        generate_file_list(request)
+    filenames = cfg.shared_intermap_files
+
+    state = getattr(cfg.cache, 'interwiki_state', None) # (log_pos, file stamps, check time)
+    _interwiki_list = getattr(cfg.cache, 'interwiki_list', None)
+    if (state is not None and getattr(request, '_interwiki_state', None) is state and
+        now < state[2] + intermap_check_interval):
+        # checked by this request already
+        return _interwiki_list
+    log_pos, pagenames = editlog.EditLog(request).news(state and state[0])
+    if state is not None and _interwiki_list is not None and INTERWIKI_PAGE not in pagenames:
+        old_log_pos, stamps, checked = state
+        if log_pos == old_log_pos and now < checked + intermap_check_interval:
+            request._interwiki_state = state
+            return _interwiki_list
+        if [_get_file_stamp(filename) for filename in filenames] == stamps:
+            cfg.cache.interwiki_state = request._interwiki_state = log_pos, stamps, now
+            return _interwiki_list
+
+    stamps = [_get_file_stamp(filename) for filename in filenames]
+    intermap = {}
+    # order is important here, see generate_file_list
+    for filename in filenames:
+        intermap.update(load_intermap_file(request, filename))
+    # add the contents of the InterWikiMap page
+    intermap.update(_parse_intermap(Page(request, INTERWIKI_PAGE).get_raw_body().splitlines()))
+
+    _interwiki_list = {}
+    for wikitag, urlprefix in intermap.iteritems():
+        if urlprefix is None:
+            urlprefix = "%s/InterWiki" % request.script_root
+        _interwiki_list[wikitag] = urlprefix
+
+    # add own wiki as "Self" and by its configured name
+    _interwiki_list['Self'] = request.script_root + '/'
+    if cfg.interwikiname:
+        _interwiki_list[cfg.interwikiname] = request.script_root + '/'
+
+    # save for later
+    cfg.cache.interwiki_list = _interwiki_list
+    cfg.cache.interwiki_state = request._interwiki_state = log_pos, stamps, now
 
     return _interwiki_list
 
@@ -2296,12 +2373,19 @@ def mapURL(request, url):
     @return: mapped URL
     """
     # check whether we have to map URLs
-    if request.cfg.url_mappings:
-        # check URL for the configured prefixes
-        for prefix in request.cfg.url_mappings:
-            if url.startswith(prefix):
-                # substitute prefix with replacement value
-                return request.cfg.url_mappings[prefix] + url[len(prefix):]
+    url_mappings = request.cfg.url_mappings
+    if url_mappings:
+        # match all configured prefixes at once, the longest one wins
+        compiled = getattr(request.cfg.cache, 'url_mappings_re', None)
+        if compiled is None or compiled[0] != url_mappings:
+            prefixes = sorted(url_mappings, key=len, reverse=True)
+            prefix_re = re.compile(u'|'.join([re.escape(prefix) for prefix in prefixes]))
+            compiled = request.cfg.cache.url_mappings_re = dict(url_mappings), prefix_re
+        match = compiled[1].match(url)
+        if match:
+            prefix = match.group()
+            # substitute prefix with replacement value
+            return url_mappings[prefix] + url[len(prefix):]
 
     # return unchanged url
     return url
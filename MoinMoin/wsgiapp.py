@@ -3,7 +3,8 @@
     MoinMoin - WSGI application
 
     @copyright: 2003-2008 MoinMoin:ThomasWaldmann,
-                2008-2008 MoinMoin:FlorianKrupicka
+                2008-2008 MoinMoin:FlorianKrupicka,
+                2026 MoinMoin development team
     @license: GNU GPL, see COPYING for details.
 """
 import os
@@ -14,6 +15,8 @@ logging = log.getLogger(__name__)
 from MoinMoin.web.contexts import AllContext, Context, XMLRPCContext
 from MoinMoin.web.exceptions import HTTPException
 from MoinMoin.web.request import Request, MoinMoinFinish, HeaderSet
+from MoinMoin.web import pagecache
+from MoinMoin.web.session import MoinSession, generate_key
 from MoinMoin.web.utils import check_forbidden, check_surge_protect, fatal_response, \
     redirect_last_visited
 from MoinMoin.Page import Page
@@ -34,10 +37,14 @@ def set_umask(new_mask=0777^config.umask):
         pass
 
 
-def init(request):
+def init(request, session=True):
     """
     Wraps an incoming WSGI request in a Context object and initializes
     several important attributes.
+
+    @param session: use the session service; if False, the context gets a
+                    new session that is not stored (used by the warm-up,
+                    session stores must not be opened before forking)
     """
     set_umask() # do it once per request because maybe some server
                 # software sets own umask
@@ -51,14 +58,17 @@ def init(request):
 
     context.lang = setup_i18n_preauth(context)
 
-    context.session = context.cfg.session_service.get_session(context)
+    if session:
+        context.session = context.cfg.session_service.get_session(context)
+    else:
+        context.session = MoinSession({}, generate_key(), True)
 
     context.user = setup_user(context, context.session)
 
     context.lang = setup_i18n_postauth(context)
 
     def finish():
-        pass
+        i18n.save_formatted(context)
 
     context.finish = finish
 
@@ -199,6 +209,9 @@ def handle_action(context, pagename, action_name='show'):
                 msg += " " + _("Login and try again.")
             context.theme.add_msg(msg, "error")
             context.page.send_page()
+        elif pagecache.is_cacheable(context, action_name):
+            pagecache.send_page(context,
+                lambda: handler(context.page.page_name, context))
         else:
             handler(context.page.page_name, context)
 
@@ -247,6 +260,55 @@ def setup_i18n_postauth(context):
     lang = i18n.userLanguage(context) or context.lang
     return lang
 
+# plugin kinds whose plugin lists warm() builds
+warm_plugin_kinds = ['action', 'converter', 'events', 'filter', 'formatter', 'macro',
+                     'parser', 'theme', 'userprefs', 'xmlrpc', ]
+
+
+def warm(context):
+    """
+    Build the per-process state that the first request of a process would
+    otherwise need to build: the config, plugin lists, i18n metadata and
+    catalogs, interwiki map, theme and the page list, meta data and group
+    indexes. Call this before forking worker processes, so they start with
+    it.
+
+    @param context: context made for some URL of the wiki (see init)
+    @rtype: list
+    @return: (component, seconds) tuples
+    """
+    from MoinMoin.macro import getNames
+    from MoinMoin.util.clock import Clock
+    clock = Clock()
+    cfg = context.cfg
+    # rendering pages (also for the indexes) needs a current page
+    context.page = Page(context, cfg.page_front_page)
+    steps = [
+        ('plugins', lambda: ([wikiutil.getPlugins(kind, cfg) for kind in warm_plugin_kinds],
+                             get_names(cfg), getNames(cfg), cfg.event_handlers,
+                             wikiutil.getParserForExtension(cfg, '.txt'))),
+        ('i18n', lambda: [i18n.getText(u'Login', context, lang)
+                          for lang in set([cfg.language_default, context.lang, 'en'])]),
+        ('interwiki', lambda: wikiutil.load_wikimap(context)),
+        ('theme', lambda: context.theme),
+        ('itemcache', lambda: (context.rootpage.getPageList(user='', exists=0),
+                               cfg.cache.meta.refresh(context))),
+        ('indexes', lambda: (cfg.cache.groupdict_index.refresh(context),
+                             cfg.cache.linkgraph.refresh(context))),
+        ('page', lambda: context.redirectedOutput(context.page.send_page, content_only=1)),
+    ]
+    timings = []
+    for name, step in steps:
+        clock.start(name)
+        try:
+            step()
+        except Exception:
+            logging.exception("warm-up step %s failed" % name)
+        clock.stop(name)
+        timings.append((name, clock.timings[name]))
+    return timings
+
+
 class Application(object):
     def __init__(self, app_config=None):
 
@@ -254,6 +316,42 @@ class Application(object):
             given_config = app_config
 
         self.Request = AppRequest
+        self.warm_timings = []
+
+    def warm(self, urls=None):
+        """
+        Warm up this process for the wikis at urls (default: the wiki of
+        some dummy URL, that is the wiki of a wikiconfig.py), see warm().
+        Logs the time needed for each component and keeps it in
+        self.warm_timings. Sessions are not set up, so no session store
+        (e.g. a sqlite connection) gets opened before forking.
+
+        @param urls: list of URLs of wikis (one per wiki of a wiki farm)
+        """
+        from MoinMoin.util.clock import Clock
+        from werkzeug.test import create_environ
+        for url in urls or ['http://localhost/']:
+            clock = Clock()
+            clock.start('total')
+            try:
+                clock.start('config')
+                context = AllContext(self.Request(create_environ(base_url=url)))
+                context.cfg
+                clock.stop('config')
+                clock.start('init')
+                init(context, session=False)
+                clock.stop('init')
+                timings = [('config', clock.timings['config']),
+                           ('init', clock.timings['init'])]
+                timings.extend(warm(context))
+            except Exception:
+                logging.exception("warm-up for %s failed" % url)
+                continue
+            clock.stop('total')
+            timings.append(('total', clock.timings['total']))
+            self.warm_timings.append((url, timings))
+            logging.info("warm-up for %s: %s" % (url, ', '.join(["%s %.3fs" % timing
+                                                                 for timing in timings])))
 
     def __call__(self, environ, start_response):
         try:
@@ -26,7 +26,7 @@ from MoinMoin.util import pysupport
 
 modules = pysupport.getPackageModules(__file__)
 
-import os, sys, time, xmlrpclib
+import os, sys, time, calendar, xmlrpclib
 
 from MoinMoin import log
 logging = log.getLogger(__name__)
@@ -351,16 +351,20 @@ class XmlRpcBase:
 
         return_items = []
 
+        # the edit-log index lets us start reading the log near "date"
+        try:
+            date_tuple = time.strptime(getattr(date, 'value', date), "%Y%m%dT%H:%M:%S")
+        except (ValueError, TypeError):
+            return xmlrpclib.Fault(1, "Invalid date: %r." % (date, ))
+        since = wikiutil.timestamp2version(calendar.timegm(date_tuple))
         edit_log = editlog.EditLog(self.request)
-        for log in edit_log.reverse():
+        lines = list(edit_log.since(since))
+        lines.reverse() # newest first
+        for log in lines:
             # get last-modified UTC (DateTime) from log
             gmtuple = tuple(time.gmtime(wikiutil.version2timestamp(log.ed_time_usecs)))
             lastModified_date = xmlrpclib.DateTime(gmtuple)
 
-            # skip if older than "date"
-            if lastModified_date < date:
-                break
-
             # skip if knowledge not permitted
             if not self.request.user.may.read(log.pagename):
                 continue
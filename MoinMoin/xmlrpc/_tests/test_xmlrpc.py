@@ -6,10 +6,12 @@
     @license: GNU GPL, see COPYING for details.
 """
 
-from xmlrpclib import Fault
+import time
+from xmlrpclib import DateTime, Fault
 
 from MoinMoin.user import User
-from MoinMoin.xmlrpc import XmlRpcBase
+from MoinMoin.xmlrpc import XmlRpcBase, XmlRpc2
+from MoinMoin._tests import become_trusted, create_page, nuke_page
 
 
 def test_fault_serialization(request):
@@ -35,5 +37,21 @@ def test_getAuthToken(request):
     xmlrpc = XmlRpcBase(request)
     assert xmlrpc.xmlrpc_getAuthToken("Foo", "bar") == ""
 
+def test_getRecentChanges(request):
+    """ Tests if getRecentChanges lists a page saved after date """
+    become_trusted(request)
+    pagename = u'XmlRpcRecentChangesTestPage'
+    date = DateTime(time.gmtime(time.time() - 10))
+    create_page(request, pagename, u'Some text')
+    try:
+        xmlrpc = XmlRpc2(request)
+        result = xmlrpc.xmlrpc_getRecentChanges(date)
+        assert result[0]['name'] == pagename.encode('utf-8')
+        assert result[0]['version'] == 1
+        assert not xmlrpc.xmlrpc_getRecentChanges(DateTime(time.gmtime(time.time() + 10)))
+        assert isinstance(xmlrpc.xmlrpc_getRecentChanges(DateTime('2010-12-18T12:00:00')), Fault)
+    finally:
+        nuke_page(request, pagename)
+
 coverage_modules = ['MoinMoin.xmlrpc']
 
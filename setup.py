@@ -321,7 +321,7 @@ Topic :: Text Processing :: Markup""".splitlines(),
                     'MoinMoin.web.static': 'MoinMoin/web/static',
                    },
     'package_data': {'MoinMoin.i18n': ['README', 'Makefile', 'MoinMoin.pot', 'POTFILES.in',
-                                       '*.po',
+                                       '*.po', '*.mo',
                                        'tools/*',
                                        'jabberbot/*',
                                       ],